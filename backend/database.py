@@ -372,6 +372,15 @@ def get_farmer_subscriptions(farmer_id):
     return serialize_docs(list(docs))
 
 
+def get_active_subscription_locations():
+    """Get lat/lon of every active subscription (for weather prefetching)"""
+    docs = crop_subscriptions_collection.find(
+        {'status': 'ACTIVE', 'location.lat': {'$ne': None}, 'location.lon': {'$ne': None}},
+        {'_id': 0, 'location.lat': 1, 'location.lon': 1}
+    )
+    return [doc['location'] for doc in docs]
+
+
 def get_subscription_by_id(subscription_id):
     """Get single subscription by ID"""
     doc = crop_subscriptions_collection.find_one({'subscriptionId': subscription_id})
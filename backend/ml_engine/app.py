@@ -1,17 +1,25 @@
 from fastapi import FastAPI, HTTPException, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from pydantic import BaseModel
 from typing import Optional, List
 import logging
 import base64
+import json
 from datetime import datetime
 import asyncio
+from contextlib import aclosing, asynccontextmanager, suppress
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from services.season_service import SeasonService
 from services.soil_service import SoilService
 from services.recommendation_service import RecommendationService
 from services.ml_recommendation_service import MLRecommendationService
 from services.weather_service import WeatherService
+from services.recommendation_cache import get_all_cache_stats
+from services.latency_metrics import start_request_timings, render_prometheus
+from services.single_flight import get_single_flight
+from services.http_clients import get_http_clients
+from services.upstream_guard import get_upstream_status
 from services.soil_image_service import get_classifier
 from services.sms_bot_service import get_sms_bot
 from services.alert_service import get_alert_service
@@ -25,11 +33,13 @@ from services.explainability_service import explainability_service
 from services.confidence_scoring_service import confidence_scorer
 # Tier 1: Real-world data integrations
 from services.market_price_service import get_market_price_service
+from services.mandi_ingestion import get_mandi_ingestion, ingestion_enabled
 from services.weather_history_service import get_weather_history_service
 from services.soil_research_agent import get_soil_research_agent
-from services.nasa_power_service import get_nasa_power_service
+from services.soil_research_jobs import get_soil_research_jobs
+from services.nasa_power_service import NASAPowerService, get_nasa_power_service
 # Crop Monitoring Services
-from services.crop_monitoring_service import get_crop_monitoring_service
+from services.crop_monitoring_service import get_crop_monitoring_service, WeatherContext
 from services.crop_faq_service import get_crop_faq_service
 
 # Configure logging
@@ -52,7 +62,21 @@ for path in env_paths:
 else:
     load_dotenv() # Fallback to default
 
-app = FastAPI(title="KisanMitra ML Engine", version="2.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Pooled outbound HTTP clients live for the whole app
+    await get_http_clients().startup()
+    # Bulk mandi price ingestion (one worker ingests per interval, see services/mandi_ingestion.py)
+    ingestion = asyncio.create_task(get_mandi_ingestion().run_forever()) if ingestion_enabled() else None
+    yield
+    if ingestion:
+        ingestion.cancel()
+        with suppress(asyncio.CancelledError):
+            await ingestion
+    await get_http_clients().shutdown()
+
+
+app = FastAPI(title="KisanMitra ML Engine", version="2.0.0", lifespan=lifespan)
 
 # Enable CORS
 app.add_middleware(
@@ -80,6 +104,7 @@ class LocationRequest(BaseModel):
     show_alternatives: bool = True      # NEW: Show why-not explanations
     # Custom NPK values from soil report
     custom_npk: dict = None  # Format: {"n": 150, "p": 50, "k": 200, "ph": 7.0}
+    debug: bool = False  # Include per-stage timings in the response
 
 class SoilImageRequest(BaseModel):
     image_base64: str  # Base64 encoded image
@@ -92,6 +117,36 @@ class SMSRequest(BaseModel):
 def health_check():
     return {"status": "healthy", "service": "ml_engine", "version": "1.2.0"}
 
+@app.get("/cache/stats")
+def recommendation_cache_stats():
+    """Hit/miss counters for the quantized-input recommendation caches."""
+    return {
+        "success": True,
+        "caches": get_all_cache_stats(),
+        "single_flight": get_single_flight("recommend").stats(),
+        "http_clients": get_http_clients().stats(),
+        "weather": weather_service.cache.stats(),
+        "nasa_history": get_nasa_power_service().history_cache.stats(),
+        "market_prices": get_market_price_service().cache.stats(),
+        "price_history": get_market_price_service().history.stats(),
+        "mandi_ingestion": get_mandi_ingestion().status()
+    }
+
+@app.get("/upstreams/status")
+def upstream_status():
+    """Circuit breaker state, rate-limit tokens and call counts per upstream."""
+    upstreams = get_upstream_status()
+    return {
+        "success": True,
+        "degraded": [name for name, status in upstreams.items() if status["state"] != "closed"],
+        "upstreams": upstreams
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Per-stage latency histograms in Prometheus text format."""
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.post("/sms-webhook")
 async def handle_sms(request: SMSRequest):
     """
@@ -210,10 +265,226 @@ async def classify_soil_base64(request: SoilImageRequest):
 
 
 
+# Soil-specific defaults for a manually selected soil type
+SOIL_DEFAULTS = {
+    "Red Sandy Loam": {"ph": 6.5, "n": 180, "p": 45, "k": 200},
+    "Black Cotton": {"ph": 8.0, "n": 200, "p": 55, "k": 320},
+    "Alluvial": {"ph": 7.2, "n": 240, "p": 65, "k": 280},
+    "Clay": {"ph": 7.5, "n": 160, "p": 50, "k": 250},
+    "Sandy": {"ph": 6.0, "n": 140, "p": 40, "k": 180},
+    "Laterite": {"ph": 5.5, "n": 120, "p": 35, "k": 150},
+    "Loamy": {"ph": 6.8, "n": 200, "p": 60, "k": 220},
+}
+
+DEFAULT_LAT, DEFAULT_LON = 17.3850, 78.4867  # Hyderabad
+DEFAULT_NASA_LAT, DEFAULT_NASA_LON = 16.3067, 80.4365  # Guntur: NASA season forecast without coordinates
+MARKET_STATE = "Andhra Pradesh"  # State for mandi prices and the price history behind market risk
+
+
+def _parse_location(location: str):
+    """'Mandal, District' or 'District' -> (mandal, district)."""
+    parts = location.split(',')
+    if len(parts) > 1:
+        return parts[0].strip(), parts[1].strip()
+    return None, parts[0].strip()
+
+
+def _apply_manual_soil(soil_info: dict, soil_type: str) -> str:
+    """Override soil_info in place with a user-selected soil type. Returns the soil source."""
+    soil_info["soil"] = soil_type
+    if soil_type in SOIL_DEFAULTS:
+        soil_info.update(SOIL_DEFAULTS[soil_type])
+    soil_info["zone"] = "User Selected"
+    return "user_selected"
+
+
+CUSTOM_NPK_KEYS = ('n', 'p', 'k', 'ph')  # Soil report values a request may override
+
+
+def _apply_custom_npk(soil_info: dict, custom_npk: dict) -> str:
+    """Override soil_info in place with soil report values. Returns the soil source."""
+    for key in CUSTOM_NPK_KEYS:
+        if key in custom_npk:
+            soil_info[key] = float(custom_npk[key])
+    return "soil_report"
+
+
+def _queue_soil_research(mandal, district):
+    """Start (or join) background soil research for an unknown region; returns the job summary."""
+    def save_result(data):
+        # State defaults are not a refinement - only persist real research
+        if data.get("researched"):
+            soil_service.save_researched_soil(district, mandal, data)
+
+    job = get_soil_research_jobs().submit(
+        region=mandal or district,
+        district=district,
+        on_complete=save_result
+    )
+    return {
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "status_url": f"/soil/research/jobs/{job['job_id']}"
+    }
+
+
+def _effective_temp(current_temp, forecast):
+    """Use the forecast day temperature when the current reading is a night/cold one."""
+    if current_temp < 20 and forecast and 'daily' in forecast and len(forecast['daily']) > 0:
+        effective_temp = forecast['daily'][0]['temp']
+        logger.info(f"Night/Cold detected ({current_temp}C). Using forecast temp ({effective_temp}C) for ML.")
+        return effective_temp
+    return current_temp
+
+
+def _simulate_risk(recommendations, forecast_analysis, temp, humidity, soil_info, season, location):
+    """
+    Decision simulation (loss probabilities, risk breakdown). Returns recommendations unchanged on failure.
+    Reads the price history (SQLite): async callers run it with asyncio.to_thread.
+    """
+    try:
+        # Add forecast data for risk calculation
+        enhanced_forecast = {
+            **forecast_analysis,
+            'avg_temp': temp,
+            'avg_humidity': humidity
+        }
+        
+        enhanced_recommendations = decision_simulator.simulate_decision(
+            recommendations=recommendations,
+            weather_forecast=enhanced_forecast,
+            soil_params={"ph": soil_info.get("ph", 7.0), 
+                       "n": soil_info.get("n", 150),
+                       "p": soil_info.get("p", 50),
+                       "k": soil_info.get("k", 150)},
+            context={"season": season, "location": location, "state": MARKET_STATE}
+        )
+        logger.info("Decision simulation complete - risk analysis added")
+        return enhanced_recommendations
+    except Exception as e:
+        logger.warning(f"Decision simulation failed: {e}, continuing without")
+        return recommendations
+
+
+def _add_explanations(recommendations):
+    """Attach English/Telugu explanations and why-not notes in place."""
+    for rec in recommendations:
+        try:
+            # Add English explanation
+            rec['explanation_en'] = explainability_service.explain_recommendation(
+                crop=rec['crop'],
+                recommendation=rec,
+                language='en'
+            )
+            
+            # Add Telugu explanation
+            rec['explanation_te'] = explainability_service.explain_recommendation(
+                crop=rec['crop'],
+                recommendation=rec,
+                language='te'
+            )
+            
+            # Add "why not" explanation
+            rec['why_not'] = explainability_service.explain_why_not(
+                crop=rec['crop'],
+                rec=rec,
+                language='en'
+            )
+        except Exception as e:
+            logger.warning(f"Explanation generation failed for {rec.get('crop')}: {e}")
+
+
+def _recommend_signature(request: LocationRequest):
+    """Normalized request key: identical farm requests map to the same signature."""
+    location = ",".join(part.strip().lower() for part in request.location_name.split(','))
+    # Only the keys _apply_custom_npk reads, uncoerced: bad values fail inside the handler, not here
+    custom_npk = tuple(
+        (key, repr(request.custom_npk[key])) for key in CUSTOM_NPK_KEYS if key in request.custom_npk
+    ) if request.custom_npk else None
+    return (
+        location,
+        (request.manual_soil_type or "").strip().lower() or None,
+        round(request.lat, 4) if request.lat else None,
+        round(request.lon, 4) if request.lon else None,
+        request.include_risk_analysis,
+        request.show_alternatives,
+        custom_npk,
+        request.debug
+    )
+
+
 @app.post("/recommend")
 async def recommend_crops(request: LocationRequest):
     """
-    Enhanced endpoint with:
+    Identical concurrent requests (same village at push-notification time)
+    are coalesced: one computation runs and every waiter shares its result.
+    """
+    return await get_single_flight("recommend").do(
+        _recommend_signature(request), lambda: _recommend_crops(request)
+    )
+
+
+@app.post("/recommend/stream")
+async def recommend_crops_stream(request: LocationRequest):
+    """
+    Streaming /recommend for slow (2G) connections, one NDJSON event per line:
+    recommendations (context + ranked crops), explanations, then
+    market_prices / nasa_forecast / weather_history in arrival order, and
+    finally done. Failures are reported as an error event.
+    """
+    async def stream_events():
+        try:
+            # aclosing: a client disconnect closes the pipeline at once, cancelling its background fetches
+            async with aclosing(_recommend_events(request)) as events:
+                async for event in events:
+                    yield json.dumps(event, default=str) + "\n"
+        except HTTPException as e:
+            yield json.dumps({"event": "error", "detail": e.detail}) + "\n"
+
+    return StreamingResponse(
+        stream_events(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def _recommend_crops(request: LocationRequest):
+    """Run the pipeline to completion and assemble the classic /recommend response."""
+    enhancements = {"weather_history": {}, "nasa_forecast": {}}
+    async for event in _recommend_events(request):
+        kind = event.pop("event")
+        if kind == "recommendations":
+            # Explanations and market prices are applied to these same dicts in place
+            first = event
+        elif kind in enhancements:
+            enhancements[kind] = event[kind]
+        elif kind == "done":
+            done = event
+
+    context = first["context"]
+    confidence = context.pop("confidence")
+    context.update(
+        # NEW: Weather history summary
+        weather_history=enhancements["weather_history"],
+        # NEW: NASA Power 3-month growing season forecast
+        nasa_forecast=enhancements["nasa_forecast"],
+        confidence=confidence
+    )
+    response = {
+        "location": first["location"],
+        "model_type": first["model_type"],
+        "execution_time": done["execution_time"],
+        "context": context,
+        "recommendations": first["recommendations"]
+    }
+    if "timings" in done:
+        response["timings"] = done["timings"]
+    return response
+
+
+async def _recommend_events(request: LocationRequest):
+    """
+    Enhanced recommendation pipeline, yielded as events as each stage completes:
     - Decision simulation (loss probabilities, risk breakdown)
     - Confidence scoring (data quality transparency)
     - Farmer-friendly explanations (Telugu/English)
@@ -221,134 +492,103 @@ async def recommend_crops(request: LocationRequest):
     """
     logger.info(f"Recommendation request: {request.location_name}, Coords: {request.lat},{request.lon}, Manual: {request.manual_soil_type}")
     
+    # Cancelled in the finally below, also when a /recommend/stream client disconnects mid-stream
+    background_tasks = []
     try:
         import asyncio
         start_time = datetime.now()
+        timings = start_request_timings("recommend")
         location = request.location_name
         
         # 1. Season
-        season_info = season_service.get_current_season_details()
-        current_season = season_info["season"]
+        with timings.stage("season"):
+            season_info = season_service.get_current_season_details()
+            current_season = season_info["season"]
         
         # 2. Parse location
-        parts = location.split(',')
-        if len(parts) > 1:
-            mandal = parts[0].strip()
-            district = parts[1].strip()
-        else:
-            mandal = None
-            district = parts[0].strip()
+        mandal, district = _parse_location(location)
         
         # 3. Soil: Try database first, then AI research if unknown
-        soil_info = soil_service.get_soil_info(district, mandal)
+        with timings.stage("soil_lookup"):
+            soil_info = soil_service.get_soil_info(district, mandal)
         soil_source = "database"
         soil_classification_confidence = None
         
-        # Auto-research if region is unknown
+        # Unknown region: answer now with the state default, research in the background
+        soil_research_job = None
         if soil_info.get("zone") == "Unknown Region" and not request.manual_soil_type:
-            logger.info(f"Unknown region '{district}' - triggering AI research...")
-            try:
-                from services.soil_research_agent import SoilResearchAgent
-                agent = SoilResearchAgent()
-                researched = agent.research_soil(
-                    region=mandal or district,
-                    district=district
-                )
-                if researched:
-                    soil_info = researched
-                    soil_source = "ai_researched"
-                    logger.info(f"AI research found: {soil_info['soil']} (source: {soil_info.get('source', 'unknown')})")
-            except Exception as e:
-                logger.warning(f"Research failed: {e}")
+            logger.info(f"Unknown region '{district}' - queueing background AI research")
+            with timings.stage("soil_research"):
+                soil_research_job = _queue_soil_research(mandal, district)
+                soil_info = get_soil_research_agent().get_state_default("Andhra Pradesh", mandal or district)
+                soil_source = "state_default"
 
         # Manual override
         if request.manual_soil_type:
             logger.info(f"Overriding to manual: {request.manual_soil_type}")
-            soil_info["soil"] = request.manual_soil_type
-            soil_source = "user_selected"
-            
-            # Soil-specific defaults
-            soil_defaults = {
-                "Red Sandy Loam": {"ph": 6.5, "n": 180, "p": 45, "k": 200},
-                "Black Cotton": {"ph": 8.0, "n": 200, "p": 55, "k": 320},
-                "Alluvial": {"ph": 7.2, "n": 240, "p": 65, "k": 280},
-                "Clay": {"ph": 7.5, "n": 160, "p": 50, "k": 250},
-                "Sandy": {"ph": 6.0, "n": 140, "p": 40, "k": 180},
-                "Laterite": {"ph": 5.5, "n": 120, "p": 35, "k": 150},
-                "Loamy": {"ph": 6.8, "n": 200, "p": 60, "k": 220},
-            }
-            if request.manual_soil_type in soil_defaults:
-                soil_info.update(soil_defaults[request.manual_soil_type])
-            
-            soil_info["zone"] = "User Selected"
+            soil_source = _apply_manual_soil(soil_info, request.manual_soil_type)
             if district:
                 soil_service.update_soil_db(district, mandal, request.manual_soil_type)
         
         # Custom NPK from soil report (highest priority override)
         if request.custom_npk:
             logger.info(f"Using custom NPK from soil report: {request.custom_npk}")
-            if 'n' in request.custom_npk:
-                soil_info["n"] = float(request.custom_npk["n"])
-            if 'p' in request.custom_npk:
-                soil_info["p"] = float(request.custom_npk["p"])
-            if 'k' in request.custom_npk:
-                soil_info["k"] = float(request.custom_npk["k"])
-            if 'ph' in request.custom_npk:
-                soil_info["ph"] = float(request.custom_npk["ph"])
-            soil_source = "soil_report"
+            soil_source = _apply_custom_npk(soil_info, request.custom_npk)
         
         # 4. Weather: Current + Forecast (Async)
-        lat = request.lat if request.lat else 17.3850
-        lon = request.lon if request.lon else 78.4867
+        lat = request.lat if request.lat else DEFAULT_LAT
+        lon = request.lon if request.lon else DEFAULT_LON
         
         # Define tasks for independent data fetching
         async def fetch_weather_tasks():
-            return await asyncio.gather(
-                weather_service.get_current_weather_async(lat, lon),
-                weather_service.get_forecast_async(lat, lon)
-            )
+            # One upstream call (WEATHER_MODE=precision for separate current + forecast)
+            return await weather_service.get_weather_snapshot_async(lat, lon)
 
         async def fetch_weather_history_task():
-            try:
-                weather_hist_service = get_weather_history_service()
-                return await asyncio.to_thread(
-                    weather_hist_service.get_district_weather_summary,
-                    state="Andhra Pradesh", 
-                    district=district
-                )
-            except Exception as e:
-                logger.warning(f"Weather history fetch failed: {e}")
-                return {}
+            with timings.stage("weather_history"):
+                try:
+                    weather_hist_service = get_weather_history_service()
+                    return await asyncio.to_thread(
+                        weather_hist_service.get_district_weather_summary,
+                        state="Andhra Pradesh", 
+                        district=district
+                    )
+                except Exception as e:
+                    logger.warning(f"Weather history fetch failed: {e}")
+                    return {}
 
         async def fetch_nasa_forecast_task():
-            try:
-                lat_val = request.lat or 16.3067
-                lon_val = request.lon or 80.4365
-                current_month = datetime.now().month
-                start_month = 6 if current_season == "Kharif" else (10 if current_season == "Rabi" else current_month)
+            with timings.stage("nasa_forecast"):
+                try:
+                    lat_val = request.lat or DEFAULT_NASA_LAT
+                    lon_val = request.lon or DEFAULT_NASA_LON
+                    current_month = datetime.now().month
+                    start_month = 6 if current_season == "Kharif" else (10 if current_season == "Rabi" else current_month)
                 
-                nasa_service = get_nasa_power_service()
-                return await nasa_service.get_growing_season_forecast_async(
-                    lat=lat_val,
-                    lon=lon_val,
-                    start_month=start_month,
-                    duration_months=3
-                )
-            except Exception as e:
-                logger.warning(f"NASA forecast fetch failed: {e}")
-                return {}
+                    nasa_service = get_nasa_power_service()
+                    return await nasa_service.get_growing_season_forecast_async(
+                        lat=lat_val,
+                        lon=lon_val,
+                        start_month=start_month,
+                        duration_months=3
+                    )
+                except Exception as e:
+                    logger.warning(f"NASA forecast fetch failed: {e}")
+                    return {}
 
         # Start independent long-running tasks EARLY
         # We don't await them yet, allowing them to run while we do Weather + ML
         nasa_future = asyncio.create_task(fetch_nasa_forecast_task())
         history_future = asyncio.create_task(fetch_weather_history_task())
+        background_tasks += [nasa_future, history_future]
         
         # Await Weather (Critical for ML)
-        try:
-            weather, forecast = await fetch_weather_tasks()
-        except Exception as e:
-            logger.error(f"Weather fetch failed: {e}")
-            weather, forecast = {}, {}
+        with timings.stage("weather"):
+            try:
+                weather, forecast = await fetch_weather_tasks()
+            except Exception as e:
+                logger.error(f"Weather fetch failed: {e}")
+                weather, forecast = {}, {}
 
         current_temp = weather.get('temp', 28)
         current_humidity = weather.get('humidity', 60)
@@ -358,28 +598,26 @@ async def recommend_crops(request: LocationRequest):
         weather_summary = recommendation_service.get_weather_summary(forecast_analysis)
 
         # Smart Temp
-        effective_temp = current_temp
-        if current_temp < 20 and forecast and 'daily' in forecast and len(forecast['daily']) > 0:
-            effective_temp = forecast['daily'][0]['temp']
-            logger.info(f"Night/Cold detected ({current_temp}C). Using forecast temp ({effective_temp}C) for ML.")
+        effective_temp = _effective_temp(current_temp, forecast)
 
         # 5. Generate ML-Based Recommendations (Offload to thread to unblock loop)
         recommendations = []
         try:
-            # Run blocking ML prediction in thread pool
-            recommendations = await asyncio.to_thread(
-                ml_recommendation_service.get_recommendations,
-                soil_type=soil_info["soil"],
-                season=current_season,
-                temp=effective_temp,
-                humidity=current_humidity,
-                soil_ph=soil_info.get("ph", 7.0),
-                soil_n=soil_info.get("n", 150),
-                soil_p=soil_info.get("p", 50),
-                soil_k=soil_info.get("k", 150),
-                forecast=forecast_analysis,
-                soil_source=soil_source
-            )
+            with timings.stage("ml"):
+                # Run blocking ML prediction in thread pool
+                recommendations = await asyncio.to_thread(
+                    ml_recommendation_service.get_recommendations,
+                    soil_type=soil_info["soil"],
+                    season=current_season,
+                    temp=effective_temp,
+                    humidity=current_humidity,
+                    soil_ph=soil_info.get("ph", 7.0),
+                    soil_n=soil_info.get("n", 150),
+                    soil_p=soil_info.get("p", 50),
+                    soil_k=soil_info.get("k", 150),
+                    forecast=forecast_analysis,
+                    soil_source=soil_source
+                )
             
             if not recommendations:
                 raise ValueError("No ML recommendations")
@@ -387,152 +625,59 @@ async def recommend_crops(request: LocationRequest):
             model_type = "ml_trained"
         except Exception as e:
             logger.warning(f"ML model failed/empty, using rule-based (sync fallback): {e}")
-            recommendations = recommendation_service.get_recommendations(
-                soil_type=soil_info["soil"],
-                season=current_season,
-                temp=current_temp,
-                humidity=current_humidity,
-                soil_ph=soil_info.get("ph", 7.0),
-                soil_n=soil_info.get("n", 150),
-                soil_p=soil_info.get("p", 50),
-                soil_k=soil_info.get("k", 150),
-                forecast=forecast,
-                soil_source=soil_source
-            )
+            with timings.stage("rule_based_fallback"):
+                recommendations = recommendation_service.get_recommendations(
+                    soil_type=soil_info["soil"],
+                    season=current_season,
+                    temp=current_temp,
+                    humidity=current_humidity,
+                    soil_ph=soil_info.get("ph", 7.0),
+                    soil_n=soil_info.get("n", 150),
+                    soil_p=soil_info.get("p", 50),
+                    soil_k=soil_info.get("k", 150),
+                    forecast=forecast,
+                    soil_source=soil_source
+                )
             model_type = "rule_based"
 
         # 6. HACKATHON ENHANCEMENT: Decision Simulation
         if request.include_risk_analysis and recommendations:
-            try:
-                # Add forecast data for risk calculation
-                enhanced_forecast = {
-                    **forecast_analysis,
-                    'avg_temp': current_temp,
-                    'avg_humidity': current_humidity
-                }
-                
-                enhanced_recommendations = decision_simulator.simulate_decision(
-                    recommendations=recommendations,
-                    weather_forecast=enhanced_forecast,
-                    soil_params={"ph": soil_info.get("ph", 7.0), 
-                               "n": soil_info.get("n", 150),
-                               "p": soil_info.get("p", 50),
-                               "k": soil_info.get("k", 150)},
-                    context={"season": current_season, "location": location}
+            with timings.stage("decision_simulation"):
+                recommendations = await asyncio.to_thread(
+                    _simulate_risk, recommendations, forecast_analysis, current_temp, current_humidity,
+                    soil_info, current_season, location
                 )
-                recommendations = enhanced_recommendations
-                logger.info("Decision simulation complete - risk analysis added")
-            except Exception as e:
-                logger.warning(f"Decision simulation failed: {e}, continuing without")
 
         # 7. HACKATHON ENHANCEMENT: Confidence Scoring
-        soil_confidence = confidence_scorer.score_soil_data(
-            soil_type=soil_info["soil"],
-            source=soil_source,
-            classification_confidence=soil_classification_confidence
-        )
-        
-        weather_confidence = confidence_scorer.score_weather_data(
-            source='openweather_forecast',
-            forecast_hours=72
-        )
-        
-        ml_confidence = confidence_scorer.score_ml_prediction(
-            ml_confidence=recommendations[0].get('confidence', 70) if recommendations else 70,
-            model_type=model_type,
-            data_completeness=1.0
-        )
-        
-        overall_confidence = confidence_scorer.aggregate_confidence(
-            soil_conf=soil_confidence,
-            weather_conf=weather_confidence,
-            ml_conf=ml_confidence
-        )
-
-        # 8. HACKATHON ENHANCEMENT: Add explanations
-        if request.show_alternatives and recommendations:
-            for rec in recommendations:
-                try:
-                    # Add English explanation
-                    explanation_en = explainability_service.explain_recommendation(
-                        crop=rec['crop'],
-                        recommendation=rec,
-                        language='en'
-                    )
-                    rec['explanation_en'] = explanation_en
-                    
-                    # Add Telugu explanation
-                    explanation_te = explainability_service.explain_recommendation(
-                        crop=rec['crop'],
-                        recommendation=rec,
-                        language='te'
-                    )
-                    rec['explanation_te'] = explanation_te
-                    
-                    # Add "why not" explanation
-                    rec['why_not'] = explainability_service.explain_why_not(
-                        crop=rec['crop'],
-                        rec=rec,
-                        language='en'
-                    )
-                except Exception as e:
-                    logger.warning(f"Explanation generation failed for {rec.get('crop')}: {e}")
-
-        # ============== PARALLEL DATA ENHANCEMENT ==============
-        # Fetch Market Prices (Dependent on ML results)
-        market_prices_result = []
-        skip_external_apis = getattr(request, 'fast_mode', False)
-        
-        async def fetch_market_prices_task():
-            if skip_external_apis or not recommendations: return []
-            try:
-                market_service = get_market_price_service()
-                tasks = [market_service.get_commodity_price_async(r.get('crop'), "Andhra Pradesh", district) for r in recommendations[:5] if r.get('crop')]
-                return await asyncio.gather(*tasks, return_exceptions=True) if tasks else []
-            except Exception as e:
-                logger.warning(f"Market fetch failed: {e}")
-                return []
-
-        # Now gather ALL parallel tasks:
-        # 1. Market (just started)
-        # 2. NASA (started early)
-        # 3. History (started early)
-        
-        logger.info("Gathering parallel enhancement tasks...")
-        market_future = asyncio.create_task(fetch_market_prices_task())
+        with timings.stage("confidence_scoring"):
+            soil_confidence = confidence_scorer.score_soil_data(
+                soil_type=soil_info["soil"],
+                source=soil_source,
+                classification_confidence=soil_classification_confidence
+            )
         
-        try:
-            results = await asyncio.wait_for(
-                asyncio.gather(
-                    market_future,
-                    nasa_future,
-                    history_future,
-                    return_exceptions=True
-                ),
-                timeout=6.0
+            weather_confidence = confidence_scorer.score_weather_data(
+                source='openweather_forecast',
+                forecast_hours=72
             )
-        except asyncio.TimeoutError:
-            logger.warning("Parallel data enhancement timed out (>6s). Returning partial/default data.")
-            results = [TimeoutError(), TimeoutError(), TimeoutError()]
         
-        market_prices_list = results[0] if not isinstance(results[0], Exception) else []
-        nasa_forecast = results[1] if not isinstance(results[1], Exception) else {}
-        weather_history = results[2] if not isinstance(results[2], Exception) else {} # Note: history returning dict directly now
-
-        # Apply market prices
-        if market_prices_list:
-            for i, price_data in enumerate(market_prices_list):
-                if i < len(recommendations) and isinstance(price_data, dict):
-                    recommendations[i]['market_price'] = price_data
-                    recommendations[i]['market_price_live'] = price_data.get('live', False)
+            ml_confidence = confidence_scorer.score_ml_prediction(
+                ml_confidence=recommendations[0].get('confidence', 70) if recommendations else 70,
+                model_type=model_type,
+                data_completeness=1.0
+            )
         
-        execution_time = (datetime.now() - start_time).total_seconds()
-        logger.info(f"Data enhancement completed in {execution_time:.2f}s")
+            overall_confidence = confidence_scorer.aggregate_confidence(
+                soil_conf=soil_confidence,
+                weather_conf=weather_confidence,
+                ml_conf=ml_confidence
+            )
 
-        return {
+        # First useful result: context + ranked crops, before the slow enrichments
+        yield {
+            "event": "recommendations",
             "location": location,
             "model_type": model_type,
-            "execution_time": execution_time,
             "context": {
                 "season": current_season,
                 "season_desc": season_info["description"],
@@ -545,6 +690,8 @@ async def recommend_crops(request: LocationRequest):
                     "p": soil_info.get("p", 50),
                     "k": soil_info.get("k", 150)
                 },
+                # Background research for unknown regions (poll status_url)
+                **({"soil_research": soil_research_job} if soil_research_job else {}),
                 "weather": {
                     "temp": current_temp,
                     "humidity": current_humidity,
@@ -553,10 +700,6 @@ async def recommend_crops(request: LocationRequest):
                     "rain_days": forecast_analysis.get("rain_days", 0),
                     "weather_risk": forecast_analysis.get("weather_risk", "Low")
                 },
-                # NEW: Weather history summary
-                "weather_history": weather_history,
-                # NEW: NASA Power 3-month growing season forecast
-                "nasa_forecast": nasa_forecast,
                 # NEW: Confidence metadata
                 "confidence": {
                     "soil": soil_confidence,
@@ -568,13 +711,388 @@ async def recommend_crops(request: LocationRequest):
             "recommendations": recommendations
         }
 
+        # ============== PARALLEL DATA ENHANCEMENT ==============
+        # Fetch Market Prices (Dependent on ML results, not on explanations)
+        skip_external_apis = getattr(request, 'fast_mode', False)
+        
+        async def fetch_market_prices_task():
+            if skip_external_apis or not recommendations: return []
+            with timings.stage("market_prices"):
+                try:
+                    market_service = get_market_price_service()
+                    tasks = [market_service.get_commodity_price_async(r.get('crop'), MARKET_STATE, district) for r in recommendations[:5] if r.get('crop')]
+                    return await asyncio.gather(*tasks, return_exceptions=True) if tasks else []
+                except Exception as e:
+                    logger.warning(f"Market fetch failed: {e}")
+                    return []
+
+        logger.info("Gathering parallel enhancement tasks...")
+        market_future = asyncio.create_task(fetch_market_prices_task())
+        background_tasks.append(market_future)
+
+        # 8. HACKATHON ENHANCEMENT: Add explanations
+        if request.show_alternatives and recommendations:
+            with timings.stage("explanations"):
+                _add_explanations(recommendations)
+            yield {
+                "event": "explanations",
+                "explanations": [
+                    {key: rec.get(key) for key in ("crop", "explanation_en", "explanation_te", "why_not")}
+                    for rec in recommendations
+                ]
+            }
+
+        # Emit market / NASA / history as each arrives, within one 6s budget:
+        # 1. Market (just started)
+        # 2. NASA (started early)
+        # 3. History (started early)
+        enhancements = {
+            market_future: ("market_prices", []),
+            nasa_future: ("nasa_forecast", {}),
+            history_future: ("weather_history", {})
+        }
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + 6.0
+        gather_seconds = 0.0
+        pending = set(enhancements)
+        try:
+            while pending:
+                wait_start = loop.time()
+                finished, pending = await asyncio.wait(
+                    pending, timeout=max(deadline - loop.time(), 0), return_when=asyncio.FIRST_COMPLETED
+                )
+                gather_seconds += loop.time() - wait_start
+                if not finished:
+                    break
+                
+                for future in finished:
+                    name, default = enhancements[future]
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logger.warning(f"Enhancement '{name}' failed: {e}")
+                        result = default
+                    
+                    if name == "market_prices":
+                        # Apply market prices
+                        for i, price_data in enumerate(result or []):
+                            if i < len(recommendations) and isinstance(price_data, dict):
+                                recommendations[i]['market_price'] = price_data
+                                recommendations[i]['market_price_live'] = price_data.get('live', False)
+                        result = [
+                            {key: rec.get(key) for key in ("crop", "market_price", "market_price_live")}
+                            for rec in recommendations[:5]
+                        ]
+                    yield {"event": name, name: result}
+            
+            if pending:
+                logger.warning("Parallel data enhancement timed out (>6s). Returning partial/default data.")
+                for future in pending:
+                    name, default = enhancements[future]
+                    yield {"event": name, name: default, "timed_out": True}
+        finally:
+            for future in pending:
+                future.cancel()
+        timings.record("enhancement_gather", gather_seconds)
+        
+        execution_time = (datetime.now() - start_time).total_seconds()
+        timings.finish()
+        logger.info(f"Data enhancement completed in {execution_time:.2f}s")
+
+        done = {"event": "done", "execution_time": execution_time}
+        if request.debug:
+            done["timings"] = timings.as_dict()
+        yield done
+
     except Exception as e:
         logger.error(f"Error: {e}")
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        for task in background_tasks:
+            task.cancel()
+
+
+
+class PlotRequest(BaseModel):
+    plot_id: Optional[str] = None
+    location_name: str
+    lat: Optional[float] = None
+    lon: Optional[float] = None
+    manual_soil_type: Optional[str] = None
+    custom_npk: Optional[dict] = None  # Format: {"n": 150, "p": 50, "k": 200, "ph": 7.0}
+
+class BatchRecommendRequest(BaseModel):
+    plots: List[PlotRequest]
+    include_risk_analysis: bool = False
+    show_alternatives: bool = False
+    include_market_prices: bool = True
+
+
+def _plot_nasa_forecast(forecast: dict, lat: float, lon: float) -> dict:
+    """A grid cell's shared NASA forecast, echoing this plot's own coordinates."""
+    return dict(forecast, location={"lat": lat, "lon": lon}) if forecast else forecast
 
 
+BATCH_MAX_PLOTS = int(os.getenv('RECOMMEND_BATCH_MAX_PLOTS', 1000))
+BATCH_FETCH_CONCURRENCY = int(os.getenv('RECOMMEND_BATCH_CONCURRENCY', 8))
+BATCH_ENHANCEMENT_TIMEOUT = 15.0
+
+
+@app.post("/recommend/batch")
+async def recommend_crops_batch(request: BatchRecommendRequest):
+    """
+    Bulk recommendations for FPOs / cooperatives uploading many plots at once.
+    
+    Shared lookups are done once per batch instead of once per plot:
+    - soil per (district, mandal)
+    - current weather + forecast per weather-cache grid cell (~5 km)
+    - weather history per district, NASA forecast per NASA POWER grid cell
+      (0.5 x 0.625 degrees, NASAPowerService.snap_to_grid)
+    - market prices per (crop, district)
+    ML scoring for every plot is a single matrix call.
+    
+    Streams one NDJSON line per plot, in upload order. Unknown regions are
+    not AI-researched and manual soil types are not written back to the
+    soil database in batch mode.
+    """
+    if not request.plots:
+        raise HTTPException(status_code=400, detail="No plots provided")
+    if len(request.plots) > BATCH_MAX_PLOTS:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_PLOTS} plots per batch")
+    
+    start_time = datetime.now()
+    logger.info(f"Batch recommendation request: {len(request.plots)} plots")
+    
+    season_info = season_service.get_current_season_details()
+    current_season = season_info["season"]
+    
+    # 1. Soil per unique location
+    soil_lookup = {}
+    plots = []
+    for index, plot in enumerate(request.plots):
+        mandal, district = _parse_location(plot.location_name)
+        if (district, mandal) not in soil_lookup:
+            soil_lookup[(district, mandal)] = soil_service.get_soil_info(district, mandal)
+        
+        soil_info = dict(soil_lookup[(district, mandal)])
+        soil_source = "database"
+        if plot.manual_soil_type:
+            soil_source = _apply_manual_soil(soil_info, plot.manual_soil_type)
+        if plot.custom_npk:
+            soil_source = _apply_custom_npk(soil_info, plot.custom_npk)
+        
+        lat = plot.lat if plot.lat else DEFAULT_LAT
+        lon = plot.lon if plot.lon else DEFAULT_LON
+        plots.append({
+            "plot_id": plot.plot_id or str(index),
+            "location": plot.location_name,
+            "district": district,
+            "lat": lat,
+            "lon": lon,
+            # Same defaults as /recommend, so a plot without coordinates gets the same forecast
+            "nasa_lat": plot.lat or DEFAULT_NASA_LAT,
+            "nasa_lon": plot.lon or DEFAULT_NASA_LON,
+            "soil_info": soil_info,
+            "soil_source": soil_source
+        })
+    
+    # 2. Long-running context fetches, one per district / NASA cell, started early
+    semaphore = asyncio.Semaphore(BATCH_FETCH_CONCURRENCY)
+    
+    async def fetch_history(district):
+        async with semaphore:
+            try:
+                return await asyncio.to_thread(
+                    get_weather_history_service().get_district_weather_summary,
+                    state="Andhra Pradesh",
+                    district=district
+                )
+            except Exception as e:
+                logger.warning(f"Weather history fetch failed for {district}: {e}")
+                return {}
+    
+    async def fetch_nasa(lat, lon):
+        async with semaphore:
+            try:
+                current_month = datetime.now().month
+                start_month = 6 if current_season == "Kharif" else (10 if current_season == "Rabi" else current_month)
+                return await get_nasa_power_service().get_growing_season_forecast_async(
+                    lat=lat, lon=lon, start_month=start_month, duration_months=3
+                )
+            except Exception as e:
+                logger.warning(f"NASA forecast fetch failed for {lat},{lon}: {e}")
+                return {}
+    
+    history_futures = {}
+    nasa_futures = {}
+    for p in plots:
+        if p["district"] not in history_futures:
+            history_futures[p["district"]] = asyncio.create_task(fetch_history(p["district"]))
+        # Keyed like the NASA history cache (and scripts/prefetch_nasa_grid.py): one fetch per grid cell
+        p["nasa_cell"] = NASAPowerService.snap_to_grid(p["nasa_lat"], p["nasa_lon"])
+        if p["nasa_cell"] not in nasa_futures:
+            nasa_futures[p["nasa_cell"]] = asyncio.create_task(fetch_nasa(*p["nasa_cell"]))
+    
+    # 3. Weather per grid cell (critical for ML)
+    async def fetch_weather(lat, lon):
+        async with semaphore:
+            try:
+                return await weather_service.get_weather_snapshot_async(lat, lon)
+            except Exception as e:
+                logger.error(f"Weather fetch failed for {lat},{lon}: {e}")
+                return {}, {}
+    
+    weather_cells = {}
+    for p in plots:
+        p["weather_cell"] = weather_service.cache.cell(p["lat"], p["lon"])
+        weather_cells.setdefault(p["weather_cell"], (p["lat"], p["lon"]))
+    cell_weather = dict(zip(
+        weather_cells,
+        await asyncio.gather(*(fetch_weather(lat, lon) for lat, lon in weather_cells.values()))
+    ))
+    
+    ml_inputs = []
+    for p in plots:
+        weather, forecast = cell_weather[p["weather_cell"]]
+        p["temp"] = weather.get('temp', 28)
+        p["humidity"] = weather.get('humidity', 60)
+        p["weather_desc"] = weather.get('desc', 'Clear')
+        p["forecast"] = forecast
+        p["forecast_analysis"] = recommendation_service._analyze_forecast(forecast)
+        soil_info = p["soil_info"]
+        ml_inputs.append(dict(
+            soil_type=soil_info["soil"],
+            season=current_season,
+            temp=_effective_temp(p["temp"], forecast),
+            humidity=p["humidity"],
+            soil_ph=soil_info.get("ph", 7.0),
+            soil_n=soil_info.get("n", 150),
+            soil_p=soil_info.get("p", 50),
+            soil_k=soil_info.get("k", 150),
+            forecast=p["forecast_analysis"],
+            soil_source=p["soil_source"]
+        ))
+    
+    # 4. One ML matrix call for every plot
+    try:
+        batch_results = await asyncio.to_thread(ml_recommendation_service.get_recommendations_batch, ml_inputs)
+    except Exception as e:
+        logger.warning(f"Batch ML scoring failed, using rule-based per plot: {e}")
+        batch_results = [[] for _ in plots]
+    
+    market_futures = {}
+    
+    async def fetch_price(crop, district):
+        async with semaphore:
+            return await get_market_price_service().get_commodity_price_async(crop, MARKET_STATE, district)
+    
+    for p, recommendations in zip(plots, batch_results):
+        soil_info = p["soil_info"]
+        model_type = "ml_trained"
+        if not recommendations:
+            recommendations = recommendation_service.get_recommendations(
+                soil_type=soil_info["soil"],
+                season=current_season,
+                temp=p["temp"],
+                humidity=p["humidity"],
+                soil_ph=soil_info.get("ph", 7.0),
+                soil_n=soil_info.get("n", 150),
+                soil_p=soil_info.get("p", 50),
+                soil_k=soil_info.get("k", 150),
+                forecast=p["forecast"],
+                soil_source=p["soil_source"]
+            )
+            model_type = "rule_based"
+        
+        if request.include_risk_analysis and recommendations:
+            recommendations = await asyncio.to_thread(
+                _simulate_risk, recommendations, p["forecast_analysis"], p["temp"], p["humidity"],
+                soil_info, current_season, p["location"]
+            )
+        if request.show_alternatives and recommendations:
+            _add_explanations(recommendations)
+        
+        p["recommendations"] = recommendations
+        p["model_type"] = model_type
+        
+        # 5. Market prices per (crop, district), shared across plots
+        if request.include_market_prices:
+            for rec in recommendations[:5]:
+                key = (rec.get('crop'), p["district"])
+                if key[0] and key not in market_futures:
+                    market_futures[key] = asyncio.create_task(fetch_price(*key))
+    
+    deadline = asyncio.get_running_loop().time() + BATCH_ENHANCEMENT_TIMEOUT
+    
+    async def shared_result(future, default):
+        """Await a future shared between plots without cancelling it for the others."""
+        remaining = deadline - asyncio.get_running_loop().time()
+        try:
+            result = await asyncio.wait_for(asyncio.shield(future), timeout=max(remaining, 0.01))
+            return default if isinstance(result, Exception) else result
+        except Exception:
+            return default
+    
+    async def stream_results():
+        try:
+            for p in plots:
+                recommendations = p["recommendations"]
+                for rec in recommendations[:5]:
+                    future = market_futures.get((rec.get('crop'), p["district"]))
+                    if future is None:
+                        continue
+                    price_data = await shared_result(future, None)
+                    if isinstance(price_data, dict):
+                        rec['market_price'] = price_data
+                        rec['market_price_live'] = price_data.get('live', False)
+                
+                forecast_analysis = p["forecast_analysis"]
+                soil_info = p["soil_info"]
+                line = {
+                    "plot_id": p["plot_id"],
+                    "location": p["location"],
+                    "model_type": p["model_type"],
+                    "context": {
+                        "season": current_season,
+                        "soil_type": soil_info["soil"],
+                        "soil_zone": soil_info.get("zone", ""),
+                        "soil_source": p["soil_source"],
+                        "soil_params": {
+                            "ph": soil_info.get("ph", 7.0),
+                            "n": soil_info.get("n", 150),
+                            "p": soil_info.get("p", 50),
+                            "k": soil_info.get("k", 150)
+                        },
+                        "weather": {
+                            "temp": p["temp"],
+                            "humidity": p["humidity"],
+                            "desc": p["weather_desc"],
+                            "rain_days": forecast_analysis.get("rain_days", 0),
+                            "weather_risk": forecast_analysis.get("weather_risk", "Low")
+                        },
+                        "weather_history": await shared_result(history_futures[p["district"]], {}),
+                        "nasa_forecast": _plot_nasa_forecast(
+                            await shared_result(nasa_futures[p["nasa_cell"]], {}), p["nasa_lat"], p["nasa_lon"]
+                        )
+                    },
+                    "recommendations": recommendations
+                }
+                yield json.dumps(line, default=str) + "\n"
+            
+            execution_time = (datetime.now() - start_time).total_seconds()
+            logger.info(
+                f"Batch of {len(plots)} plots completed in {execution_time:.2f}s "
+                f"({len(soil_lookup)} soil, {len(weather_cells)} weather, {len(market_futures)} price lookups)"
+            )
+        finally:
+            # Client went away or stream finished: drop any shared fetch still running
+            for future in [*market_futures.values(), *history_futures.values(), *nasa_futures.values()]:
+                future.cancel()
+    
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
 
 class SoilResearchRequest(BaseModel):
     district: str
@@ -625,6 +1143,15 @@ async def research_soil_data(request: SoilResearchRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/soil/research/jobs/{job_id}")
+async def get_soil_research_job(job_id: str):
+    """Status of a background soil research job (queued, running, completed, failed)."""
+    job = get_soil_research_jobs().get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Research job not found")
+    return {"success": True, "job": job}
+
+
 @app.get("/soil/{district}")
 async def get_soil_info(district: str, mandal: Optional[str] = None, intelligent: bool = False):
     """
@@ -880,8 +1407,7 @@ async def get_weather_alerts(lat: float, lon: float):
     Get weather alerts for a location.
     """
     try:
-        weather = weather_service.get_current_weather(lat, lon)
-        forecast = weather_service.get_forecast(lat, lon)
+        weather, forecast = await weather_service.get_weather_snapshot_async(lat, lon)
         
         alert_service = get_alert_service()
         alerts = alert_service.generate_alerts(weather, forecast)
@@ -1157,7 +1683,7 @@ async def subscribe_to_crop_monitoring(request: SubscribeCropRequest):
         
         # Generate initial action plan
         monitoring_service = get_crop_monitoring_service()
-        action_plan = monitoring_service.generate_daily_action_plan(subscription)
+        action_plan = await monitoring_service.generate_daily_action_plan_async(subscription)
         
         # Send welcome SMS if phone provided
         welcome_sms_sent = False
@@ -1199,8 +1725,9 @@ async def get_my_crops(farmer_id: str):
         
         subscriptions = get_farmer_subscriptions(farmer_id)
         
-        # Enrich with current status
+        # Enrich with current status (one weather fetch per location for all subscriptions)
         monitoring_service = get_crop_monitoring_service()
+        weather_context = WeatherContext(monitoring_service)
         enriched = []
         
         for sub in subscriptions:
@@ -1210,11 +1737,12 @@ async def get_my_crops(farmer_id: str):
                 stage_info = monitoring_service.calculate_crop_stage(sowing_date, sub.get('crop'))
                 
                 # Get quick alerts
-                alerts = monitoring_service.generate_weather_alerts(
+                alerts = await monitoring_service.generate_weather_alerts_async(
                     sub.get('location', {}).get('lat', 17.385),
                     sub.get('location', {}).get('lon', 78.487),
                     sub.get('crop'),
-                    stage_info.get('current_stage')
+                    stage_info.get('current_stage'),
+                    context=weather_context
                 )
                 
                 enriched.append({
@@ -1287,7 +1815,7 @@ async def get_crop_monitoring_data(subscription_id: str):
         
         # Generate full action plan
         monitoring_service = get_crop_monitoring_service()
-        action_plan = monitoring_service.generate_daily_action_plan(subscription)
+        action_plan = await monitoring_service.generate_daily_action_plan_async(subscription)
         
         # Get ALL FAQs for this crop (not filtered by stage)
         faq_service = get_crop_faq_service()
@@ -1321,7 +1849,7 @@ async def get_daily_action_plan(subscription_id: str):
             raise HTTPException(status_code=404, detail="Subscription not found")
         
         monitoring_service = get_crop_monitoring_service()
-        action_plan = monitoring_service.generate_daily_action_plan(subscription)
+        action_plan = await monitoring_service.generate_daily_action_plan_async(subscription)
         
         return {
             "success": True,
@@ -1353,7 +1881,7 @@ async def get_weekly_action_plan(subscription_id: str):
             raise HTTPException(status_code=404, detail="Subscription not found")
         
         monitoring_service = get_crop_monitoring_service()
-        weekly_plan = monitoring_service.generate_weekly_plan(subscription)
+        weekly_plan = await monitoring_service.generate_weekly_plan_async(subscription)
         
         return {
             "success": True,
@@ -1385,7 +1913,7 @@ async def get_weather_alerts_for_crop(subscription_id: str):
         sowing_date = datetime.strptime(subscription.get('sowingDate', '2025-01-01'), '%Y-%m-%d')
         stage_info = monitoring_service.calculate_crop_stage(sowing_date, subscription.get('crop'))
         
-        alerts = monitoring_service.generate_weather_alerts(
+        alerts = await monitoring_service.generate_weather_alerts_async(
             subscription.get('location', {}).get('lat', 17.385),
             subscription.get('location', {}).get('lon', 78.487),
             subscription.get('crop'),
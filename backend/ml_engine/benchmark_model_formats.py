@@ -0,0 +1,52 @@
+"""
+Benchmark: scikit-learn joblib pickle vs flat-array forest export.
+Reports cold-start load time, memory held by the model, and per-request
+latency for scoring every crop at once.
+"""
+import sys
+import os
+import time
+import tracemalloc
+sys.path.append(os.path.dirname(__file__))
+
+import joblib
+from services.flat_forest import load_flat_model
+from services.ml_recommendation_service import MLRecommendationService, MODEL_PATH, FLAT_MODEL_DIR
+
+ITERATIONS = 200
+CASE = ("Black Cotton", "Kharif", 26, 75, 7.5, 200, 55, 320, 4)
+
+
+def measure_load(loader, path):
+    tracemalloc.start()
+    start = time.perf_counter()
+    data = loader(path)
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return data, elapsed, current
+
+
+def measure_latency(service, model_data):
+    service.model_data = model_data
+    service.predict_all_crops(*CASE)  # warm-up
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        service.predict_all_crops(*CASE)
+    return (time.perf_counter() - start) / ITERATIONS * 1000
+
+
+sk_data, sk_load, sk_mem = measure_load(joblib.load, MODEL_PATH)
+flat_data, flat_load, flat_mem = measure_load(load_flat_model, FLAT_MODEL_DIR)
+
+service = MLRecommendationService()
+sk_latency = measure_latency(service, sk_data)
+flat_latency = measure_latency(service, flat_data)
+
+print("=" * 60)
+print(f"MODEL FORMAT BENCHMARK ({len(sk_data['crops'])} crops, {ITERATIONS} iterations)")
+print("=" * 60)
+print(f"{'':22}{'joblib':>14}{'flat':>14}")
+print(f"{'Cold load (s)':22}{sk_load:14.3f}{flat_load:14.3f}")
+print(f"{'Model memory (MB)':22}{sk_mem / 1e6:14.1f}{flat_mem / 1e6:14.1f}")
+print(f"{'Scoring (ms/request)':22}{sk_latency:14.2f}{flat_latency:14.2f}")
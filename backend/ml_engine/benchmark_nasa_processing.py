@@ -0,0 +1,130 @@
+"""
+Benchmark: NASA POWER historical processing, per-date loop vs vectorized.
+Runs both implementations of _process_historical_data on a 5-year daily
+response and checks they give identical monthly statistics.
+
+Uses data/nasa_power_sample.json when present. Record one with
+    python benchmark_nasa_processing.py --record
+otherwise a synthetic response of the same shape (with -999 fill values)
+is generated.
+"""
+import sys
+import os
+import json
+import time
+import random
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(__file__))
+
+from services.nasa_power_service import NASAPowerService
+
+ITERATIONS = 50
+SAMPLE_PATH = os.path.join(os.path.dirname(__file__), 'data', 'nasa_power_sample.json')
+LAT, LON = 16.29, 80.45  # Guntur
+
+
+def record_sample():
+    import requests
+    end = datetime.now() - timedelta(days=1)
+    response = requests.get(NASAPowerService.BASE_URL, params={
+        "parameters": ",".join(NASAPowerService.PARAMETERS),
+        "community": "AG",
+        "longitude": LON,
+        "latitude": LAT,
+        "start": (end - timedelta(days=365 * 5)).strftime("%Y%m%d"),
+        "end": end.strftime("%Y%m%d"),
+        "format": "JSON"
+    }, timeout=60)
+    response.raise_for_status()
+    with open(SAMPLE_PATH, 'w') as f:
+        json.dump(response.json(), f)
+    print(f"Recorded NASA POWER response to {SAMPLE_PATH}")
+
+
+def synthetic_sample():
+    rng = random.Random(42)
+    base = {"T2M_MAX": 33, "T2M_MIN": 22, "T2M": 27, "PRECTOTCORR": 3, "RH2M": 70, "ALLSKY_SFC_SW_DWN": 18, "WS2M": 2}
+    end = datetime.now() - timedelta(days=1)
+    day = end - timedelta(days=365 * 5)
+    parameters = {p: {} for p in NASAPowerService.PARAMETERS}
+    while day <= end:
+        key = day.strftime("%Y%m%d")
+        for param, centre in base.items():
+            value = round(max(0.0, rng.gauss(centre, centre * 0.15)), 2)
+            parameters[param][key] = -999.0 if rng.random() < 0.01 else value
+        day += timedelta(days=1)
+    return {"properties": {"parameter": parameters}}
+
+
+def legacy_process(service, raw_data, target_months=None):
+    """The original per-date implementation, kept for comparison."""
+    parameters = raw_data.get("properties", {}).get("parameter", {})
+    monthly_data = {m: {p: [] for p in service.PARAMETERS} for m in range(1, 13)}
+    sample_param = list(parameters.keys())[0]
+    for date_str in list(parameters.get(sample_param, {}).keys()):
+        try:
+            month = datetime.strptime(date_str, "%Y%m%d").month
+            for param in service.PARAMETERS:
+                value = parameters.get(param, {}).get(date_str)
+                if value is not None and value > -999:
+                    monthly_data[month][param].append(value)
+        except:
+            continue
+
+    monthly_averages = {}
+    for month in range(1, 13):
+        if target_months and month not in target_months:
+            continue
+        month_stats = {}
+        for param in service.PARAMETERS:
+            values = monthly_data[month][param]
+            if values:
+                month_stats[param] = {
+                    "avg": round(sum(values) / len(values), 1),
+                    "min": round(min(values), 1),
+                    "max": round(max(values), 1)
+                }
+            else:
+                month_stats[param] = {"avg": None, "min": None, "max": None}
+        monthly_averages[month] = month_stats
+    return monthly_averages
+
+
+def time_it(fn):
+    fn()  # warm-up
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        fn()
+    return (time.perf_counter() - start) / ITERATIONS * 1000
+
+
+if "--record" in sys.argv:
+    record_sample()
+
+if os.path.exists(SAMPLE_PATH):
+    with open(SAMPLE_PATH) as f:
+        raw = json.load(f)
+    label = "recorded"
+else:
+    raw = synthetic_sample()
+    label = "synthetic"
+
+service = NASAPowerService()
+days = len(next(iter(raw["properties"]["parameter"].values())))
+
+print("=" * 60)
+print(f"NASA POWER PROCESSING BENCHMARK ({label}, {days} days, {ITERATIONS} iterations)")
+print("=" * 60)
+
+for target_months in (None, [6, 7, 8]):
+    new = service._process_historical_data(raw, target_months)["monthly_averages"]
+    old = legacy_process(service, raw, target_months)
+    if new != old:
+        print(f"❌ Output mismatch (target_months={target_months})")
+        sys.exit(1)
+print("✅ Vectorized output identical to the per-date loop")
+
+before = time_it(lambda: legacy_process(service, raw))
+after = time_it(lambda: service._process_historical_data(raw))
+print(f"   Per-date loop: {before:8.2f} ms")
+print(f"   Vectorized:    {after:8.2f} ms  ({before / after:.1f}x faster)")
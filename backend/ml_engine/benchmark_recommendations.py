@@ -0,0 +1,61 @@
+"""
+Micro-benchmark for ML crop scoring.
+Compares the per-crop path (predict_suitability for every crop) against the
+batched path (predict_all_crops) and checks that both give identical output.
+"""
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(__file__))
+
+from services.ml_recommendation_service import MLRecommendationService
+
+ITERATIONS = 10
+
+CASES = [
+    ("Loamy", "Zaid", 28, 65, 6.5, 150, 40, 120, 1),
+    ("Black Cotton", "Kharif", 26, 75, 7.5, 200, 55, 320, 4),
+    ("Sandy Loam", "Rabi", 18, 55, 6.0, 100, 50, 150, 0),
+    ("Unknown Soil", "Kharif", 31, 80, 7.0, 150, 50, 150, 2),
+]
+
+service = MLRecommendationService()
+if not service.model_data:
+    print("❌ ML model not found - train it first with training/train_with_agritech.py")
+    sys.exit(1)
+
+crops = service.model_data['crops']
+
+
+def per_crop(case):
+    return [
+        (crop,) + service.predict_suitability(*case, crop)
+        for crop in crops
+    ]
+
+
+def batched(case):
+    return service.predict_all_crops(*case)
+
+
+def time_it(fn, case):
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        fn(case)
+    return (time.perf_counter() - start) / ITERATIONS * 1000
+
+
+print("=" * 60)
+print(f"ML SCORING BENCHMARK ({len(crops)} crops, {ITERATIONS} iterations)")
+print("=" * 60)
+
+for case in CASES:
+    assert per_crop(case) == batched(case), f"Output mismatch for {case[:2]}"
+
+    before = time_it(per_crop, case)
+    after = time_it(batched, case)
+    print(f"\n{case[0]} / {case[1]}")
+    print(f"   Per-crop: {before:8.2f} ms/request")
+    print(f"   Batched:  {after:8.2f} ms/request  ({before / after:.1f}x faster)")
+
+print("\n✅ Batched output identical to per-crop output for all cases")
@@ -0,0 +1,170 @@
+"""
+Load test: the ML engine against the offline upstream stand-in.
+Drives /recommend and /weather-alerts (plus /daily-plan when given a
+subscription id) with N concurrent clients and reports throughput and
+p50/p95/p99 latency per endpoint, the upstream calls the stand-in served and
+the circuit breaker states at the end.
+
+In-process by default: the app and services/upstream_standin.py share one
+event loop and no sockets are opened. Against running servers:
+    python -m services.upstream_standin --port 8900
+    UPSTREAM_STANDIN_URL=http://127.0.0.1:8900 uvicorn app:app --port 8000
+    python benchmark_upstream_load.py --target http://127.0.0.1:8000 --standin http://127.0.0.1:8900
+
+Stand-in behaviour can be changed per run, e.g. a NASA POWER outage:
+    python benchmark_upstream_load.py --set nasa_power.error_rate=1.0
+"""
+import sys
+import os
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+sys.path.append(os.path.dirname(__file__))
+
+import httpx
+import numpy as np
+
+DISTRICTS = [
+    ("Guntur", 16.30, 80.44), ("Krishna", 16.51, 80.64), ("Kurnool", 15.83, 78.04),
+    ("Anantapur", 14.68, 77.60), ("Warangal", 17.97, 79.59), ("Nalgonda", 17.05, 79.27),
+    ("Karimnagar", 18.44, 79.13), ("East Godavari", 17.00, 82.24),
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load test the ML engine against the upstream stand-in")
+    parser.add_argument("--requests", type=int, default=200, help="total requests")
+    parser.add_argument("--concurrency", type=int, default=20, help="concurrent clients")
+    parser.add_argument("--target", help="running ML engine base URL (default: in-process)")
+    parser.add_argument("--standin", help="running stand-in base URL, for --set and its stats")
+    parser.add_argument("--subscription-id", help="also drive /daily-plan/{id} (needs MongoDB)")
+    parser.add_argument("--set", action="append", default=[], metavar="UPSTREAM.FIELD=VALUE",
+                        help="stand-in behaviour override, e.g. agmarknet.latency_ms=5000")
+    parser.add_argument("--seed", type=int, default=7)
+    return parser.parse_args()
+
+
+def behaviour_overrides(settings):
+    overrides = {}
+    for setting in settings:
+        key, value = setting.split("=", 1)
+        upstream, field = key.rsplit(".", 1)
+        overrides.setdefault(upstream, {})[field] = float(value)
+    return overrides
+
+
+def make_workload(args):
+    """(endpoint label, method, path, json body) per request, spread over many grid cells."""
+    rng = random.Random(args.seed)
+    workload = []
+    for _ in range(args.requests):
+        name, lat, lon = rng.choice(DISTRICTS)
+        lat, lon = round(lat + rng.uniform(-0.5, 0.5), 4), round(lon + rng.uniform(-0.5, 0.5), 4)
+        roll = rng.random()
+        if args.subscription_id and roll < 0.2:
+            workload.append(("/daily-plan", "GET", f"/daily-plan/{args.subscription_id}", None))
+        elif roll < 0.6:
+            workload.append(("/recommend", "POST", "/recommend",
+                             {"location_name": name, "lat": lat, "lon": lon}))
+        else:
+            workload.append(("/weather-alerts", "GET", f"/weather-alerts?lat={lat}&lon={lon}", None))
+    return workload
+
+
+async def drive(client, workload, concurrency):
+    queue = list(reversed(workload))
+    samples = []  # (label, status, seconds)
+
+    async def worker():
+        while queue:
+            label, method, path, body = queue.pop()
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body)
+                status = response.status_code
+            except Exception:
+                status = 0
+            samples.append((label, status, time.perf_counter() - start))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return samples, time.perf_counter() - start
+
+
+def report(samples, elapsed):
+    print(f"{'endpoint':18}{'n':>6}{'errors':>8}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    groups = {}
+    for label, status, seconds in samples:
+        groups.setdefault(label, []).append((status, seconds))
+    groups["all"] = [(status, seconds) for _, status, seconds in samples]
+
+    for label, rows in groups.items():
+        latencies = np.array([seconds for _, seconds in rows]) * 1000
+        errors = sum(1 for status, _ in rows if not 200 <= status < 300)
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        print(f"{label:18}{len(rows):6d}{errors:8d}{len(rows) / elapsed:9.1f}{p50:10.0f}{p95:10.0f}{p99:10.0f}")
+    return sum(1 for _, status, _ in samples if not 200 <= status < 300)
+
+
+def print_upstreams(standin_stats, upstream_status):
+    print("\nUpstream calls served by the stand-in:")
+    for upstream, outcomes in standin_stats.get("served", {}).items():
+        print(f"   {upstream:14} " + ", ".join(f"{outcome}={count}" for outcome, count in outcomes.items()))
+    print("Circuit breakers:")
+    for upstream, status in upstream_status.get("upstreams", {}).items():
+        print(f"   {upstream:14} {status['state']}")
+
+
+async def run_in_process(args, workload):
+    os.environ["UPSTREAM_STANDIN_URL"] = "inprocess"
+    os.environ.setdefault("OPENWEATHER_KEY", "standin")  # Without a key the weather service serves mock data
+    # Start cold and keep data/ clean
+    os.environ["NASA_CACHE_DIR"] = tempfile.mkdtemp(prefix="nasa_cache_")
+    os.environ["PRICE_CACHE_DB"] = os.path.join(tempfile.mkdtemp(prefix="price_cache_"), "prices.sqlite3")
+    from services import upstream_standin
+    from app import app
+
+    upstream_standin.configure(behaviour_overrides(args.set))
+
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://ml-engine",
+                                     timeout=120) as client:
+            samples, elapsed = await drive(client, workload, args.concurrency)
+            upstream_status = (await client.get("/upstreams/status")).json()
+    return samples, elapsed, await upstream_standin.standin_stats(), upstream_status
+
+
+async def run_remote(args, workload):
+    async with httpx.AsyncClient(timeout=120) as control:
+        if args.standin and args.set:
+            await control.post(f"{args.standin}/_standin/config", json=behaviour_overrides(args.set))
+        async with httpx.AsyncClient(base_url=args.target, timeout=120,
+                                     limits=httpx.Limits(max_connections=args.concurrency)) as client:
+            samples, elapsed = await drive(client, workload, args.concurrency)
+            upstream_status = (await client.get("/upstreams/status")).json()
+        standin_stats = (await control.get(f"{args.standin}/_standin/stats")).json() if args.standin else {}
+    return samples, elapsed, standin_stats, upstream_status
+
+
+args = parse_args()
+workload = make_workload(args)
+runner = run_remote if args.target else run_in_process
+samples, elapsed, standin_stats, upstream_status = asyncio.run(runner(args, workload))
+
+print("=" * 60)
+print(f"UPSTREAM STAND-IN LOAD TEST ({args.requests} requests, {args.concurrency} concurrent, "
+      f"{'in-process' if not args.target else args.target})")
+print("=" * 60)
+if args.set:
+    print(f"Stand-in overrides: {json.dumps(behaviour_overrides(args.set))}")
+errors = report(samples, elapsed)
+print_upstreams(standin_stats, upstream_status)
+print(f"\nWall time {elapsed:.1f}s, {len(samples) / elapsed:.1f} req/s overall")
+
+if errors:
+    print(f"❌ {errors} request(s) failed")
+    sys.exit(1)
+print("✅ All requests succeeded")
@@ -0,0 +1,82 @@
+"""
+Benchmark: OpenWeather upstream calls in snapshot vs precision mode.
+Replaces the weather HTTP client with a counting fake (fixed simulated latency) and runs
+the same lookups through WeatherService and CropMonitoringService in each
+mode, with the weather cache cleared between runs.
+"""
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(__file__))
+
+import httpx
+import services.weather_service as weather_service_module
+from services.weather_service import WeatherService
+from services.weather_cache import get_weather_cache
+from services.crop_monitoring_service import CropMonitoringService
+
+UPSTREAM_LATENCY = 0.05  # seconds per simulated OpenWeather call
+LOCATIONS = [(17.3850 + i * 0.1, 78.4867 + i * 0.1) for i in range(10)]
+
+
+def fake_payload(url):
+    now = int(time.time())
+    slot = {
+        "dt": now,
+        "main": {"temp": 29.5, "feels_like": 31.0, "humidity": 62, "pressure": 1008},
+        "weather": [{"main": "Clouds", "description": "scattered clouds", "icon": "03d"}],
+        "wind": {"speed": 3.2},
+        "rain": {"3h": 0.4},
+        "visibility": 10000
+    }
+    if url.endswith("/forecast"):
+        return {"list": [dict(slot, dt=now + i * 3 * 3600) for i in range(40)]}
+    return {k: v for k, v in slot.items() if k != "dt"}
+
+
+calls = {"current": 0, "forecast": 0}
+
+def fake_handler(request):
+    path = request.url.path
+    calls["forecast" if path.endswith("/forecast") else "current"] += 1
+    time.sleep(UPSTREAM_LATENCY)
+    return httpx.Response(200, json=fake_payload(path))
+
+class FakeClients:
+    def sync_client(self, service):
+        return httpx.Client(transport=httpx.MockTransport(fake_handler))
+
+weather_service_module.get_http_clients = lambda: FakeClients()
+
+
+def run(mode):
+    os.environ["WEATHER_MODE"] = mode
+    get_weather_cache().clear()
+    calls.update(current=0, forecast=0)
+
+    weather = WeatherService(api_key="benchmark")
+    monitoring = CropMonitoringService()
+    monitoring.weather_service = weather
+
+    start = time.perf_counter()
+    for lat, lon in LOCATIONS:
+        weather.get_weather_snapshot(lat, lon)
+        monitoring._get_weather_data(lat, lon)
+    elapsed = time.perf_counter() - start
+    return calls["current"], calls["forecast"], elapsed
+
+
+results = {mode: run(mode) for mode in ("precision", "snapshot")}
+
+print("=" * 60)
+print(f"OPENWEATHER CALL BENCHMARK ({len(LOCATIONS)} cells, {UPSTREAM_LATENCY * 1000:.0f} ms/call)")
+print("=" * 60)
+print(f"{'':22}{'current':>10}{'forecast':>10}{'total':>8}{'time (s)':>10}")
+for mode, (current, forecast, elapsed) in results.items():
+    print(f"{mode:22}{current:10}{forecast:10}{current + forecast:8}{elapsed:10.2f}")
+
+precision_total = sum(results["precision"][:2])
+snapshot_total = sum(results["snapshot"][:2])
+print(f"\nUpstream calls reduced by {(1 - snapshot_total / precision_total) * 100:.0f}%")
+print("✅ Snapshot mode uses one call per cell" if snapshot_total == len(LOCATIONS)
+      else "❌ Snapshot mode made extra upstream calls")
@@ -0,0 +1,94 @@
+"""
+Per-worker memory report: independent model loading vs preload + mmap.
+
+Starts N worker processes the way a multi-worker deployment would, has each
+serve one recommendation, then reads /proc/<pid>/smaps_rollup while all of
+them are alive (Linux only):
+    RSS  resident pages (shared pages counted in every worker)
+    PSS  proportional share (shared pages split between workers)
+    USS  private pages (what each extra worker really costs)
+
+Usage: python benchmark_worker_memory.py [n_workers]
+"""
+import sys
+import os
+import multiprocessing as mp
+sys.path.append(os.path.dirname(__file__))
+
+CASE = dict(soil_type="Black Cotton", season="Kharif", temp=26, humidity=75,
+            soil_ph=7.5, soil_n=200, soil_p=55, soil_k=320, forecast={"rain_days": 4})
+
+
+def read_memory(pid):
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(':') and parts[1].isdigit():
+                fields[parts[0][:-1]] = int(parts[1]) / 1024  # MB
+    return {
+        "rss": fields.get("Rss", 0),
+        "pss": fields.get("Pss", 0),
+        "uss": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+    }
+
+
+def serve(env, ready, done, preloaded=None):
+    """Worker body: load (unless preloaded) and answer one request."""
+    os.environ.update(env)
+    if preloaded is None:
+        from services.preload import preload_services
+        from services.ml_recommendation_service import MLRecommendationService
+        preload_services()
+        preloaded = MLRecommendationService()
+    preloaded.get_recommendations(**CASE)
+    ready.put(os.getpid())
+    done.wait()
+
+
+def run(label, n_workers, env, preload):
+    os.environ.update(env)
+    ctx = mp.get_context("fork" if preload else "spawn")
+    ready, done = ctx.Queue(), ctx.Event()
+
+    service = None
+    if preload:
+        from services.preload import preload_services, freeze_for_fork
+        from services.ml_recommendation_service import MLRecommendationService
+        preload_services()
+        service = MLRecommendationService()
+        freeze_for_fork()
+
+    workers = [ctx.Process(target=serve, args=(env, ready, done, service)) for _ in range(n_workers)]
+    for w in workers:
+        w.start()
+    pids = [ready.get(timeout=300) for _ in workers]
+
+    stats = [read_memory(pid) for pid in pids]
+    done.set()
+    for w in workers:
+        w.join()
+
+    avg = {k: sum(s[k] for s in stats) / len(stats) for k in ("rss", "pss", "uss")}
+    total_pss = sum(s["pss"] for s in stats)
+    print(f"{label:32}{avg['rss']:10.1f}{avg['pss']:10.1f}{avg['uss']:10.1f}{total_pss:12.1f}")
+
+
+if __name__ == "__main__":
+    if not os.path.exists("/proc/self/smaps_rollup"):
+        print("❌ /proc/<pid>/smaps_rollup not available (Linux only)")
+        sys.exit(1)
+
+    n_workers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    print("=" * 74)
+    print(f"PER-WORKER MEMORY ({n_workers} workers, MB)")
+    print("=" * 74)
+    print(f"{'Mode':32}{'RSS':>10}{'PSS':>10}{'USS':>10}{'Total PSS':>12}")
+
+    # Spawned workers each load everything, as uvicorn --workers does today
+    run("joblib, per-worker load", n_workers,
+        {"ML_MODEL_FORMAT": "joblib", "ML_MODEL_MMAP": "false"}, preload=False)
+    run("flat, per-worker load", n_workers,
+        {"ML_MODEL_FORMAT": "flat", "ML_MODEL_MMAP": "false"}, preload=False)
+    run("flat + mmap, preload + fork", n_workers,
+        {"ML_MODEL_FORMAT": "flat", "ML_MODEL_MMAP": "true"}, preload=True)
@@ -0,0 +1,23 @@
+"""
+Gunicorn config for the ML engine: uvicorn workers forked from a preloaded master.
+
+    gunicorn app:app -c gunicorn.conf.py
+
+The app (and with it the crop recommender, memory-mapped) is imported once
+in the master; knowledge bases are preloaded and frozen before workers fork,
+so all workers share those pages. See services/preload.py.
+"""
+import os
+import multiprocessing
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8001')}"
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = 60
+
+
+def when_ready(server):
+    from services.preload import preload_services, freeze_for_fork
+    preload_services()
+    freeze_for_fork()
@@ -0,0 +1,107 @@
+"""
+Migrate data/price_cache/*.json into the SQLite price cache
+
+The old cache stored each entry as <md5(commodity_state_district_YYYYMMDD_HH)[:16]>.json,
+so the key is not in the file. It is recovered by hashing every candidate
+(commodity, state, district) for the hour the entry was written: commodities
+from COMMODITY_MAPPINGS / MSP_PRICES / crop_profiles.json, states and
+districts from regions_soil_db.json and Agritech.csv. Entries whose key cannot
+be recovered (free-text districts) are reported and left in place.
+
+Rows keep their original timestamp, so entries already past the retention
+window are dropped by the next sweep - run with --include-expired to keep
+them anyway until then.
+
+Usage (from backend/ml_engine):
+    python scripts/migrate_price_cache.py [--delete] [--include-expired]
+"""
+import sys
+import os
+import json
+import glob
+import time
+import hashlib
+import argparse
+from datetime import datetime
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import pandas as pd
+
+from services.price_cache import get_price_cache
+from services.market_price_service import COMMODITY_MAPPINGS, MSP_PRICES
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+OLD_CACHE_DIR = os.path.normpath(os.path.join(DATA_DIR, 'price_cache'))
+
+
+def candidate_keys():
+    """(commodity, state, district) combinations the old code could have hashed."""
+    with open(os.path.join(DATA_DIR, 'crop_profiles.json')) as f:
+        commodities = set(COMMODITY_MAPPINGS) | set(MSP_PRICES) | set(json.load(f))
+    with open(os.path.join(DATA_DIR, 'regions_soil_db.json')) as f:
+        regions = json.load(f)
+    agritech = pd.read_csv(os.path.join(DATA_DIR, 'Agritech.csv'), usecols=['state', 'district'])
+
+    states = {"Andhra Pradesh", "Telangana"} | set(regions)
+    districts = {d for ds in regions.values() for d in ds} | set(agritech['district'].dropna())
+    districts |= {d.lower() for d in districts} | {d.title() for d in districts}
+    return [(c, s, d) for c in commodities for s in states for d in [None, *districts]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move the JSON price cache into SQLite")
+    parser.add_argument("--delete", action="store_true", help="remove JSON files once migrated")
+    parser.add_argument("--include-expired", action="store_true", help="migrate entries past the retention window")
+    args = parser.parse_args()
+
+    cache = get_price_cache()
+    files = sorted(glob.glob(os.path.join(OLD_CACHE_DIR, '*.json')))
+    print("=" * 60)
+    print(f"PRICE CACHE MIGRATION: {len(files)} JSON files -> {os.path.abspath(cache.path)}")
+    print("=" * 60)
+    if not files:
+        return
+
+    # Group files by the hour bucket that was part of their key
+    by_hour = {}
+    for path in files:
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+            stored_at = datetime.fromisoformat(entry['timestamp'])
+        except Exception as e:
+            print(f"⚠️ Skipping unreadable {os.path.basename(path)}: {e}")
+            continue
+        key = os.path.basename(path)[:-len('.json')]
+        by_hour.setdefault(stored_at.strftime('%Y%m%d_%H'), {})[key] = (path, stored_at.timestamp(), entry['data'])
+
+    candidates = candidate_keys()
+    cutoff = time.time() - cache.retention_seconds
+    migrated, expired, unresolved = [], 0, []
+    for hour, entries in by_hour.items():
+        for commodity, state, district in candidates:
+            key = hashlib.md5(f"{commodity}_{state}_{district or 'all'}_{hour}".encode()).hexdigest()[:16]
+            if key not in entries:
+                continue
+            path, stored_at, data = entries.pop(key)
+            if stored_at < cutoff and not args.include_expired:
+                expired += 1
+            else:
+                cache.set(commodity, state, district, data, stored_at=stored_at)
+            migrated.append(path)
+            if not entries:
+                break
+        unresolved.extend(path for path, _, _ in entries.values())
+
+    print(f"✅ Recovered {len(migrated)} keys ({len(migrated) - expired} written, {expired} already expired)")
+    if unresolved:
+        print(f"⚠️ {len(unresolved)} file(s) with unrecoverable keys left in {OLD_CACHE_DIR}")
+
+    if args.delete:
+        for path in migrated:
+            os.remove(path)
+        print(f"   Deleted {len(migrated)} migrated JSON file(s)")
+
+
+if __name__ == "__main__":
+    main()
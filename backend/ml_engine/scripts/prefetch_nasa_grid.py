@@ -0,0 +1,116 @@
+"""
+Prefetch NASA POWER history for every grid cell we serve
+
+Collects coordinates for
+- every district in data/regions_soil_db.json (Agritech.csv centroid, else
+  OpenWeather geocoding when OPENWEATHER_KEY is set)
+- every ACTIVE crop subscription in MongoDB (skipped when unreachable)
+snaps them to the NASA POWER grid and loads each distinct cell through
+NASAPowerService, which fills the memory and .npz cache tiers. Cells that are
+already cached cost nothing, so the script is safe to run from cron.
+
+Usage (from backend/ml_engine):
+    python scripts/prefetch_nasa_grid.py [--concurrency 4] [--dry-run]
+"""
+import sys
+import os
+import time
+import asyncio
+import argparse
+import logging
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from services.soil_service import SoilService
+from services.geocoding import GeocodingService
+from services.http_clients import get_http_clients
+from services.nasa_power_service import NASAPowerService, get_nasa_power_service
+
+PSEUDO_STATES = {"India", "districts"}  # Top-level keys in regions_soil_db.json that are not states
+
+
+def district_locations():
+    """(label, lat, lon) for each district in regions_soil_db.json that can be located."""
+    soil = SoilService()
+    geocoder = GeocodingService()
+    located, missing = [], []
+
+    for state, districts in soil.raw_data.items():
+        for district in districts:
+            agritech = soil._lookup_agritech(district)
+            if agritech and agritech.get("lat") is not None:
+                located.append((district, agritech["lat"], agritech["lon"]))
+                continue
+
+            coords = None
+            if geocoder.api_key:
+                query = district if state in PSEUDO_STATES else f"{district}, {state}"
+                coords = geocoder.get_coordinates(query)
+            if coords:
+                located.append((district, coords["lat"], coords["lon"]))
+            else:
+                missing.append(district)
+
+    if missing:
+        print(f"⚠️ No coordinates for {len(missing)} district(s): {', '.join(missing)}")
+    return located
+
+
+def subscription_locations():
+    """(label, lat, lon) for each active subscription; empty when MongoDB is unavailable."""
+    try:
+        from database import get_active_subscription_locations
+        return [("subscription", loc["lat"], loc["lon"]) for loc in get_active_subscription_locations()]
+    except Exception as e:
+        print(f"⚠️ Skipping subscriptions (database unavailable: {e})")
+        return []
+
+
+async def prefetch(cells, concurrency):
+    service = get_nasa_power_service()
+    semaphore = asyncio.Semaphore(concurrency)
+    results = {"NASA_POWER": 0, "FALLBACK": 0}
+
+    async def warm(cell):
+        async with semaphore:
+            data = await service.get_historical_weather_async(*cell)
+            results["NASA_POWER" if data.get("source") == "NASA_POWER" else "FALLBACK"] += 1
+
+    await get_http_clients().startup()
+    try:
+        await asyncio.gather(*(warm(cell) for cell in cells))
+    finally:
+        await get_http_clients().shutdown()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm the NASA POWER history cache per grid cell")
+    parser.add_argument("--concurrency", type=int, default=4, help="parallel NASA POWER requests")
+    parser.add_argument("--dry-run", action="store_true", help="list the cells without fetching")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    points = district_locations() + subscription_locations()
+    cells = sorted({NASAPowerService.snap_to_grid(lat, lon) for _, lat, lon in points})
+
+    print("=" * 60)
+    print(f"NASA POWER PREFETCH: {len(points)} locations -> {len(cells)} grid cells")
+    print("=" * 60)
+
+    if args.dry_run:
+        for lat, lon in cells:
+            print(f"   {lat:8.3f} {lon:9.3f}")
+        return
+
+    start = time.perf_counter()
+    results = asyncio.run(prefetch(cells, args.concurrency))
+    elapsed = time.perf_counter() - start
+    print(f"✅ Cached {results['NASA_POWER']} cell(s) in {elapsed:.1f}s")
+    if results["FALLBACK"]:
+        print(f"❌ {results['FALLBACK']} cell(s) failed (fallback data, not cached)")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
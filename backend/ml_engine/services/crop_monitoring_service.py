@@ -6,10 +6,11 @@ and crop growth stage analysis.
 
 import os
 import json
+import asyncio
 import logging
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
-import requests
+from services.weather_service import WeatherService
 
 logger = logging.getLogger(__name__)
 
@@ -26,6 +27,41 @@ FAQS_PATH = os.path.join(DATA_DIR, 'crop_faqs_complete.json')  # Comprehensive F
 OPENWEATHER_API_KEY = os.getenv('OPENWEATHER_API_KEY', 'dd587855fbdac207034b854ea3e03c00')
 
 
+class WeatherContext:
+    """
+    Request-scoped weather: fetched once per grid cell and shared by every
+    step of a plan (alerts, tasks, irrigation, forecast actions), and by all
+    subscriptions handled in the same request.
+    """
+    
+    def __init__(self, service: 'CropMonitoringService'):
+        self._service = service
+        self._weather: Dict[tuple, Dict] = {}
+        self._pending: Dict[tuple, asyncio.Task] = {}
+    
+    def _key(self, lat: float, lon: float) -> tuple:
+        return self._service.weather_service.cache.cell(lat, lon)
+    
+    def get(self, lat: float, lon: float) -> Dict:
+        key = self._key(lat, lon)
+        if key not in self._weather:
+            self._weather[key] = self._service._get_weather_data(lat, lon)
+        return self._weather[key]
+    
+    async def get_async(self, lat: float, lon: float) -> Dict:
+        key = self._key(lat, lon)
+        if key in self._weather:
+            return self._weather[key]
+        # Concurrent plans in one request share the in-progress fetch
+        task = self._pending.get(key)
+        if task is None:
+            task = self._pending[key] = asyncio.ensure_future(self._service._get_weather_data_async(lat, lon))
+        weather = await task
+        self._weather[key] = weather
+        self._pending.pop(key, None)
+        return weather
+
+
 class CropMonitoringService:
     """
     Intelligent crop monitoring service that provides:
@@ -42,8 +78,7 @@ class CropMonitoringService:
         self.weather_impacts = self._load_json(WEATHER_IMPACTS_PATH)
         self.pest_disease_db = self._load_json(PEST_DISEASE_PATH)
         self.faqs = self._load_json(FAQS_PATH)
-        self._weather_cache = {}
-        self._cache_timeout = 10800  # 3 hours
+        self.weather_service = WeatherService(api_key=OPENWEATHER_API_KEY)
         logger.info("CropMonitoringService initialized with comprehensive data")
     
     def _load_json(self, path: str) -> Dict:
@@ -58,61 +93,48 @@ class CropMonitoringService:
     def _get_weather_data(self, lat: float, lon: float) -> Dict:
         """
         Fetch current weather and 5-day forecast from OpenWeather API
-        Implements caching to reduce API calls
+        Reads through the shared geo-quantized weather cache
         """
-        cache_key = f"{lat:.2f}_{lon:.2f}"
-        now = datetime.now()
-        
-        # Check cache
-        if cache_key in self._weather_cache:
-            cached = self._weather_cache[cache_key]
-            if (now - cached['timestamp']).seconds < self._cache_timeout:
-                return cached['data']
-        
         try:
-            # Current weather
-            current_url = f"https://api.openweathermap.org/data/2.5/weather?lat={lat}&lon={lon}&appid={OPENWEATHER_API_KEY}&units=metric"
-            current_res = requests.get(current_url, timeout=10)
-            current_data = current_res.json()
-            
-            # 5-day forecast (3-hour intervals)
-            forecast_url = f"https://api.openweathermap.org/data/2.5/forecast?lat={lat}&lon={lon}&appid={OPENWEATHER_API_KEY}&units=metric"
-            forecast_res = requests.get(forecast_url, timeout=10)
-            forecast_data = forecast_res.json()
-            
-            # Process forecast into daily summaries
-            daily_forecast = self._process_forecast(forecast_data)
-            
-            weather = {
-                'current': {
-                    'temp': current_data.get('main', {}).get('temp', 25),
-                    'temp_min': current_data.get('main', {}).get('temp_min', 20),
-                    'temp_max': current_data.get('main', {}).get('temp_max', 30),
-                    'humidity': current_data.get('main', {}).get('humidity', 60),
-                    'wind_speed': current_data.get('wind', {}).get('speed', 5) * 3.6,  # Convert m/s to km/h
-                    'description': current_data.get('weather', [{}])[0].get('description', 'clear'),
-                    'icon': current_data.get('weather', [{}])[0].get('icon', '01d'),
-                    'rainfall_1h': current_data.get('rain', {}).get('1h', 0),
-                    'rainfall_3h': current_data.get('rain', {}).get('3h', 0),
-                    'visibility': current_data.get('visibility', 10000)
-                },
-                'forecast': daily_forecast,
-                'next_6h_rain': self._calculate_next_hours_rain(forecast_data, 6),
-                'next_24h_rain': self._calculate_next_hours_rain(forecast_data, 24)
-            }
-            
-            # Cache the result
-            self._weather_cache[cache_key] = {
-                'timestamp': now,
-                'data': weather
-            }
-            
-            return weather
-            
+            # Current conditions + 5-day forecast (3-hour intervals), one upstream call in snapshot mode
+            current_data, forecast_data = self.weather_service.get_raw_snapshot(lat, lon)
+            return self._build_weather_data(current_data, forecast_data)
         except Exception as e:
             logger.error(f"Weather API error: {e}")
             return self._get_default_weather()
     
+    async def _get_weather_data_async(self, lat: float, lon: float) -> Dict:
+        """Async version of _get_weather_data (pooled client, does not block the event loop)"""
+        try:
+            current_data, forecast_data = await self.weather_service.get_raw_snapshot_async(lat, lon)
+            return self._build_weather_data(current_data, forecast_data)
+        except Exception as e:
+            logger.error(f"Weather API error (async): {e}")
+            return self._get_default_weather()
+    
+    def _build_weather_data(self, current_data: Dict, forecast_data: Dict) -> Dict:
+        """Shape raw OpenWeather current + forecast payloads for the planners"""
+        # Process forecast into daily summaries
+        daily_forecast = self._process_forecast(forecast_data)
+        
+        return {
+            'current': {
+                'temp': current_data.get('main', {}).get('temp', 25),
+                'temp_min': current_data.get('main', {}).get('temp_min', 20),
+                'temp_max': current_data.get('main', {}).get('temp_max', 30),
+                'humidity': current_data.get('main', {}).get('humidity', 60),
+                'wind_speed': current_data.get('wind', {}).get('speed', 5) * 3.6,  # Convert m/s to km/h
+                'description': current_data.get('weather', [{}])[0].get('description', 'clear'),
+                'icon': current_data.get('weather', [{}])[0].get('icon', '01d'),
+                'rainfall_1h': current_data.get('rain', {}).get('1h', 0),
+                'rainfall_3h': current_data.get('rain', {}).get('3h', 0),
+                'visibility': current_data.get('visibility', 10000)
+            },
+            'forecast': daily_forecast,
+            'next_6h_rain': self._calculate_next_hours_rain(forecast_data, 6),
+            'next_24h_rain': self._calculate_next_hours_rain(forecast_data, 24)
+        }
+    
     def _process_forecast(self, forecast_data: Dict) -> List[Dict]:
         """Process 3-hourly forecast into daily summaries"""
         daily = {}
@@ -306,12 +328,23 @@ class CropMonitoringService:
             'disease_focus': disease_focus
         }
     
-    def generate_weather_alerts(self, lat: float, lon: float, crop: str, stage: str = None) -> List[Dict]:
+    def generate_weather_alerts(self, lat: float, lon: float, crop: str, stage: str = None,
+                                context: WeatherContext = None) -> List[Dict]:
         """
         Generate real-time weather alerts based on current conditions and forecast
         Returns prioritized list of actionable alerts
         """
-        weather = self._get_weather_data(lat, lon)
+        weather = (context or WeatherContext(self)).get(lat, lon)
+        return self._build_weather_alerts(weather, crop, stage)
+    
+    async def generate_weather_alerts_async(self, lat: float, lon: float, crop: str, stage: str = None,
+                                            context: WeatherContext = None) -> List[Dict]:
+        """Async version of generate_weather_alerts"""
+        weather = await (context or WeatherContext(self)).get_async(lat, lon)
+        return self._build_weather_alerts(weather, crop, stage)
+    
+    def _build_weather_alerts(self, weather: Dict, crop: str, stage: str = None) -> List[Dict]:
+        """Match alert rules and crop impact scenarios against fetched weather"""
         alerts = []
         
         current = weather.get('current', {})
@@ -550,31 +583,53 @@ class CropMonitoringService:
         
         return tasks
     
-    def generate_daily_action_plan(self, subscription: Dict) -> Dict:
+    def generate_daily_action_plan(self, subscription: Dict, context: WeatherContext = None) -> Dict:
         """
         Generate comprehensive daily action plan for a subscribed crop
         
         Args:
             subscription: Dict containing crop details, location, sowing date
+            context: Request-scoped WeatherContext (one is created if not given)
         
         Returns:
             Complete daily action plan with alerts, tasks, and forecast actions
         """
         crop = subscription.get('crop')
-        lat = subscription.get('location', {}).get('lat', 17.385)
-        lon = subscription.get('location', {}).get('lon', 78.487)
-        sowing_date = datetime.strptime(subscription.get('sowingDate', '2025-01-01'), '%Y-%m-%d')
-        area_acres = subscription.get('areaAcres', 1)
+        lat, lon = self._subscription_location(subscription)
         
         # Calculate crop stage
-        stage_info = self.calculate_crop_stage(sowing_date, crop)
-        current_stage = stage_info.get('current_stage')
+        stage_info = self._subscription_stage(subscription)
         
-        # Get weather data
-        weather = self._get_weather_data(lat, lon)
+        # Get weather data (fetched once, reused by alerts, tasks and irrigation)
+        weather = (context or WeatherContext(self)).get(lat, lon)
         
         # Generate weather alerts
-        alerts = self.generate_weather_alerts(lat, lon, crop, current_stage)
+        alerts = self._build_weather_alerts(weather, crop, stage_info.get('current_stage'))
+        
+        return self._build_daily_action_plan(subscription, stage_info, weather, alerts)
+    
+    async def generate_daily_action_plan_async(self, subscription: Dict, context: WeatherContext = None) -> Dict:
+        """Async version of generate_daily_action_plan"""
+        crop = subscription.get('crop')
+        lat, lon = self._subscription_location(subscription)
+        stage_info = self._subscription_stage(subscription)
+        weather = await (context or WeatherContext(self)).get_async(lat, lon)
+        alerts = self._build_weather_alerts(weather, crop, stage_info.get('current_stage'))
+        return self._build_daily_action_plan(subscription, stage_info, weather, alerts)
+    
+    def _subscription_location(self, subscription: Dict) -> tuple:
+        location = subscription.get('location', {})
+        return location.get('lat', 17.385), location.get('lon', 78.487)
+    
+    def _subscription_stage(self, subscription: Dict) -> Dict:
+        sowing_date = datetime.strptime(subscription.get('sowingDate', '2025-01-01'), '%Y-%m-%d')
+        return self.calculate_crop_stage(sowing_date, subscription.get('crop'))
+    
+    def _build_daily_action_plan(self, subscription: Dict, stage_info: Dict, weather: Dict, alerts: List[Dict]) -> Dict:
+        """Assemble the daily plan from already-fetched weather and alerts"""
+        crop = subscription.get('crop')
+        area_acres = subscription.get('areaAcres', 1)
+        current_stage = stage_info.get('current_stage')
         
         # Get today's tasks (with comprehensive stage activities)
         today_tasks = self.get_today_tasks(crop, current_stage, weather, stage_info)
@@ -707,23 +762,28 @@ class CropMonitoringService:
         else:
             return f"✅ {crop} {stage} దశలో (రోజు {days}). తీవ్ర హెచ్చరికలు లేవు. ప్రస్తుత ఉష్ణోగ్రత: {temp}°C"
     
-    def generate_weekly_plan(self, subscription: Dict) -> Dict:
+    def generate_weekly_plan(self, subscription: Dict, context: WeatherContext = None) -> Dict:
         """
         Generate comprehensive 7-day farmer action plan
         Acts as a 'farmer friend' with day-by-day guidance
         """
+        # Get weather data (includes 5-day forecast)
+        weather = (context or WeatherContext(self)).get(*self._subscription_location(subscription))
+        return self._build_weekly_plan(subscription, weather)
+    
+    async def generate_weekly_plan_async(self, subscription: Dict, context: WeatherContext = None) -> Dict:
+        """Async version of generate_weekly_plan"""
+        weather = await (context or WeatherContext(self)).get_async(*self._subscription_location(subscription))
+        return self._build_weekly_plan(subscription, weather)
+    
+    def _build_weekly_plan(self, subscription: Dict, weather: Dict) -> Dict:
+        """Assemble the 7-day plan from already-fetched weather"""
         crop = subscription.get('crop')
-        lat = subscription.get('location', {}).get('lat', 17.385)
-        lon = subscription.get('location', {}).get('lon', 78.487)
-        sowing_date = datetime.strptime(subscription.get('sowingDate', '2025-01-01'), '%Y-%m-%d')
         area_acres = subscription.get('areaAcres', 1)
-        
-        # Get weather data (includes 5-day forecast)
-        weather = self._get_weather_data(lat, lon)
         forecast_days = weather.get('forecast', [])
         
         # Calculate current crop stage
-        stage_info = self.calculate_crop_stage(sowing_date, crop)
+        stage_info = self._subscription_stage(subscription)
         current_stage = stage_info.get('current_stage')
         days_after_sowing = stage_info.get('days_after_sowing', 0)
         
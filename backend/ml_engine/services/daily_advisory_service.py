@@ -47,8 +47,7 @@ class DailyAdvisoryService:
             Complete advisory dictionary
         """
         # Get current weather
-        weather = self.weather_service.get_current_weather(lat, lon)
-        forecast = self.weather_service.get_forecast(lat, lon)
+        weather, forecast = self.weather_service.get_weather_snapshot(lat, lon)
         
         # Get season
         season = self.season_service.get_season()
@@ -10,6 +10,8 @@ from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 import random
 
+from services.price_history import get_price_history
+
 logger = logging.getLogger(__name__)
 
 
@@ -55,7 +57,8 @@ class DecisionSimulatorService:
                 weather_forecast=weather_forecast,
                 soil_params=soil_params,
                 yield_potential=rec.get('yield_potential', 'Medium'),
-                water_needs=rec.get('water_needs', 'Medium')
+                water_needs=rec.get('water_needs', 'Medium'),
+                state=context.get('state')
             )
             
             # Calculate loss probability
@@ -105,7 +108,7 @@ class DecisionSimulatorService:
     
     def _calculate_risk_profile(self, crop: str, weather_forecast: Dict,
                                soil_params: Dict, yield_potential: str,
-                               water_needs: str) -> Dict:
+                               water_needs: str, state: str = None) -> Dict:
         """
         Calculate comprehensive risk breakdown.
         
@@ -121,7 +124,8 @@ class DecisionSimulatorService:
         # Market Risk Calculation
         market_risk = self._calculate_market_risk(
             crop=crop,
-            yield_potential=yield_potential
+            yield_potential=yield_potential,
+            state=state
         )
         
         # Pest & Disease Risk
@@ -190,43 +194,77 @@ class DecisionSimulatorService:
             'description': self._get_weather_risk_description(risk_score, water_needs, rain_days)
         }
     
-    def _calculate_market_risk(self, crop: str, yield_potential: str) -> Dict:
+    def _calculate_market_risk(self, crop: str, yield_potential: str, state: str = None) -> Dict:
         """
         Calculate market price volatility risk.
         
-        High-value crops tend to have higher price volatility.
+        Uses the recorded mandi price history (volatility and 30-day trend)
+        when there is enough of it; otherwise high-value crops are assumed
+        to have higher price volatility.
         """
-        # Market volatility by crop type (simplified model)
-        volatility_map = {
-            'Cotton': 65,
-            'Tobacco': 70,
-            'Chilli': 60,
-            'Turmeric': 55,
-            'Sunflower': 50,
-            'Rice': 30,
-            'Maize': 35,
-            'Pulses': 40,
-            'Groundnut': 45
-        }
+        history = self._get_price_history(crop, state)
+        risk_factors = []
         
-        base_risk = volatility_map.get(crop, 45)
+        if history:
+            # Observed 30-day volatility: ±10% swings -> +20, capped at +45
+            volatility = history['volatility_30d']
+            base_risk = 25 + min(45, round(volatility * 200))
+            if volatility > 0.10:
+                risk_factors.append(f"Prices swung ±{volatility * 100:.0f}% over the last 30 days")
+            
+            # Falling prices add risk, rising prices reduce it a little
+            trend_pct = history['trend_pct_30d']
+            if trend_pct < -5:
+                base_risk += min(20, round(-trend_pct))
+                risk_factors.append(f"Prices fell {-trend_pct:.0f}% over the last 30 days")
+            elif trend_pct > 5:
+                base_risk -= 5
+        else:
+            # Market volatility by crop type (simplified model)
+            volatility_map = {
+                'Cotton': 65,
+                'Tobacco': 70,
+                'Chilli': 60,
+                'Turmeric': 55,
+                'Sunflower': 50,
+                'Rice': 30,
+                'Maize': 35,
+                'Pulses': 40,
+                'Groundnut': 45
+            }
+            
+            base_risk = volatility_map.get(crop, 45)
+            if base_risk > 60:
+                risk_factors.append("High price volatility")
         
         # High yield crops have more market exposure
         if yield_potential == 'High':
             base_risk += 10
-        
-        risk_factors = []
-        if base_risk > 60:
-            risk_factors.append("High price volatility")
-        if yield_potential == 'High':
             risk_factors.append("Higher market exposure")
         
-        return {
+        base_risk = max(0, min(base_risk, 100))
+        
+        market_risk = {
             'score': base_risk,
             'level': self._score_to_level(base_risk),
             'factors': risk_factors,
-            'description': self._get_market_risk_description(base_risk, crop)
+            'description': self._get_market_risk_description(base_risk, crop),
+            'source': 'mandi_history' if history else 'crop_profile'
         }
+        if history:
+            market_risk['price_history'] = history
+        return market_risk
+    
+    def _get_price_history(self, crop: str, state: str = None) -> Optional[Dict]:
+        """Price history analytics for the crop, None when there is not enough history for a trend."""
+        try:
+            history = get_price_history().analytics(crop, state)
+        except Exception as e:
+            logger.warning(f"Price history unavailable for {crop}: {e}")
+            return None
+        if not history or history['trend'] == 'unknown':
+            return None
+        return history
     
     def _calculate_pest_risk(self, crop: str, weather_forecast: Dict) -> Dict:
         """
@@ -0,0 +1,202 @@
+"""
+Flat-Array Random Forest Evaluator
+
+The crop recommender is a scikit-learn RandomForest that is only ever used
+for inference. Unpickling the full estimator is slow and sklearn's per-call
+overhead dominates at small batch sizes, so the trained trees are exported
+once into contiguous NumPy arrays (feature, threshold, left, right, value)
+and evaluated here with plain NumPy.
+
+Export layout (one directory, one .npy per array + meta.json):
+    feature.npy    int32   split feature per node
+    threshold.npy  float64 split threshold per node
+    left.npy       int32   left child (global node index)
+    right.npy      int32   right child (global node index)
+    value.npy      float64 normalized class probabilities per node
+    roots.npy      int32   root node index of each tree
+    meta.json      classes, encoders, scaler, accuracy, crops, max_depth
+
+Leaves point to themselves on both sides, so every row can be walked a
+fixed max_depth steps without per-node branching.
+"""
+
+import os
+import json
+import logging
+import numpy as np
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+ARRAY_NAMES = ('feature', 'threshold', 'left', 'right', 'value', 'roots')
+
+
+class FlatForest:
+    """predict / predict_proba compatible stand-in for RandomForestClassifier."""
+
+    def __init__(self, feature, threshold, left, right, value, roots, classes, max_depth):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.classes_ = np.asarray(classes)
+        self.max_depth = int(max_depth)
+        self.n_estimators = len(roots)
+
+    def apply(self, X) -> np.ndarray:
+        """Leaf node index for every (row, tree) pair."""
+        # sklearn compares float32 features against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(X.shape[0])[:, None]
+        nodes = np.broadcast_to(self.roots, (X.shape[0], self.n_estimators)).copy()
+
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+
+        return nodes
+
+    def predict_proba(self, X) -> np.ndarray:
+        leaves = self.apply(X)
+        return self.value[leaves].sum(axis=1) / self.n_estimators
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in ARRAY_NAMES)
+
+
+class LabelLookup:
+    """Minimal LabelEncoder.transform replacement (raises ValueError on unseen labels)."""
+
+    def __init__(self, classes):
+        self.classes_ = np.asarray(classes)
+        self._index = {label: i for i, label in enumerate(classes)}
+
+    def transform(self, labels) -> np.ndarray:
+        try:
+            return np.array([self._index[label] for label in labels])
+        except KeyError as e:
+            raise ValueError(f"y contains previously unseen labels: {e}")
+
+
+class StandardScaling:
+    """Minimal StandardScaler.transform replacement."""
+
+    def __init__(self, mean, scale):
+        self.mean_ = np.asarray(mean, dtype=np.float64)
+        self.scale_ = np.asarray(scale, dtype=np.float64)
+
+    def transform(self, X) -> np.ndarray:
+        X = np.array(X, dtype=np.float64)
+        X -= self.mean_
+        X /= self.scale_
+        return X
+
+
+def flatten_forest(model) -> Dict[str, np.ndarray]:
+    """Concatenate every tree of a fitted RandomForestClassifier into flat arrays."""
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        n = tree.node_count
+        node_ids = np.arange(n, dtype=np.int32) + offset
+        is_leaf = tree.children_left == -1
+
+        features.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+        thresholds.append(np.where(is_leaf, 0.0, tree.threshold).astype(np.float64))
+        lefts.append(np.where(is_leaf, node_ids, tree.children_left + offset).astype(np.int32))
+        rights.append(np.where(is_leaf, node_ids, tree.children_right + offset).astype(np.int32))
+
+        # Same normalization as DecisionTreeClassifier.predict_proba
+        value = tree.value[:, 0, :].astype(np.float64)
+        normalizer = value.sum(axis=1, keepdims=True)
+        normalizer[normalizer == 0.0] = 1.0
+        values.append(value / normalizer)
+
+        roots.append(offset)
+        offset += n
+
+    return {
+        'feature': np.concatenate(features),
+        'threshold': np.concatenate(thresholds),
+        'left': np.concatenate(lefts),
+        'right': np.concatenate(rights),
+        'value': np.ascontiguousarray(np.concatenate(values)),
+        'roots': np.array(roots, dtype=np.int32),
+    }
+
+
+def export_flat_model(model_data: Dict, out_dir: str):
+    """
+    Export a trained model_data dict (as saved by the training scripts)
+    into the flat-array directory format.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    model = model_data['model']
+    arrays = flatten_forest(model)
+
+    for name, array in arrays.items():
+        np.save(os.path.join(out_dir, f"{name}.npy"), array)
+
+    scaler = model_data['scaler']
+    meta = {
+        'classes': model.classes_.tolist(),
+        'max_depth': max(e.tree_.max_depth for e in model.estimators_),
+        'n_estimators': len(model.estimators_),
+        'soil_classes': model_data['soil_encoder'].classes_.tolist(),
+        'season_classes': model_data['season_encoder'].classes_.tolist(),
+        'crop_classes': model_data['crop_encoder'].classes_.tolist(),
+        'scaler_mean': scaler.mean_.tolist(),
+        'scaler_scale': scaler.scale_.tolist(),
+        'feature_cols': model_data.get('feature_cols'),
+        'accuracy': model_data['accuracy'],
+        'soil_types': model_data.get('soil_types'),
+        'seasons': model_data.get('seasons'),
+        'crops': list(model_data['crops']),
+        'trained_with': model_data.get('trained_with')
+    }
+    with open(os.path.join(out_dir, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=2)
+
+    logger.info(f"Flat model exported to {out_dir} ({len(arrays['feature'])} nodes)")
+
+
+def load_flat_model(model_dir: str, mmap_mode: str = None) -> Dict:
+    """
+    Load a flat-array export into a model_data dict with the same keys the
+    joblib pickle provides, so MLRecommendationService can use either.
+
+    With mmap_mode='r' the arrays are memory-mapped read-only: every worker
+    process on the box shares the same page-cache pages instead of holding
+    a private copy of the forest.
+    """
+    with open(os.path.join(model_dir, 'meta.json'), 'r') as f:
+        meta = json.load(f)
+
+    arrays = {
+        name: np.load(os.path.join(model_dir, f"{name}.npy"), mmap_mode=mmap_mode)
+        for name in ARRAY_NAMES
+    }
+
+    return {
+        'model': FlatForest(classes=meta['classes'], max_depth=meta['max_depth'], **arrays),
+        'scaler': StandardScaling(meta['scaler_mean'], meta['scaler_scale']),
+        'soil_encoder': LabelLookup(meta['soil_classes']),
+        'season_encoder': LabelLookup(meta['season_classes']),
+        'crop_encoder': LabelLookup(meta['crop_classes']),
+        'feature_cols': meta.get('feature_cols'),
+        'accuracy': meta['accuracy'],
+        'soil_types': meta.get('soil_types'),
+        'seasons': meta.get('seasons'),
+        'crops': meta['crops'],
+        'trained_with': meta.get('trained_with'),
+        'format': 'flat',
+        'mmap': mmap_mode is not None
+    }
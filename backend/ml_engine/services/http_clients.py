@@ -0,0 +1,282 @@
+"""
+Shared HTTP Client Registry - pooled httpx.AsyncClient per upstream service
+
+Opening a new httpx.AsyncClient per call means a fresh TCP + TLS handshake
+to OpenWeather / NASA POWER / the mandi APIs on every request. Instead the
+app creates one pooled client per service at startup (keep-alive, HTTP/2
+when the h2 package is installed) and closes them on shutdown.
+
+Services use:
+    async with get_http_clients().client("weather") as client:
+        response = await client.get(...)
+
+Inside the app's event loop this yields the shared pooled client. Anywhere
+else (scripts, asyncio.run() sync wrappers, before startup) it yields a
+short-lived client that is closed on exit - the old behaviour - because an
+httpx client cannot be shared across event loops.
+
+Blocking callers (sync service methods, worker threads) use a pooled
+httpx.Client with the same per-service settings:
+    response = get_http_clients().sync_client("weather").get(...)
+
+Each service gets its own pool, timeout and connection limits. Weather and
+NASA talk to a single host each, so their pool limit is a per-host limit;
+the market pool is shared by the four price workers.
+
+For offline load tests UPSTREAM_STANDIN_URL sends every pooled request
+(async and sync) to the upstream stand-in (services/upstream_standin.py) instead of the real host.
+
+Connection reuse is exported at /metrics:
+    ml_engine_http_requests_total{service}
+    ml_engine_http_responses_total{service}
+    ml_engine_http_connections_opened_total{service}
+    ml_engine_http_tls_handshakes_total{service}
+
+Config (env):
+    HTTP2_ENABLED           use HTTP/2 when h2 is installed (default true)
+    UPSTREAM_STANDIN_URL    stand-in base URL, or "inprocess" (default unset = real upstreams)
+"""
+
+import os
+import asyncio
+import logging
+import threading
+from contextlib import asynccontextmanager
+from typing import Dict
+
+import httpx
+
+from services.latency_metrics import get_counter
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401  (enables httpx HTTP/2 support)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Per-service pool settings: timeout (s), max pooled connections, max idle keep-alive connections
+SERVICE_CONFIG = {
+    "weather": {"timeout": 3.0, "max_connections": 20, "max_keepalive": 10},
+    "nasa": {"timeout": 10.0, "max_connections": 10, "max_keepalive": 5},
+    "market": {"timeout": 20.0, "max_connections": 40, "max_keepalive": 20},
+    "default": {"timeout": 10.0, "max_connections": 20, "max_keepalive": 10},
+}
+KEEPALIVE_EXPIRY_SECONDS = 60.0
+
+
+def _standin_url(base: httpx.URL, request: httpx.Request) -> httpx.URL:
+    """https://<host>/<path> -> <stand-in>/<host>/<path>"""
+    prefix = base.raw_path.rstrip(b"/") + b"/" + request.url.host.encode()
+    return base.copy_with(raw_path=prefix + request.url.raw_path)
+
+
+class StandinTransport(httpx.AsyncBaseTransport):
+    """Rewrites https://<host>/<path> to <stand-in>/<host>/<path>."""
+
+    def __init__(self, base_url: str, limits: httpx.Limits, http2: bool):
+        if base_url == "inprocess":
+            from services.upstream_standin import app as standin_app
+            self._inner = httpx.ASGITransport(app=standin_app)
+            self._base = httpx.URL("http://standin")
+        else:
+            self._inner = httpx.AsyncHTTPTransport(limits=limits, http2=http2)
+            self._base = httpx.URL(base_url)
+        self._inprocess = base_url == "inprocess"
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        request.url = _standin_url(self._base, request)
+        if not self._inprocess:
+            return await self._inner.handle_async_request(request)
+
+        # ASGITransport ignores timeouts, so enforce the read timeout here
+        timeout = request.extensions.get("timeout", {}).get("read")
+        try:
+            return await asyncio.wait_for(self._inner.handle_async_request(request), timeout)
+        except asyncio.TimeoutError:
+            raise httpx.ReadTimeout("stand-in response timed out", request=request)
+
+    async def aclose(self):
+        await self._inner.aclose()
+
+
+class SyncStandinTransport(httpx.BaseTransport):
+    """StandinTransport for blocking clients."""
+
+    def __init__(self, base_url: str, limits: httpx.Limits, http2: bool):
+        self._inprocess = base_url == "inprocess"
+        if self._inprocess:
+            self._base = httpx.URL("http://standin")
+        else:
+            self._inner = httpx.HTTPTransport(limits=limits, http2=http2)
+            self._base = httpx.URL(base_url)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        if not self._inprocess:
+            request.url = _standin_url(self._base, request)
+            return self._inner.handle_request(request)
+
+        # The stand-in app is ASGI only: serve the request on a private loop
+        # (blocking callers run in threads without one) and buffer the body
+        request.read()
+        response = asyncio.run(self._handle_inprocess(request))
+        return httpx.Response(response.status_code, headers=response.headers, content=response.content)
+
+    async def _handle_inprocess(self, request: httpx.Request) -> httpx.Response:
+        async with httpx.AsyncClient(transport=StandinTransport("inprocess", None, False)) as client:
+            response = await client.send(request)
+            await response.aread()
+            return response
+
+    def close(self):
+        if not self._inprocess:
+            self._inner.close()
+
+
+class HttpClientRegistry:
+    """Application-scoped pooled clients, one per upstream service."""
+
+    def __init__(self):
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._sync_clients: Dict[str, httpx.Client] = {}
+        self._sync_lock = threading.Lock()
+        self._loop = None
+        self.http2 = HTTP2_AVAILABLE and os.getenv('HTTP2_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+        self.standin_url = os.getenv('UPSTREAM_STANDIN_URL') or None
+        self._requests = get_counter(
+            "ml_engine_http_requests_total", "Outbound HTTP requests.", ("service",))
+        self._responses = get_counter(
+            "ml_engine_http_responses_total", "Outbound HTTP responses received.", ("service",))
+        self._connections = get_counter(
+            "ml_engine_http_connections_opened_total", "New outbound TCP connections (requests minus this = reused).", ("service",))
+        self._handshakes = get_counter(
+            "ml_engine_http_tls_handshakes_total", "Outbound TLS handshakes.", ("service",))
+
+    async def startup(self):
+        """Bind the registry to the running loop and open the pools (FastAPI startup)."""
+        self._loop = asyncio.get_running_loop()
+        for service in SERVICE_CONFIG:
+            self._get_or_create(service)
+        logger.info(f"HTTP client pools ready: {', '.join(self._clients)} (http2={self.http2})")
+        if self.standin_url:
+            logger.warning(f"Upstream calls are routed to the stand-in at {self.standin_url}")
+
+    async def shutdown(self):
+        """Close every pooled client (FastAPI shutdown)."""
+        clients, self._clients = self._clients, {}
+        self._loop = None
+        for client in clients.values():
+            await client.aclose()
+        with self._sync_lock:
+            sync_clients, self._sync_clients = self._sync_clients, {}
+        for client in sync_clients.values():
+            client.close()
+        logger.info("HTTP client pools closed")
+
+    @asynccontextmanager
+    async def client(self, service: str):
+        """Pooled client when called on the app loop, otherwise a short-lived one."""
+        if self._loop is not None and asyncio.get_running_loop() is self._loop:
+            yield self._get_or_create(service)
+        else:
+            async with self._new_client(service) as client:
+                yield client
+
+    def sync_client(self, service: str) -> httpx.Client:
+        """Pooled blocking client for the service (thread-safe, created on first use)."""
+        with self._sync_lock:
+            client = self._sync_clients.get(service)
+            if client is None or client.is_closed:
+                client = self._sync_clients[service] = self._new_sync_client(service)
+            return client
+
+    def stats(self) -> Dict:
+        stats = {}
+        for service in SERVICE_CONFIG:
+            responses = self._responses.value(service=service)
+            opened = self._connections.value(service=service)
+            stats[service] = {
+                "requests": self._requests.value(service=service),
+                "responses": responses,
+                "connections_opened": opened,
+                "tls_handshakes": self._handshakes.value(service=service),
+                # Share of answered requests that rode an already-open connection
+                "reuse_rate": round(max(0.0, 1 - opened / responses), 3) if responses else 0.0
+            }
+        return stats
+
+    def _get_or_create(self, service: str) -> httpx.AsyncClient:
+        client = self._clients.get(service)
+        if client is None or client.is_closed:
+            client = self._clients[service] = self._new_client(service)
+        return client
+
+    def _trace_event(self, service: str, event_name: str):
+        if event_name == "connection.connect_tcp.complete":
+            self._connections.inc(service=service)
+        elif event_name == "connection.start_tls.complete":
+            self._handshakes.inc(service=service)
+
+    def _limits(self, service: str) -> httpx.Limits:
+        config = SERVICE_CONFIG.get(service, SERVICE_CONFIG["default"])
+        return httpx.Limits(
+            max_connections=config["max_connections"],
+            max_keepalive_connections=config["max_keepalive"],
+            keepalive_expiry=KEEPALIVE_EXPIRY_SECONDS
+        )
+
+    def _new_client(self, service: str) -> httpx.AsyncClient:
+        config = SERVICE_CONFIG.get(service, SERVICE_CONFIG["default"])
+
+        async def trace(event_name, info):
+            self._trace_event(service, event_name)
+
+        async def on_request(request: httpx.Request):
+            self._requests.inc(service=service)
+            request.extensions["trace"] = trace
+
+        async def on_response(response: httpx.Response):
+            self._responses.inc(service=service)
+
+        limits = self._limits(service)
+        return httpx.AsyncClient(
+            timeout=config["timeout"],
+            limits=limits,
+            http2=self.http2,
+            transport=StandinTransport(self.standin_url, limits, self.http2) if self.standin_url else None,
+            event_hooks={"request": [on_request], "response": [on_response]}
+        )
+
+    def _new_sync_client(self, service: str) -> httpx.Client:
+        config = SERVICE_CONFIG.get(service, SERVICE_CONFIG["default"])
+
+        def trace(event_name, info):
+            self._trace_event(service, event_name)
+
+        def on_request(request: httpx.Request):
+            self._requests.inc(service=service)
+            request.extensions["trace"] = trace
+
+        def on_response(response: httpx.Response):
+            self._responses.inc(service=service)
+
+        limits = self._limits(service)
+        return httpx.Client(
+            timeout=config["timeout"],
+            limits=limits,
+            http2=self.http2,
+            transport=SyncStandinTransport(self.standin_url, limits, self.http2) if self.standin_url else None,
+            event_hooks={"request": [on_request], "response": [on_response]}
+        )
+
+
+# Singleton instance
+_http_clients = None
+
+def get_http_clients() -> HttpClientRegistry:
+    """Get or create the HTTP client registry."""
+    global _http_clients
+    if _http_clients is None:
+        _http_clients = HttpClientRegistry()
+    return _http_clients
@@ -0,0 +1,230 @@
+"""
+Latency Metrics - per-stage timers and Prometheus histograms
+
+A request creates a RequestTimings and wraps each pipeline stage in
+`with timings.stage("weather"):`. Every finished stage is observed into a
+shared, label-aware histogram; the per-request breakdown can also be
+returned to the caller (debug mode).
+
+Plain event counters (get_counter) and gauges (get_gauge) live in the same
+registry.
+render_prometheus() produces the Prometheus text exposition format
+(version 0.0.4) for every registered metric, served at /metrics.
+"""
+
+import time
+import logging
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Seconds. Covers cache hits (~1 ms) up to the 6 s enhancement timeout and beyond.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by label values (thread-safe)."""
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...],
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            # Non-cumulative per-bucket counts; made cumulative on render
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.help_text}",
+            f"# TYPE {self.name} histogram"
+        ]
+        with self._lock:
+            snapshot = {key: list(series) for key, series in self._series.items()}
+
+        for key in sorted(snapshot):
+            series = snapshot[key]
+            labels = ",".join(f'{name}="{value}"' for name, value in zip(self.label_names, key))
+            prefix = f"{labels}," if labels else ""
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {series[-1]}')
+            suffix = f"{{{labels}}}" if labels else ""
+            lines.append(f"{self.name}_sum{suffix} {series[-2]:.6f}")
+            lines.append(f"{self.name}_count{suffix} {series[-1]}")
+        return lines
+
+
+class Counter:
+    """Monotonic counter keyed by label values (thread-safe)."""
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.help_text}",
+            f"# TYPE {self.name} counter"
+        ]
+        with self._lock:
+            snapshot = dict(self._values)
+
+        for key in sorted(snapshot):
+            labels = ",".join(f'{name}="{value}"' for name, value in zip(self.label_names, key))
+            suffix = f"{{{labels}}}" if labels else ""
+            lines.append(f"{self.name}{suffix} {snapshot[key]}")
+        return lines
+
+
+class Gauge:
+    """Point-in-time value keyed by label values. `collect` (optional) recomputes all series at render."""
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...] = (),
+                 collect: Callable[[], Dict[Tuple[str, ...], float]] = None):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.collect = collect
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def set(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        with self._lock:
+            self._values[key] = value
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.help_text}",
+            f"# TYPE {self.name} gauge"
+        ]
+        if self.collect is not None:
+            try:
+                snapshot = self.collect()
+            except Exception as e:
+                logger.warning(f"Gauge {self.name} collect failed: {e}")
+                snapshot = {}
+        else:
+            with self._lock:
+                snapshot = dict(self._values)
+
+        for key in sorted(snapshot):
+            labels = ",".join(f'{name}="{value}"' for name, value in zip(self.label_names, key))
+            suffix = f"{{{labels}}}" if labels else ""
+            lines.append(f"{self.name}{suffix} {snapshot[key]}")
+        return lines
+
+
+class RequestTimings:
+    """Stage timer for one request. Each stage is observed as it finishes."""
+
+    def __init__(self, histogram: Histogram, **labels):
+        self.histogram = histogram
+        self.labels = labels
+        self.stages: Dict[str, float] = {}
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name: str, seconds: float):
+        # Repeated stages (e.g. per-crop work) accumulate within the request
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+        self.histogram.observe(seconds, stage=name, **self.labels)
+
+    def finish(self) -> float:
+        """Record the end-to-end 'total' stage and return it in seconds."""
+        total = time.perf_counter() - self._start
+        self.record("total", total)
+        return total
+
+    def as_dict(self) -> Dict[str, float]:
+        """Stage -> milliseconds, for the debug response."""
+        return {name: round(seconds * 1000, 2) for name, seconds in self.stages.items()}
+
+
+# Registered metrics (rendered at /metrics)
+_metrics: Dict[str, object] = {}
+_registry_lock = threading.Lock()
+
+def get_histogram(name: str, help_text: str, label_names: Tuple[str, ...] = ("stage",)) -> Histogram:
+    """Get or create a named histogram."""
+    with _registry_lock:
+        if name not in _metrics:
+            _metrics[name] = Histogram(name, help_text, label_names)
+        return _metrics[name]
+
+
+def get_counter(name: str, help_text: str, label_names: Tuple[str, ...] = ()) -> Counter:
+    """Get or create a named counter."""
+    with _registry_lock:
+        if name not in _metrics:
+            _metrics[name] = Counter(name, help_text, label_names)
+        return _metrics[name]
+
+
+def get_gauge(name: str, help_text: str, label_names: Tuple[str, ...] = (),
+              collect: Callable[[], Dict[Tuple[str, ...], float]] = None) -> Gauge:
+    """Get or create a named gauge."""
+    with _registry_lock:
+        if name not in _metrics:
+            _metrics[name] = Gauge(name, help_text, label_names, collect)
+        return _metrics[name]
+
+
+def get_stage_histogram() -> Histogram:
+    return get_histogram(
+        "ml_engine_stage_duration_seconds",
+        "Latency of each request pipeline stage in seconds.",
+        ("endpoint", "stage")
+    )
+
+
+def start_request_timings(endpoint: str) -> RequestTimings:
+    return RequestTimings(get_stage_histogram(), endpoint=endpoint)
+
+
+def render_prometheus() -> str:
+    lines = []
+    with _registry_lock:
+        metrics = [_metrics[name] for name in sorted(_metrics)]
+    for metric in metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
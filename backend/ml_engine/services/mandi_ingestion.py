@@ -0,0 +1,296 @@
+"""
+Mandi Ingestion - scheduled bulk download of data.gov.in daily mandi prices
+
+Instead of DataGovWorker querying data.gov.in per request (per commodity,
+one alias after another), a background job pulls the whole daily-price
+resource for each configured state in large pages and stores it in the
+price database (PRICE_CACHE_DB, table mandi_prices):
+
+    (commodity, state, district) -> market, arrival_date, modal/min/max price
+
+The same rows are appended to the price history (services/price_history.py).
+
+Commodity aliases are normalized once at ingestion with COMMODITY_MAPPINGS
+("Paddy(Dhan)" and "Rice" rows are stored under both "Paddy" and "Rice"), so
+the request path is one indexed local lookup. A state's rows are replaced
+in a single transaction; readers never see a half-written snapshot.
+
+Every worker process runs the scheduler, but a lease row per state makes
+sure only one of them ingests it per interval. States whose last good
+ingestion is older than MANDI_INGEST_MAX_LAG_HOURS are not served locally,
+so DataGovWorker falls back to live queries.
+
+Metrics at /metrics:
+    ml_engine_mandi_ingest_runs_total{state, outcome}
+    ml_engine_mandi_ingest_rows{state}
+    ml_engine_mandi_ingest_lag_seconds{state}
+    ml_engine_mandi_lookups_total{result}
+
+Run one pass by hand (or from cron with MANDI_INGEST_ENABLED=false):
+    python -m services.mandi_ingestion
+
+Config (env):
+    MANDI_INGEST_ENABLED            run the scheduler inside the app (default true)
+    MANDI_INGEST_STATES             comma-separated states (default Andhra Pradesh,Telangana)
+    MANDI_INGEST_INTERVAL_MINUTES   minutes between ingestions (default 60)
+    MANDI_INGEST_MAX_LAG_HOURS      serve locally while the last ingestion is younger (default 6)
+    MANDI_INGEST_PAGE_SIZE          records per data.gov.in page (default 1000)
+"""
+
+import os
+import time
+import asyncio
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from services.http_clients import get_http_clients
+from services.upstream_guard import get_upstream_guard
+from services.price_cache import get_price_cache
+from services.price_history import get_price_history, to_price
+from services.latency_metrics import get_counter, get_gauge
+from services.market_price_service import COMMODITY_MAPPINGS, DATA_GOV_API, DATA_GOV_KEY
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATES = "Andhra Pradesh,Telangana"
+DEFAULT_INTERVAL_MINUTES = 60
+DEFAULT_MAX_LAG_HOURS = 6
+DEFAULT_PAGE_SIZE = 1000
+PAGE_TIMEOUT_SECONDS = 60
+LOOKUP_LIMIT = 20  # Rows per lookup, as many as the per-request query asked for
+LEASE_SECONDS = 600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS mandi_prices (
+    commodity    TEXT NOT NULL,
+    state        TEXT NOT NULL,
+    district     TEXT NOT NULL COLLATE NOCASE,
+    market       TEXT,
+    arrival_date TEXT,
+    modal_price  INTEGER NOT NULL,
+    min_price    INTEGER,
+    max_price    INTEGER
+);
+CREATE INDEX IF NOT EXISTS mandi_prices_key ON mandi_prices (commodity, state, district);
+CREATE TABLE IF NOT EXISTS mandi_ingest (
+    state            TEXT PRIMARY KEY,
+    ingested_at      REAL,
+    rows             INTEGER,
+    duration_seconds REAL,
+    lease_until      REAL
+);
+"""
+
+Row = Tuple[str, str, str, str, str, int, Optional[int], Optional[int]]
+
+
+def _alias_index() -> Dict[str, List[str]]:
+    """Lower-cased upstream commodity name -> every canonical name that lists it."""
+    index = {}
+    for canonical, aliases in COMMODITY_MAPPINGS.items():
+        for alias in aliases:
+            index.setdefault(alias.lower(), []).append(canonical)
+    return index
+
+
+class MandiIngestion:
+    """Bulk data.gov.in ingestion into the price database plus the local lookup used by DataGovWorker."""
+
+    def __init__(self):
+        self.states = [s.strip() for s in os.getenv('MANDI_INGEST_STATES', DEFAULT_STATES).split(',') if s.strip()]
+        self.interval_seconds = float(os.getenv('MANDI_INGEST_INTERVAL_MINUTES', DEFAULT_INTERVAL_MINUTES)) * 60
+        self.max_lag_seconds = float(os.getenv('MANDI_INGEST_MAX_LAG_HOURS', DEFAULT_MAX_LAG_HOURS)) * 3600
+        self.page_size = int(os.getenv('MANDI_INGEST_PAGE_SIZE', DEFAULT_PAGE_SIZE))
+        self.db = get_price_cache()
+        self.guard = get_upstream_guard("data.gov.in")
+        self.aliases = _alias_index()
+
+        with self.db.connection() as conn:
+            conn.executescript(SCHEMA)
+
+        self._runs = get_counter(
+            "ml_engine_mandi_ingest_runs_total",
+            "data.gov.in bulk ingestions by state and outcome (success, failure, skipped).",
+            ("state", "outcome")
+        )
+        self._lookups = get_counter(
+            "ml_engine_mandi_lookups_total",
+            "Local mandi price lookups by result (hit, empty, not_ingested).",
+            ("result",)
+        )
+        get_gauge("ml_engine_mandi_ingest_rows", "Rows stored by the last ingestion per state.",
+                  ("state",), collect=lambda: {(s["state"],): s["rows"] for s in self.status()})
+        get_gauge("ml_engine_mandi_ingest_lag_seconds", "Seconds since the last successful ingestion per state.",
+                  ("state",), collect=lambda: {(s["state"],): s["lag_seconds"] for s in self.status()
+                                               if s["lag_seconds"] is not None})
+
+    # ---- request path ----
+
+    def lookup(self, commodity: str, state: str, district: str = None) -> Optional[List[Tuple[int, str, str]]]:
+        """
+        (modal_price, market, arrival_date) rows for the key from the last ingestion.
+        None when the state has not been ingested recently (caller should query live).
+        """
+        conn = self.db.connection()
+        ingested = conn.execute("SELECT ingested_at FROM mandi_ingest WHERE state = ?", (state,)).fetchone()
+        if not ingested or not ingested[0] or time.time() - ingested[0] > self.max_lag_seconds:
+            self._lookups.inc(result="not_ingested")
+            return None
+
+        query = "SELECT modal_price, market, arrival_date FROM mandi_prices WHERE commodity = ? AND state = ?"
+        params = [commodity, state]
+        if district:
+            query += " AND district = ?"
+            params.append(district)
+        rows = conn.execute(query + " ORDER BY rowid LIMIT ?", (*params, LOOKUP_LIMIT)).fetchall()
+        self._lookups.inc(result="hit" if rows else "empty")
+        return rows
+
+    # ---- ingestion ----
+
+    async def ingest_state(self, state: str, force: bool = False) -> Optional[int]:
+        """Download and store one state's rows. Returns the row count, or None when skipped/failed."""
+        if not await asyncio.to_thread(self._acquire_lease, state, force):
+            self._runs.inc(state=state, outcome="skipped")
+            return None
+
+        start = time.time()
+        try:
+            records = await self._download(state)
+            rows = await asyncio.to_thread(self._normalize_and_store, state, records, start)
+        except Exception as e:
+            await asyncio.to_thread(self._release_lease, state)
+            self._runs.inc(state=state, outcome="failure")
+            logger.warning(f"[MandiIngestion] {state} failed: {e}")
+            return None
+
+        self._runs.inc(state=state, outcome="success")
+        logger.info(f"[MandiIngestion] {state}: {len(records)} records -> {len(rows)} rows "
+                    f"in {time.time() - start:.1f}s")
+        return len(rows)
+
+    async def ingest_all(self, force: bool = False) -> Dict[str, Optional[int]]:
+        results = {}
+        for state in self.states:
+            results[state] = await self.ingest_state(state, force)
+        return results
+
+    async def run_forever(self):
+        """Scheduler loop started from the app lifespan."""
+        logger.info(f"[MandiIngestion] Scheduler started for {', '.join(self.states)} "
+                    f"every {self.interval_seconds / 60:.0f} min")
+        while True:
+            try:
+                await self.ingest_all()
+            except Exception:
+                # e.g. the lease database being unavailable; try again next interval
+                logger.exception("[MandiIngestion] Ingestion run failed")
+            await asyncio.sleep(self.interval_seconds)
+
+    async def _download(self, state: str) -> List[Dict]:
+        records, offset = [], 0
+        async with get_http_clients().client("market") as client:
+            while True:
+                response = await self.guard.call(client.get, DATA_GOV_API, params={
+                    "api-key": DATA_GOV_KEY,
+                    "format": "json",
+                    "filters[state]": state,
+                    "limit": self.page_size,
+                    "offset": offset
+                }, timeout=PAGE_TIMEOUT_SECONDS)
+                response.raise_for_status()
+                data = response.json()
+                page = data.get('records', [])
+                records.extend(page)
+                offset += len(page)
+                total = to_price(data.get('total')) or 0
+                if len(page) < self.page_size or offset >= total:
+                    return records
+
+    def _normalize(self, records: List[Dict], state: str) -> List[Row]:
+        rows = []
+        for rec in records:
+            modal = to_price(rec.get('modal_price'))
+            if modal is None or not 100 < modal < 100000:  # Same sanity check as DataGovWorker
+                continue
+            name = (rec.get('commodity') or '').strip()
+            for commodity in self.aliases.get(name.lower(), [name]):
+                rows.append((
+                    commodity, state, (rec.get('district') or '').strip(),
+                    rec.get('market', 'Unknown'), rec.get('arrival_date', ''),
+                    modal, to_price(rec.get('min_price')), to_price(rec.get('max_price'))
+                ))
+        return rows
+
+    # ---- database (worker thread) ----
+
+    def _acquire_lease(self, state: str, force: bool) -> bool:
+        """Claim the state unless another worker holds it or ingested it within this interval."""
+        now = time.time()
+        fresh_before = now if force else now - self.interval_seconds * 0.9
+        with self.db.connection() as conn:
+            conn.execute("INSERT OR IGNORE INTO mandi_ingest (state) VALUES (?)", (state,))
+            claimed = conn.execute(
+                "UPDATE mandi_ingest SET lease_until = ? WHERE state = ? "
+                "AND (lease_until IS NULL OR lease_until < ?) "
+                "AND (ingested_at IS NULL OR ingested_at <= ?)",
+                (now + LEASE_SECONDS, state, now, fresh_before)
+            ).rowcount
+        return claimed == 1
+
+    def _release_lease(self, state: str):
+        with self.db.connection() as conn:
+            conn.execute("UPDATE mandi_ingest SET lease_until = NULL WHERE state = ?", (state,))
+
+    def _normalize_and_store(self, state: str, records: List[Dict], start: float) -> List[Row]:
+        """Worker-thread half of an ingestion run: parse the download and write it out."""
+        rows = self._normalize(records, state)
+        self._store(state, rows, time.time() - start)
+        return rows
+
+    def _store(self, state: str, rows: List[Row], duration: float):
+        with self.db.connection() as conn:
+            conn.execute("DELETE FROM mandi_prices WHERE state = ?", (state,))
+            conn.executemany(
+                "INSERT INTO mandi_prices (commodity, state, district, market, arrival_date, "
+                "modal_price, min_price, max_price) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            conn.execute(
+                "UPDATE mandi_ingest SET ingested_at = ?, rows = ?, duration_seconds = ?, lease_until = NULL "
+                "WHERE state = ?", (time.time(), len(rows), round(duration, 2), state)
+            )
+        get_price_history().append(rows, source="data.gov.in")
+
+    def status(self) -> List[Dict]:
+        now = time.time()
+        rows = self.db.connection().execute(
+            "SELECT state, ingested_at, rows, duration_seconds FROM mandi_ingest ORDER BY state"
+        ).fetchall()
+        return [{
+            "state": state,
+            "rows": count or 0,
+            "lag_seconds": round(now - ingested_at) if ingested_at else None,
+            "duration_seconds": duration,
+            "served_locally": bool(ingested_at) and now - ingested_at <= self.max_lag_seconds
+        } for state, ingested_at, count, duration in rows]
+
+
+def ingestion_enabled() -> bool:
+    return os.getenv('MANDI_INGEST_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+
+
+# Singleton instance
+_mandi_ingestion = None
+
+def get_mandi_ingestion() -> MandiIngestion:
+    """Get or create the mandi ingestion job."""
+    global _mandi_ingestion
+    if _mandi_ingestion is None:
+        _mandi_ingestion = MandiIngestion()
+    return _mandi_ingestion
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    for state, count in asyncio.run(get_mandi_ingestion().ingest_all(force=True)).items():
+        print(f"{'✅' if count is not None else '❌'} {state}: {count if count is not None else 'failed'}")
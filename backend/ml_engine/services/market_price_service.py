@@ -3,24 +3,52 @@ Market Price Service - Multi-Source Real-time Mandi Prices
 
 Uses multiple data sources with async workers for efficient and accurate price data.
 Sources: AGMARKNET, data.gov.in, eNAM, Krishak Odisha, AP Agrisnet
+
+Mandi prices move at most daily, so cached prices are served
+stale-while-revalidate: past CACHE_TTL_HOURS the cached entry is returned
+at once (stale=True, age_seconds) and refreshed in the background.
+
+Config (env):
+    PRICE_SWR                serve stale prices while refreshing (default true)
+    PRICE_MAX_STALE_HOURS    hard max age; older entries block on a refresh (default 24)
+
+A refresh does not have to wait for the slowest scraper: PRICE_FETCH_STRATEGY
+(default first) returns once a trusted source (data.gov.in, eNAM) answers
+with enough confidence, or once PRICE_QUORUM sources agree (quorum), and the
+remaining workers are cancelled. See MarketPriceService._fetch_and_cache.
+
+    PRICE_FETCH_STRATEGY            all | first | quorum (default first)
+    PRICE_QUORUM                    valid results that end a quorum race (default 2)
+    PRICE_RACE_DEADLINE_SECONDS     return what has arrived after this (default 4)
+    PRICE_MIN_TRUSTED_CONFIDENCE    confidence a trusted result needs (default 50)
+    PRICE_MERGE_LATE                let the slow workers finish and update the cache (default false)
 """
 
 import os
 import json
+import time
 import logging
 import httpx
 import re
 import asyncio
 from bs4 import BeautifulSoup
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Dict, List, Optional
-import hashlib
+from services.http_clients import get_http_clients
+from services.upstream_guard import get_upstream_guard
+from services.price_cache import get_price_cache
+from services.price_history import get_price_history, to_price
+from services.single_flight import get_single_flight
+from services.latency_metrics import get_counter
 
 logger = logging.getLogger(__name__)
 
-# Cache Configuration
-CACHE_DIR = os.path.join(os.path.dirname(__file__), '../data/price_cache')
+# Cache Configuration (entries live in services/price_cache.py)
 CACHE_TTL_HOURS = 3  # Shorter cache for fresher prices
+DEFAULT_MAX_STALE_HOURS = 24  # Older entries are never served, even with SWR
+DEFAULT_QUORUM = 2
+DEFAULT_RACE_DEADLINE_SECONDS = 4.0
+DEFAULT_MIN_TRUSTED_CONFIDENCE = 50
 
 # ============ DATA SOURCE CONFIGURATIONS ============
 
@@ -107,9 +135,12 @@ MSP_PRICES = {
 class PriceWorker:
     """Individual worker for fetching prices from a specific source (Async)."""
     
-    def __init__(self, name: str, timeout: int = 10):
+    def __init__(self, name: str, timeout: int = 10, hedge: bool = False, trusted: bool = False):
         self.name = name
         self.timeout = timeout
+        self.hedge = hedge
+        self.trusted = trusted  # Official structured source: its answer alone can end a "first" race
+        self.guard = get_upstream_guard(name.lower().replace(' ', '_'))
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/json,*/*',
@@ -119,17 +150,33 @@ class PriceWorker:
     async def fetch(self, client: httpx.AsyncClient, commodity: str, state: str, district: str = None) -> Optional[Dict]:
         """Override in subclasses."""
         raise NotImplementedError
+    
+    async def _get(self, client: httpx.AsyncClient, url: str, **kwargs) -> httpx.Response:
+        """GET through this source's rate limiter / circuit breaker (raises UpstreamUnavailable when open)."""
+        return await self.guard.call(
+            client.get, url, headers=self.headers, timeout=self.timeout, hedge=self.hedge, **kwargs
+        )
 
 
 class DataGovWorker(PriceWorker):
     """Worker for data.gov.in API - Most reliable source."""
     
     def __init__(self):
-        super().__init__("data.gov.in", timeout=12)
+        super().__init__("data.gov.in", timeout=12, hedge=True, trusted=True)
     
     async def fetch(self, client: httpx.AsyncClient, commodity: str, state: str, district: str = None) -> Optional[Dict]:
         try:
-            # Try multiple commodity name variations
+            # Bulk-ingested states are a local lookup (see services/mandi_ingestion.py)
+            from services.mandi_ingestion import get_mandi_ingestion
+            local = await asyncio.to_thread(get_mandi_ingestion().lookup, commodity, state, district)
+            if local is not None:
+                if not local:
+                    return None
+                prices, markets, dates = (list(column) for column in zip(*local))
+                logger.info(f"[DataGov] Found {len(prices)} ingested prices for {commodity}")
+                return dict(self._build_result(prices, markets, dates), _observations=[])  # Recorded at ingestion
+            
+            # Not ingested (or too old): query live, trying multiple commodity name variations
             commodity_names = COMMODITY_MAPPINGS.get(commodity, [commodity])
             
             for comm_name in commodity_names:
@@ -144,7 +191,7 @@ class DataGovWorker(PriceWorker):
                 if district:
                     params["filters[district]"] = district
                 
-                response = await client.get(DATA_GOV_API, params=params, headers=self.headers, timeout=self.timeout)
+                response = await self._get(client, DATA_GOV_API, params=params)
                 
                 if response.status_code == 200:
                     data = response.json()
@@ -154,6 +201,7 @@ class DataGovWorker(PriceWorker):
                         prices = []
                         markets = []
                         dates = []
+                        observations = []  # Full rows for the price history
                         
                         for rec in records:
                             modal = rec.get('modal_price')
@@ -164,12 +212,17 @@ class DataGovWorker(PriceWorker):
                                         prices.append(price)
                                         markets.append(rec.get('market', 'Unknown'))
                                         dates.append(rec.get('arrival_date', ''))
+                                        observations.append((
+                                            commodity, state, rec.get('district') or district or '',
+                                            markets[-1], dates[-1], price,
+                                            to_price(rec.get('min_price')), to_price(rec.get('max_price'))
+                                        ))
                                 except ValueError:
                                     pass
                         
                         if prices:
                             logger.info(f"[DataGov] Found {len(prices)} prices for {commodity}")
-                            return self._build_result(prices, markets, dates)
+                            return dict(self._build_result(prices, markets, dates), _observations=observations)
             
             return None
             
@@ -182,7 +235,7 @@ class DataGovWorker(PriceWorker):
         min_price = min(prices)
         max_price = max(prices)
         
-        # Determine trend
+        # Snapshot trend; replaced by the price history trend once there is enough history
         spread = (max_price - min_price) / min_price if min_price > 0 else 0
         if spread > 0.3:
             trend = "volatile"
@@ -221,7 +274,7 @@ class AgmarknetWorker(PriceWorker):
                 today = datetime.now().strftime('%d-%b-%Y')
                 search_url = f"{AGMARKNET_URL}?Tx_Commodity={comm_name}&Tx_State={state}&DateFrom={today}&DateTo={today}"
                 
-                response = await client.get(search_url, headers=self.headers, timeout=self.timeout)
+                response = await self._get(client, search_url)
                 
                 if response.status_code == 200:
                     prices = self._extract_prices(response.text, state)
@@ -292,14 +345,14 @@ class ENAMWorker(PriceWorker):
     """Worker for eNAM (National Agriculture Market) API."""
     
     def __init__(self):
-        super().__init__("eNAM", timeout=10)
+        super().__init__("eNAM", timeout=10, trusted=True)
     
     async def fetch(self, client: httpx.AsyncClient, commodity: str, state: str, district: str = None) -> Optional[Dict]:
         try:
             # eNAM API endpoint for trade data
             api_url = f"https://enam.gov.in/web/Ajax_ctrl/trade_data_,commodity_,,{commodity.lower()}"
             
-            response = await client.get(api_url, headers=self.headers, timeout=self.timeout)
+            response = await self._get(client, api_url)
             
             if response.status_code == 200:
                 try:
@@ -350,7 +403,7 @@ class APAgrisnetWorker(PriceWorker):
         
         try:
             search_url = f"{AP_AGRISNET_URL}/api/market-prices?commodity={commodity}"
-            response = await client.get(search_url, headers=self.headers, timeout=self.timeout)
+            response = await self._get(client, search_url)
             
             if response.status_code == 200:
                 # Placeholder for parsing logic
@@ -370,8 +423,34 @@ class MarketPriceService:
     """
     
     def __init__(self, max_workers: int = 4):
-        self._ensure_cache_dir()
+        self.cache = get_price_cache()
+        self.history = get_price_history()
         self.max_workers = max_workers
+        self.swr = os.getenv('PRICE_SWR', 'true').lower() in ('1', 'true', 'yes')
+        self.max_stale_hours = float(os.getenv('PRICE_MAX_STALE_HOURS', DEFAULT_MAX_STALE_HOURS))
+        self._background: Dict[tuple, asyncio.Task] = {}
+        
+        self.strategy = os.getenv('PRICE_FETCH_STRATEGY', 'first').lower()
+        self.quorum = int(os.getenv('PRICE_QUORUM', DEFAULT_QUORUM))
+        self.race_deadline = float(os.getenv('PRICE_RACE_DEADLINE_SECONDS', DEFAULT_RACE_DEADLINE_SECONDS))
+        self.min_trusted_confidence = int(os.getenv('PRICE_MIN_TRUSTED_CONFIDENCE', DEFAULT_MIN_TRUSTED_CONFIDENCE))
+        self.merge_late = os.getenv('PRICE_MERGE_LATE', 'false').lower() in ('1', 'true', 'yes')
+        self._fan_outs = set()  # Strong references: late workers outlive the request
+        self._race = get_counter(
+            "ml_engine_price_race_total",
+            "Price fan-outs by how they ended (trusted, quorum, deadline, exhausted, no_results).",
+            ("outcome",)
+        )
+        self._cancelled = get_counter(
+            "ml_engine_price_workers_cancelled_total",
+            "Price workers cancelled after the race was decided.",
+            ("worker",)
+        )
+        self._refreshes = get_counter(
+            "ml_engine_price_refreshes_total",
+            "Mandi price fan-outs by mode (blocking = request waited, background = stale entry served).",
+            ("mode",)
+        )
         
         # Initialize workers
         self.workers = [
@@ -383,102 +462,214 @@ class MarketPriceService:
         
         logger.info(f"Market Price Service initialized with {len(self.workers)} async workers")
     
-    def _ensure_cache_dir(self):
-        if not os.path.exists(CACHE_DIR):
-            os.makedirs(CACHE_DIR)
-    
-    def _get_cache_key(self, commodity: str, state: str, district: str = None) -> str:
-        key = f"{commodity}_{state}_{district or 'all'}_{datetime.now().strftime('%Y%m%d_%H')}"
-        return hashlib.md5(key.encode()).hexdigest()[:16]
-    
-    def _get_cached_price(self, cache_key: str) -> Optional[Dict]:
-        cache_file = os.path.join(CACHE_DIR, f"{cache_key}.json")
-        try:
-            if os.path.exists(cache_file):
-                with open(cache_file, 'r') as f:
-                    cached = json.load(f)
-                cached_time = datetime.fromisoformat(cached['timestamp'])
-                if datetime.now() - cached_time < timedelta(hours=CACHE_TTL_HOURS):
-                    logger.info(f"Cache hit for {cache_key}")
-                    return cached['data']
-        except Exception as e:
-            logger.warning(f"Cache read error: {e}")
-        return None
-    
-    def _save_to_cache(self, cache_key: str, data: Dict):
-        cache_file = os.path.join(CACHE_DIR, f"{cache_key}.json")
-        try:
-            with open(cache_file, 'w') as f:
-                json.dump({
-                    'timestamp': datetime.now().isoformat(),
-                    'data': data
-                }, f)
-        except Exception as e:
-            logger.warning(f"Cache save error: {e}")
-    
     async def get_commodity_price_async(self, crop_name: str, state: str = "Andhra Pradesh", 
-                           district: str = None) -> Dict:
+                           district: str = None, allow_stale: bool = True) -> Dict:
         """
         Get commodity price using async parallel workers.
         Returns best result from multiple sources.
+        
+        Cached prices younger than CACHE_TTL_HOURS are served as is. Older ones
+        (up to PRICE_MAX_STALE_HOURS) are served immediately with stale=True
+        while one deduplicated background task refreshes them, unless SWR is
+        off or allow_stale=False. Past the hard max age the refresh blocks.
         """
-        # Check cache first
-        cache_key = self._get_cache_key(crop_name, state, district)
-        cached = self._get_cached_price(cache_key)
+        # Check cache first (SQLite lookup off the event loop)
+        cached = await asyncio.to_thread(
+            self.cache.get, crop_name, state, district, self.max_stale_hours * 3600
+        )
         if cached:
-            return cached
-        
-        # Fetch from all sources in parallel
-        results = []
+            stored_at, data = cached
+            age = time.time() - stored_at
+            if age < CACHE_TTL_HOURS * 3600:
+                return dict(data, stale=False, age_seconds=round(age))
+            if self.swr and allow_stale:
+                self._refresh_in_background(crop_name, state, district)
+                return dict(data, stale=True, age_seconds=round(age))
         
-        async with httpx.AsyncClient(timeout=20.0) as client:
-            tasks = [worker.fetch(client, crop_name, state, district) for worker in self.workers]
-            
-            # Execute all tasks in parallel
-            worker_results = await asyncio.gather(*tasks, return_exceptions=True)
-            
-            for i, result in enumerate(worker_results):
-                worker_name = self.workers[i].name
-                if isinstance(result, Exception):
-                    logger.warning(f"[{worker_name}] Failed: {result}")
-                elif result:
-                    results.append(result)
-                    logger.info(f"[{worker_name}] Success: ₹{result.get('price')}")
-        
-        # Aggregate results
-        if results:
-            aggregated = self._aggregate_results(results, crop_name)
-            self._save_to_cache(cache_key, aggregated)
-            return aggregated
+        self._refreshes.inc(mode="blocking")
+        aggregated = await get_single_flight("market_prices").do(
+            (crop_name, state, district), lambda: self._fetch_and_cache(crop_name, state, district)
+        )
+        if aggregated:
+            return dict(aggregated, stale=False, age_seconds=0)
         
         # Fallback to MSP
         logger.info(f"Using MSP fallback for {crop_name}")
         return self._get_fallback_price(crop_name)
     
+    async def _fetch_and_cache(self, crop_name: str, state: str, district: str = None) -> Optional[Dict]:
+        """
+        Fan out to the workers, aggregate and cache. None when no source answered.
+        
+        How long the caller waits depends on PRICE_FETCH_STRATEGY:
+            all     every worker finishes (or fails)
+            first   the first valid result from a trusted worker with enough confidence
+            quorum  PRICE_QUORUM valid results
+        With first/quorum the caller also gets whatever has arrived once
+        PRICE_RACE_DEADLINE_SECONDS pass. Workers still running are then
+        cancelled, or with PRICE_MERGE_LATE left to finish and re-aggregated
+        into the cache afterwards.
+        """
+        answered = asyncio.get_running_loop().create_future()
+        fan_out = asyncio.ensure_future(self._fan_out(crop_name, state, district, answered))
+        self._fan_outs.add(fan_out)
+        fan_out.add_done_callback(self._fan_outs.discard)
+        return await answered
+    
+    async def _fan_out(self, crop_name: str, state: str, district: str, answered: asyncio.Future):
+        """Runs the workers; resolves `answered` as soon as the strategy is satisfied."""
+        loop = asyncio.get_running_loop()
+        deadline = None if self.strategy == "all" else loop.time() + self.race_deadline
+        results, answered_with = [], None
+        deadline_passed = False
+        
+        try:
+            # The client stays open until every kept worker is done, even after the caller was answered
+            async with get_http_clients().client("market") as client:
+                pending = {
+                    asyncio.ensure_future(worker.fetch(client, crop_name, state, district)): worker
+                    for worker in self.workers
+                }
+                while pending:
+                    timeout = None
+                    if answered_with is None and deadline is not None and not deadline_passed:
+                        timeout = max(0.0, deadline - loop.time())
+                    done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                    
+                    for task in done:
+                        worker = pending.pop(task)
+                        try:
+                            result = task.result()
+                        except Exception as e:
+                            logger.warning(f"[{worker.name}] Failed: {e}")
+                            continue
+                        if result:
+                            results.append(dict(result, _trusted=worker.trusted))
+                            logger.info(f"[{worker.name}] Success: ₹{result.get('price')}")
+                    
+                    if answered_with is not None:
+                        continue
+                    # Once past the deadline, the first valid result answers (or all workers finishing)
+                    deadline_passed = deadline_passed or (deadline is not None and loop.time() >= deadline)
+                    outcome = self._race_outcome(results, crop_name, deadline_passed) if pending else None
+                    if outcome is None:
+                        continue
+                    
+                    aggregated = await self._aggregate_and_cache(results, crop_name, state, district)
+                    self._race.inc(outcome=outcome)
+                    if not answered.done():
+                        answered.set_result(aggregated)
+                    answered_with = len(results)
+                    if not self.merge_late:
+                        for task, worker in pending.items():
+                            task.cancel()
+                            self._cancelled.inc(worker=worker.name)
+                        return
+            
+            if answered_with is not None:
+                # PRICE_MERGE_LATE: fold the slow sources into the cached entry
+                if len(results) > answered_with:
+                    await self._aggregate_and_cache(results, crop_name, state, district)
+                    logger.info(f"Merged {len(results) - answered_with} late price result(s) for {crop_name}")
+                return
+            
+            self._race.inc(outcome="exhausted" if results else "no_results")
+            aggregated = await self._aggregate_and_cache(results, crop_name, state, district) if results else None
+            if not answered.done():
+                answered.set_result(aggregated)
+        except Exception as e:
+            if not answered.done():
+                answered.set_exception(e)
+            else:
+                logger.warning(f"Late price merge for {crop_name} failed: {e}")
+        finally:
+            if not answered.done():
+                answered.cancel()
+    
+    def _race_outcome(self, results: List[Dict], crop_name: str, past_deadline: bool) -> Optional[str]:
+        """Why the race can end now (trusted, quorum, deadline), or None to keep waiting."""
+        if self.strategy == "all" or not results:
+            return None
+        valid = [r for r in results if self._price_in_range(r.get('price', 0), crop_name)]
+        if self.strategy == "first" and any(
+            r["_trusted"] and r.get('confidence', 0) >= self.min_trusted_confidence for r in valid
+        ):
+            return "trusted"
+        if self.strategy == "quorum" and len(valid) >= self.quorum:
+            return "quorum"
+        if past_deadline and valid:
+            return "deadline"
+        return None
+    
+    async def _aggregate_and_cache(self, results: List[Dict], crop_name: str, state: str, district: str) -> Dict:
+        history = await asyncio.to_thread(self._record_history, results, crop_name, state, district)
+        results = [{k: v for k, v in r.items() if not k.startswith("_")} for r in results]
+        aggregated = self._aggregate_results(results, crop_name)
+        if history and history["trend"] != "unknown" and aggregated.get("live"):
+            aggregated = dict(aggregated, trend=history["trend"], history=history)
+        await asyncio.to_thread(self.cache.set, crop_name, state, district, aggregated)
+        return aggregated
+    
+    def _record_history(self, results: List[Dict], crop_name: str, state: str, district: str) -> Optional[Dict]:
+        """Append the valid results' observations to the price history; returns its analytics for the state."""
+        for r in results:
+            if not self._price_in_range(r.get('price', 0), crop_name):
+                continue
+            # Sources without per-market rows contribute one summary row per day
+            observations = r.get("_observations")
+            if observations is None:
+                observations = [(crop_name, state, district or '', r.get('source', 'Unknown'), r.get('date', ''),
+                                 r['price'], r.get('min_price'), r.get('max_price'))]
+            self.history.append(observations, source=r.get('source', 'Unknown'))
+        return self.history.analytics(crop_name, state)
+    
+    def _refresh_in_background(self, crop_name: str, state: str, district: str = None):
+        """Start one background refresh per key; later stale hits while it runs start nothing."""
+        key = (crop_name, state, district)
+        if key in self._background:
+            return
+        self._refreshes.inc(mode="background")
+        task = asyncio.ensure_future(get_single_flight("market_prices").do(
+            key, lambda: self._fetch_and_cache(crop_name, state, district)
+        ))
+        self._background[key] = task
+        task.add_done_callback(lambda done: self._background_done(key, done))
+    
+    def _background_done(self, key, task: asyncio.Task):
+        self._background.pop(key, None)
+        if not task.cancelled() and task.exception():
+            logger.warning(f"Background price refresh failed for {key[0]}: {task.exception()}")
+    
     # Sync wrapper for backward compatibility
     def get_commodity_price(self, crop_name: str, state: str = "Andhra Pradesh", district: str = None) -> Dict:
         import asyncio
-        return asyncio.run(self.get_commodity_price_async(crop_name, state, district))
+        # No stale serving: asyncio.run() would cancel the background refresh on return
+        return asyncio.run(self.get_commodity_price_async(crop_name, state, district, allow_stale=False))
 
+    @staticmethod
+    def _valid_range(crop_name: str):
+        """Expected price range from MSP (allow 0.3x to 5x of MSP)."""
+        expected_msp = MSP_PRICES.get(crop_name, {"price": 3000}).get("price", 3000)
+        return expected_msp * 0.3, expected_msp * 5
+    
+    def _price_in_range(self, price: float, crop_name: str) -> bool:
+        min_valid, max_valid = self._valid_range(crop_name)
+        return min_valid <= price <= max_valid
+    
     def _aggregate_results(self, results: List[Dict], crop_name: str) -> Dict:
         """
         Aggregate results from multiple sources.
         Uses weighted average based on confidence and recency.
         Validates prices against MSP ranges to filter bad data.
         """
-        # Get expected price range from MSP (allow 0.3x to 5x of MSP)
-        msp_data = MSP_PRICES.get(crop_name, {"price": 3000})
-        expected_msp = msp_data.get("price", 3000)
-        min_valid = expected_msp * 0.3  # At least 30% of MSP
-        max_valid = expected_msp * 5    # At most 5x MSP
-        
         # Filter results to only include reasonable prices
         valid_results = []
         for r in results:
             price = r.get('price', 0)
-            if min_valid <= price <= max_valid:
+            if self._price_in_range(price, crop_name):
                 valid_results.append(r)
             else:
+                min_valid, max_valid = self._valid_range(crop_name)
                 logger.warning(f"Rejected price ₹{price} for {crop_name} (expected ₹{min_valid:.0f}-{max_valid:.0f})")
         
         # If no valid results, use fallback
@@ -581,11 +772,11 @@ class MarketPriceService:
         """Enrich recommendations with live market prices (Sync wrapper)."""
         # This is inefficient, but kept for backward compatibility if needed
         # In optimized app.py, we will call get_commodity_price_async in parallel loop
-        import asyncio
         for rec in recommendations:
             crop_name = rec.get('crop')
             if crop_name:
-                price_data = asyncio.run(self.get_commodity_price_async(crop_name, state, district))
+                # Sync wrapper: fresh data only, no stale-while-revalidate
+                price_data = self.get_commodity_price(crop_name, state, district)
                 rec['market_price'] = price_data
                 rec['market_price_live'] = price_data.get('live', False)
         return recommendations
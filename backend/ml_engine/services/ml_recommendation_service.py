@@ -1,21 +1,26 @@
 """
 ML-Based Crop Recommendation Service
-Uses trained RandomForest model for predictions.
+Uses trained RandomForest model for predictions (flat-array export when
+available, joblib pickle otherwise).
 Falls back to rule-based system if model unavailable.
-Includes fertilizer optimization recommendations.
+Includes fertilizer optimization recommendations for the returned crops.
 """
 
 import json
 import os
+import copy
 import numpy as np
 import joblib
 import logging
 from services.fertilizer_optimizer_service import fertilizer_optimizer
+from services.recommendation_cache import get_recommendation_cache, quantize
+from services.flat_forest import load_flat_model
 
 logger = logging.getLogger(__name__)
 
 # Paths
 MODEL_PATH = os.path.join(os.path.dirname(__file__), '../models/crop_recommender_ml.joblib')
+FLAT_MODEL_DIR = os.path.join(os.path.dirname(__file__), '../models/crop_recommender_ml_flat')
 PROFILES_PATH = os.path.join(os.path.dirname(__file__), '../data/crop_profiles.json')
 
 
@@ -23,6 +28,7 @@ class MLRecommendationService:
     def __init__(self):
         self.model_data = None
         self.profiles = self._load_profiles()
+        self.cache = get_recommendation_cache('ml')
         self._load_model()
     
     def _load_profiles(self):
@@ -34,12 +40,41 @@ class MLRecommendationService:
             return {}
     
     def _load_model(self):
+        # Memory-map model arrays (default) so uvicorn/gunicorn workers share pages
+        mmap_mode = 'r' if os.getenv('ML_MODEL_MMAP', 'true').lower() in ('1', 'true', 'yes') else None
+        model_format = os.getenv('ML_MODEL_FORMAT', 'auto')  # auto | flat | joblib
         try:
-            self.model_data = joblib.load(MODEL_PATH)
+            # Flat-array export loads in milliseconds; the full sklearn pickle is the fallback
+            has_flat = os.path.exists(os.path.join(FLAT_MODEL_DIR, 'meta.json'))
+            if model_format == 'flat' or (model_format == 'auto' and has_flat):
+                self.model_data = load_flat_model(FLAT_MODEL_DIR, mmap_mode=mmap_mode)
+            else:
+                self.model_data = joblib.load(MODEL_PATH, mmap_mode=mmap_mode)
+            self.model_data['crops'] = self._usable_crops(self.model_data)
+            if not self.model_data['crops']:
+                raise ValueError("no model crop is in the label encoder")
+            # Crop codes never change between requests - encode them once
+            self._crop_codes = self.model_data['crop_encoder'].transform(self.model_data['crops'])
             logger.info(f"ML model loaded. Accuracy: {self.model_data['accuracy']:.2%}")
         except Exception as e:
             logger.warning(f"ML model not found, will use rule-based: {e}")
             self.model_data = None
+            self._crop_codes = None
+    
+    def _usable_crops(self, model_data):
+        """
+        Model crops that can be scored. Crops the label encoder does not know
+        are logged and skipped rather than disabling the whole model; crops
+        without a crop profile are still scored (with an empty profile).
+        """
+        encoded = set(model_data['crop_encoder'].classes_)
+        usable = []
+        for crop in model_data['crops']:
+            if crop in encoded:
+                usable.append(crop)
+            else:
+                logger.warning(f"Skipping crop '{crop}': not in the model's label encoder")
+        return usable
     
     def _encode_input(self, soil_type, season, temp, humidity, ph, n, p, k, rain_days, crop_name):
         """Encode input features for model prediction."""
@@ -79,6 +114,72 @@ class MLRecommendationService:
         
         return features_scaled
     
+    def _encode_sites(self, sites):
+        """
+        Encode one or more site inputs against every known crop.
+        sites: list of (soil_type, season, temp, humidity, ph, n, p, k, rain_days).
+        Returns a scaled (len(sites) * N) x 10 feature matrix; crops vary fastest.
+        """
+        soil_encoder = self.model_data['soil_encoder']
+        season_encoder = self.model_data['season_encoder']
+        scaler = self.model_data['scaler']
+        
+        site_rows = []
+        for soil_type, season, *numeric in sites:
+            try:
+                soil_enc = soil_encoder.transform([soil_type])[0]
+            except:
+                soil_enc = 0
+            
+            try:
+                season_enc = season_encoder.transform([season])[0]
+            except:
+                season_enc = 0
+            
+            site_rows.append([soil_enc, season_enc, *numeric])
+        
+        # Shared site conditions repeated per crop, crop code varies in the last column
+        n_crops = len(self._crop_codes)
+        features = np.empty((len(sites) * n_crops, 10))
+        features[:, :9] = np.repeat(np.asarray(site_rows, dtype=np.float64), n_crops, axis=0)
+        features[:, 9] = np.tile(self._crop_codes, len(sites))
+        
+        return scaler.transform(features)
+    
+    def _score_sites(self, sites):
+        """
+        Score every crop for every site with a single predict_proba call.
+        Returns one list of (crop_name, suitable, confidence) per site.
+        """
+        features = self._encode_sites(sites)
+        
+        model = self.model_data['model']
+        probabilities = model.predict_proba(features)
+        # RandomForest.predict is the argmax of predict_proba
+        predictions = model.classes_[np.argmax(probabilities, axis=1)]
+        confidences = probabilities.max(axis=1) * 100
+        
+        crops = self.model_data['crops']
+        n_crops = len(crops)
+        return [
+            [
+                (crop_name, bool(predictions[row + i]), confidences[row + i])
+                for i, crop_name in enumerate(crops)
+            ]
+            for row in range(0, len(sites) * n_crops, n_crops)
+        ]
+    
+    def predict_all_crops(self, soil_type, season, temp, humidity, ph, n, p, k, rain_days):
+        """
+        Score every crop with a single predict_proba call.
+        Returns: list of (crop_name, suitable: bool, confidence: float),
+        identical to calling predict_suitability once per crop.
+        """
+        if not self.model_data:
+            return []
+        
+        return self._score_sites([(soil_type, season, temp, humidity, ph, n, p, k, rain_days)])[0]
+    
     def predict_suitability(self, soil_type, season, temp, humidity, ph, n, p, k, rain_days, crop_name):
         """
         Predict crop suitability using ML model.
@@ -105,67 +206,91 @@ class MLRecommendationService:
     
     def get_recommendations(self, soil_type, season, temp=28, humidity=60, 
                            soil_ph=7.0, soil_n=150, soil_p=50, soil_k=150,
-                           forecast=None, soil_source="database"):
+                           forecast=None, soil_source="database", enrich=True):
         """
         Get ML-based crop recommendations.
         
+        Two phases: every crop is scored and ranked first, then only the
+        returned top 5 are enriched with reasons, forecast insight and a
+        fertilizer plan. Pass enrich=False to skip enrichment entirely
+        (e.g. SMS/WhatsApp replies that only show crop and confidence);
+        enrich_recommendations() can be called later on the same list.
+        
+        Numeric inputs are bucketed to 0.5 units and results are served
+        from the 'ml' recommendation cache.
+        
         Returns list of suitable crops with confidence scores.
         """
-        recommendations = []
-        rain_days = forecast.get('rain_days', 2) if forecast else 2
+        site = self._normalize_site(soil_type, season, temp, humidity,
+                                    soil_ph, soil_n, soil_p, soil_k, forecast)
+        return self.cache.get_or_compute(
+            site + (enrich,), lambda: self._compute_recommendations(site, enrich)
+        )
+    
+    def get_recommendations_batch(self, inputs, enrich=True):
+        """
+        Recommendations for many plots at once (FPO / cooperative uploads).
         
+        inputs: list of dicts with get_recommendations keyword arguments.
+        Identical inputs are computed once, cache hits are reused, and every
+        remaining plot is scored in a single predict_proba call.
+        Returns a list of recommendation lists aligned with inputs.
+        """
+        sites = [self._normalize_site(**kwargs) for kwargs in inputs]
+        
+        results = {}
+        missing = []
+        for site in dict.fromkeys(sites):
+            cached = self.cache.get(site + (enrich,))
+            if cached is not None:
+                results[site] = cached
+            else:
+                missing.append(site)
+        
+        if missing and self.model_data:
+            for site, scored in zip(missing, self._score_sites(missing)):
+                results[site] = self._rank_and_enrich(site, scored, enrich)
+                if results[site]:
+                    self.cache.set(site + (enrich,), results[site])
+        else:
+            for site in missing:
+                results[site] = self._compute_recommendations(site, enrich)
+        
+        # Plots sharing a site get their own copy - callers enrich them in place
+        return [copy.deepcopy(results[site]) for site in sites]
+    
+    def _normalize_site(self, soil_type, season, temp=28, humidity=60,
+                        soil_ph=7.0, soil_n=150, soil_p=50, soil_k=150,
+                        forecast=None, soil_source="database"):
+        """Bucket inputs into the (soil, season, temp, humidity, ph, n, p, k, rain_days) site tuple."""
+        rain_days = forecast.get('rain_days', 2) if forecast else 2
+        temp, humidity, soil_ph, soil_n, soil_p, soil_k = (
+            quantize(v) for v in (temp, humidity, soil_ph, soil_n, soil_p, soil_k)
+        )
+        return (soil_type, season, temp, humidity, soil_ph, soil_n, soil_p, soil_k, rain_days)
+    
+    def _compute_recommendations(self, site, enrich):
+        """Uncached two-phase scoring + enrichment behind get_recommendations."""
         if not self.model_data:
+            soil_type, season, temp, humidity, soil_ph, soil_n, soil_p, soil_k, _ = site
             logger.warning("ML model not available, using rule-based fallback")
             return self._rule_based_recommendations(
                 soil_type, season, temp, humidity, soil_ph, soil_n, soil_p, soil_k
             )
         
-        crops = self.model_data['crops']
+        return self._rank_and_enrich(site, self._score_sites([site])[0], enrich)
+    
+    def _rank_and_enrich(self, site, scored, enrich):
+        """Phase 1 ranks scored crops, phase 2 enriches the returned top 5."""
+        soil_type, season, temp, humidity, soil_ph, soil_n, soil_p, soil_k, rain_days = site
+        recommendations = []
         
-        for crop_name in crops:
-            suitable, ml_confidence = self.predict_suitability(
-                soil_type, season, temp, humidity, 
-                soil_ph, soil_n, soil_p, soil_k, rain_days, crop_name
-            )
-            
+        # Phase 1: Score and rank
+        for crop_name, suitable, ml_confidence in scored:
             # Soft prediction: Use probability threshold 0.30 (30%)
             if ml_confidence >= 30:
                 profile = self.profiles.get(crop_name, {})
-                
-                # Generate reasons
-                reasons = []
-                warnings = []
-                
-                if soil_type in profile.get('soil_suitability', []):
-                    reasons.append(f"Excellent match for {soil_type} soil")
-                
-                if profile.get('ph_min', 0) <= soil_ph <= profile.get('ph_max', 14):
-                    reasons.append(f"pH {soil_ph} is optimal")
-                
-                if profile.get('min_temp', 0) <= temp <= profile.get('max_temp', 50):
-                    reasons.append(f"Temperature {temp}°C is suitable")
-                
-                # Forecast insight
-                forecast_insight = None
-                water_needs = profile.get('water_needs', 'Medium')
-                if water_needs == 'High' and rain_days >= 3:
-                    forecast_insight = f"Favorable: {rain_days} rain days expected"
-                elif water_needs == 'Low' and rain_days >= 4:
-                    warnings.append("Excessive rain expected")
-                
-                # Get detailed fertilizer recommendation
-                fertilizer_plan = None
-                try:
-                    fertilizer_plan = fertilizer_optimizer.get_complete_recommendation(
-                        crop_name=crop_name,
-                        current_npk={'n': soil_n, 'p': soil_p, 'k': soil_k},
-                        soil_type=soil_type,
-                        farming_type='balanced'
-                    )
-                except Exception as e:
-                    logger.warning(f"Fertilizer optimization failed for {crop_name}: {e}")
-                
-                rec = {
+                recommendations.append({
                     "crop": crop_name,
                     "confidence": int(ml_confidence),
                     "ml_prediction": True,
@@ -173,25 +298,80 @@ class MLRecommendationService:
                     "risk_factor": profile.get("risk", "Medium"),
                     "water_needs": profile.get("water_needs", "Medium"),
                     "market_price": profile.get("market_price", {}),
-                    "reason": ". ".join(reasons) if reasons else profile.get("description", ""),
+                    "reason": profile.get("description", ""),
                     "fertilizer_recommendation": profile.get("fertilizer_recommendation", ""),
-                    "warnings": warnings
-                }
-                
-                # Add detailed fertilizer plan if available
-                if fertilizer_plan and 'error' not in fertilizer_plan:
-                    rec["fertilizer_plan"] = fertilizer_plan
-                
-                if forecast_insight:
-                    rec["forecast_insight"] = forecast_insight
-                
-                recommendations.append(rec)
+                    "warnings": []
+                })
         
         # Sort by confidence
         recommendations.sort(key=lambda x: x["confidence"], reverse=True)
         
         # Return only top 5 BEST crops
-        return recommendations[:5]
+        recommendations = recommendations[:5]
+        
+        # Phase 2: Enrich only what is returned
+        if enrich:
+            self.enrich_recommendations(
+                recommendations, soil_type, temp, soil_ph,
+                soil_n, soil_p, soil_k, rain_days
+            )
+        
+        return recommendations
+    
+    def enrich_recommendations(self, recommendations, soil_type, temp=28, soil_ph=7.0,
+                               soil_n=150, soil_p=50, soil_k=150, rain_days=2):
+        """
+        Add reasons, forecast insight and fertilizer plan to ranked recommendations (in place).
+        """
+        for rec in recommendations:
+            crop_name = rec["crop"]
+            profile = self.profiles.get(crop_name, {})
+            
+            # Generate reasons
+            reasons = []
+            warnings = []
+            
+            if soil_type in profile.get('soil_suitability', []):
+                reasons.append(f"Excellent match for {soil_type} soil")
+            
+            if profile.get('ph_min', 0) <= soil_ph <= profile.get('ph_max', 14):
+                reasons.append(f"pH {soil_ph} is optimal")
+            
+            if profile.get('min_temp', 0) <= temp <= profile.get('max_temp', 50):
+                reasons.append(f"Temperature {temp}°C is suitable")
+            
+            # Forecast insight
+            forecast_insight = None
+            water_needs = profile.get('water_needs', 'Medium')
+            if water_needs == 'High' and rain_days >= 3:
+                forecast_insight = f"Favorable: {rain_days} rain days expected"
+            elif water_needs == 'Low' and rain_days >= 4:
+                warnings.append("Excessive rain expected")
+            
+            # Get detailed fertilizer recommendation
+            fertilizer_plan = None
+            try:
+                fertilizer_plan = fertilizer_optimizer.get_complete_recommendation(
+                    crop_name=crop_name,
+                    current_npk={'n': soil_n, 'p': soil_p, 'k': soil_k},
+                    soil_type=soil_type,
+                    farming_type='balanced'
+                )
+            except Exception as e:
+                logger.warning(f"Fertilizer optimization failed for {crop_name}: {e}")
+            
+            if reasons:
+                rec["reason"] = ". ".join(reasons)
+            rec["warnings"] = warnings
+            
+            # Add detailed fertilizer plan if available
+            if fertilizer_plan and 'error' not in fertilizer_plan:
+                rec["fertilizer_plan"] = fertilizer_plan
+            
+            if forecast_insight:
+                rec["forecast_insight"] = forecast_insight
+        
+        return recommendations
     
     def _rule_based_recommendations(self, soil_type, season, temp, humidity, ph, n, p, k):
         """Fallback rule-based recommendations."""
@@ -239,6 +419,8 @@ class MLRecommendationService:
         return {
             "loaded": True,
             "type": "RandomForestClassifier",
+            "format": self.model_data.get('format', 'joblib'),
+            "mmap": self.model_data.get('mmap', False),
             "accuracy": self.model_data['accuracy'],
             "n_crops": len(self.model_data['crops']),
             "crops": self.model_data['crops']
@@ -0,0 +1,165 @@
+"""
+NASA History Cache - compact cache for processed NASA POWER monthly statistics
+
+A location's 5-year history is reduced to one float64 array of shape
+(12 months, parameters, 3) holding avg/min/max (NaN = no data). That array
+is what gets cached - not the JSON payload - so a hit needs no parsing:
+
+- memory tier: bounded LRU (NASA_CACHE_SIZE entries)
+- disk tier:   one .npz file per key under data/weather_cache/nasa/,
+               read and written on a worker thread (asyncio.to_thread)
+
+Entries expire NASA_CACHE_TTL_DAYS (default 7) after they were written,
+judged by file mtime like the previous JSON cache. All twelve months are
+stored, so callers asking for different growing seasons share one entry.
+Concurrent misses for the same key share one load via single-flight.
+
+Config (env):
+    NASA_CACHE_SIZE        max in-memory entries (default 512)
+    NASA_CACHE_TTL_DAYS    entry lifetime in days (default 7)
+    NASA_CACHE_DIR         disk tier directory (default data/weather_cache/nasa)
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from services.latency_metrics import get_counter
+from services.single_flight import get_single_flight
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_SIZE = 512
+DEFAULT_TTL_DAYS = 7
+DEFAULT_DISK_DIR = os.path.join(os.path.dirname(__file__), '..', 'data', 'weather_cache', 'nasa')
+
+Entry = Tuple[float, np.ndarray]  # (stored_at, stats)
+
+
+class NASAHistoryCache:
+    """Memory LRU + .npz disk tier for monthly statistics arrays."""
+
+    def __init__(self):
+        self.max_size = int(os.getenv('NASA_CACHE_SIZE', DEFAULT_MAX_SIZE))
+        self.ttl_seconds = float(os.getenv('NASA_CACHE_TTL_DAYS', DEFAULT_TTL_DAYS)) * 86400
+        self.disk_dir = os.getenv('NASA_CACHE_DIR', DEFAULT_DISK_DIR)
+        os.makedirs(self.disk_dir, exist_ok=True)
+
+        self._entries = OrderedDict()  # key -> (stored_at, stats)
+        self._lock = threading.Lock()
+        self._lookups = get_counter(
+            "ml_engine_nasa_cache_lookups_total",
+            "NASA history cache lookups by result (memory, disk, miss).",
+            ("result",)
+        )
+
+    async def get_or_load_async(self, key: str,
+                                load: Callable[[], Awaitable[Optional[np.ndarray]]]) -> Optional[Entry]:
+        """
+        Cached (stored_at, stats) for key, else await load() and cache its result.
+        load() returns None when nothing should be cached (e.g. upstream failure).
+        """
+        entry = self._get_memory(key)
+        if entry is not None:
+            self._lookups.inc(result="memory")
+            return entry
+
+        async def fill():
+            cached = await asyncio.to_thread(self._get_disk, key)
+            if cached is not None:
+                self._lookups.inc(result="disk")
+                return cached
+
+            self._lookups.inc(result="miss")
+            stats = await load()
+            if stats is None:
+                return None
+            fresh = (time.time(), stats)
+            self._set_memory(key, fresh)
+            await asyncio.to_thread(self._set_disk, key, stats)
+            return fresh
+
+        return await get_single_flight("nasa_history").do(key, fill)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            size = len(self._entries)
+        return {
+            "size": size,
+            "max_size": self.max_size,
+            "ttl_days": self.ttl_seconds / 86400,
+            "lookups": {result: self._lookups.value(result=result) for result in ("memory", "disk", "miss")}
+        }
+
+    # ---- memory tier ----
+
+    def _get_memory(self, key: str) -> Optional[Entry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry[0] >= self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def _set_memory(self, key: str, entry: Entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    # ---- disk tier (called on a worker thread) ----
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.npz")
+
+    def _get_disk(self, key: str) -> Optional[Entry]:
+        path = self._disk_path(key)
+        try:
+            stored_at = os.path.getmtime(path)
+            if time.time() - stored_at >= self.ttl_seconds:
+                return None
+            with np.load(path) as data:
+                stats = data['stats']
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"NASA cache read error ({path}): {e}")
+            return None
+
+        entry = (stored_at, stats)
+        self._set_memory(key, entry)
+        return entry
+
+    def _set_disk(self, key: str, stats: np.ndarray):
+        path = self._disk_path(key)
+        try:
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp.npz"
+            np.savez_compressed(tmp_path, stats=stats)
+            os.replace(tmp_path, path)  # Atomic for readers in other workers
+        except Exception as e:
+            logger.warning(f"NASA cache write error ({path}): {e}")
+
+
+# Singleton instance
+_nasa_history_cache = None
+
+def get_nasa_history_cache() -> NASAHistoryCache:
+    """Get or create the shared NASA history cache."""
+    global _nasa_history_cache
+    if _nasa_history_cache is None:
+        _nasa_history_cache = NASAHistoryCache()
+    return _nasa_history_cache
@@ -4,22 +4,25 @@ NASA POWER API Service for Historical Weather Data
 Fetches 5 years of historical weather data for agricultural advisory.
 Uses the NASA POWER Agroclimatology (AG) community data.
 
+Responses are gridded (MERRA-2, 0.5° lat x 0.625° lon), so every point in a
+grid cell gets the same series. Requests are snapped to the cell centre
+before the cache lookup and the fetch: nearby farms share one cache entry and
+one upstream call. scripts/prefetch_nasa_grid.py warms the cells ahead of time.
+
 API Documentation: https://power.larc.nasa.gov/docs/services/api/
 """
 
-import httpx
+import asyncio
 import logging
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
-import json
-import os
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from services.http_clients import get_http_clients
+from services.upstream_guard import get_upstream_guard
+from services.nasa_history_cache import get_nasa_history_cache
 
 logger = logging.getLogger(__name__)
 
-# Cache directory for storing fetched data
-CACHE_DIR = os.path.join(os.path.dirname(__file__), '..', 'data', 'weather_cache')
-os.makedirs(CACHE_DIR, exist_ok=True)
-
 
 class NASAPowerService:
     """
@@ -40,8 +43,20 @@ class NASAPowerService:
         "WS2M",         # Wind Speed at 2m (m/s)
     ]
     
+    # Native resolution of the meteorology grid (degrees)
+    GRID_LAT_DEG = 0.5
+    GRID_LON_DEG = 0.625
+    
     def __init__(self):
-        self.cache = {}
+        self.history_cache = get_nasa_history_cache()
+        self.guard = get_upstream_guard("nasa_power")
+    
+    @classmethod
+    def snap_to_grid(cls, lat: float, lon: float) -> Tuple[float, float]:
+        """Centre of the NASA POWER grid cell containing (lat, lon)."""
+        lat_s = round(lat / cls.GRID_LAT_DEG) * cls.GRID_LAT_DEG
+        lon_s = round((lon + 180) / cls.GRID_LON_DEG) * cls.GRID_LON_DEG - 180
+        return round(max(-90.0, min(90.0, lat_s)), 4), round(lon_s, 4)
     
     async def get_historical_weather_async(
         self, 
@@ -53,57 +68,46 @@ class NASAPowerService:
         """
         Fetch historical weather data for the past N years asynchronously.
         """
-        cache_key = f"{lat:.2f}_{lon:.2f}_{years}"
+        cell_lat, cell_lon = self.snap_to_grid(lat, lon)
+        cache_key = f"{cell_lat:.3f}_{cell_lon:.3f}_{years}"
         
-        # Check cache (sync file I/O is acceptable for now, or use aiofiles if strict)
-        cache_file = os.path.join(CACHE_DIR, f"{cache_key}.json")
-        if os.path.exists(cache_file):
-            try:
-                cache_age = datetime.now().timestamp() - os.path.getmtime(cache_file)
-                if cache_age < 86400 * 7:  # Cache for 7 days
-                    logger.info(f"Using cached weather data for {lat}, {lon}")
-                    with open(cache_file, 'r') as f:
-                        return json.load(f)
-            except Exception as e:
-                logger.warning(f"Cache read error: {e}")
-        
-        logger.info(f"Fetching {years}-year historical weather for ({lat}, {lon})")
-        
-        # Calculate date range
-        end_date = datetime.now() - timedelta(days=1)  # Yesterday
-        start_date = end_date - timedelta(days=365 * years)
-        
-        try:
-            params = {
-                "parameters": ",".join(self.PARAMETERS),
-                "community": "AG",
-                "longitude": lon,
-                "latitude": lat,
-                "start": start_date.strftime("%Y%m%d"),
-                "end": end_date.strftime("%Y%m%d"),
-                "format": "JSON"
-            }
-            
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(self.BASE_URL, params=params)
-                response.raise_for_status()
-                data = response.json()
+        async def load():
+            logger.info(f"Fetching {years}-year historical weather for cell ({cell_lat}, {cell_lon})")
             
-            # Process and aggregate data
-            result = self._process_historical_data(data, target_months)
+            # Calculate date range
+            end_date = datetime.now() - timedelta(days=1)  # Yesterday
+            start_date = end_date - timedelta(days=365 * years)
             
-            # Cache the result
             try:
-                with open(cache_file, 'w') as f:
-                    json.dump(result, f)
+                params = {
+                    "parameters": ",".join(self.PARAMETERS),
+                    "community": "AG",
+                    "longitude": cell_lon,
+                    "latitude": cell_lat,
+                    "start": start_date.strftime("%Y%m%d"),
+                    "end": end_date.strftime("%Y%m%d"),
+                    "format": "JSON"
+                }
+                
+                async with get_http_clients().client("nasa") as client:
+                    response = await self.guard.call(client.get, self.BASE_URL, params=params)
+                    response.raise_for_status()
+                    data = response.json()
+                
+                # Aggregate off the event loop; the 5-year payload is ~13k values
+                return await asyncio.to_thread(self._monthly_stats, data)
+                
             except Exception as e:
-                logger.warning(f"Cache write error: {e}")
-            
-            return result
-            
-        except Exception as e:
-            logger.error(f"NASA POWER API error: {e}")
+                logger.error(f"NASA POWER API error: {e}")
+                return None
+        
+        # Memory LRU -> .npz on disk -> NASA POWER (failures are not cached)
+        entry = await self.history_cache.get_or_load_async(cache_key, load)
+        if entry is None:
             return self._get_fallback_data(lat, lon)
+        
+        stored_at, stats = entry
+        return self._stats_to_result(stats, target_months, datetime.fromtimestamp(stored_at).isoformat())
 
     # Sync version for backward compatibility
     def get_historical_weather(self, lat, lon, years=5, target_months=None):
@@ -115,49 +119,76 @@ class NASAPowerService:
         """
         Process raw NASA POWER data into monthly averages and patterns.
         """
+        stats = self._monthly_stats(raw_data)
+        if stats is None:
+            return self._get_fallback_data(0, 0)
+        return self._stats_to_result(stats, target_months, datetime.now().isoformat())
+    
+    def _monthly_stats(self, raw_data: Dict) -> Optional[np.ndarray]:
+        """
+        Reduce a raw NASA POWER response to a (12 months, parameters, 3) array of
+        rounded avg/min/max (NaN where a month has no data). None if the response is empty.
+        """
         properties = raw_data.get("properties", {})
         parameters = properties.get("parameter", {})
         
         if not parameters:
             logger.warning("No parameters in NASA POWER response")
-            return self._get_fallback_data(0, 0)
-        
-        # Organize data by month
-        monthly_data = {m: {p: [] for p in self.PARAMETERS} for m in range(1, 13)}
+            return None
         
-        # Get one parameter to iterate dates
+        # Parse every date once; unparseable dates are dropped (month 0)
         sample_param = list(parameters.keys())[0]
         dates = list(parameters.get(sample_param, {}).keys())
+        months = self._parse_months(dates)
         
-        for date_str in dates:
-            try:
-                date = datetime.strptime(date_str, "%Y%m%d")
-                month = date.month
-                
-                for param in self.PARAMETERS:
-                    value = parameters.get(param, {}).get(date_str)
-                    if value is not None and value > -999:  # Filter missing values
-                        monthly_data[month][param].append(value)
-            except:
-                continue
+        # One row per parameter aligned to the sample dates; missing -> NaN
+        values = np.full((len(self.PARAMETERS), len(dates)), np.nan)
+        for i, param in enumerate(self.PARAMETERS):
+            series = parameters.get(param, {})
+            if list(series) == dates:
+                values[i] = np.array(list(series.values()), dtype=float)
+            else:
+                values[i] = np.array([series.get(d) for d in dates], dtype=float)
+        valid = values > -999  # Filter missing values (-999 fill and NaN)
+        
+        # Group columns by month, keeping date order within each month
+        order = np.argsort(months, kind="stable")
+        bounds = np.searchsorted(months[order], np.arange(1, 14))
         
         # Calculate monthly statistics
+        stats = np.full((12, len(self.PARAMETERS), 3), np.nan)
+        for month in range(1, 13):
+            columns = order[bounds[month - 1]:bounds[month]]
+            month_values = values[:, columns]
+            month_valid = valid[:, columns]
+            
+            for i in range(len(self.PARAMETERS)):
+                v = month_values[i][month_valid[i]]
+                if v.size:
+                    # cumsum adds left to right like sum(), so averages round identically
+                    stats[month - 1, i] = (
+                        round(float(np.cumsum(v)[-1]) / v.size, 1),
+                        round(float(v.min()), 1),
+                        round(float(v.max()), 1)
+                    )
+        
+        return stats
+    
+    def _stats_to_result(self, stats: np.ndarray, target_months: List[int] = None,
+                         generated_at: str = None) -> Dict:
+        """Monthly statistics array -> the monthly_averages response shape."""
         monthly_averages = {}
         for month in range(1, 13):
             if target_months and month not in target_months:
                 continue
-                
+            
             month_stats = {}
-            for param in self.PARAMETERS:
-                values = monthly_data[month][param]
-                if values:
-                    month_stats[param] = {
-                        "avg": round(sum(values) / len(values), 1),
-                        "min": round(min(values), 1),
-                        "max": round(max(values), 1)
-                    }
-                else:
+            for i, param in enumerate(self.PARAMETERS):
+                avg, low, high = stats[month - 1, i].tolist()
+                if avg != avg:  # NaN: no data for this month
                     month_stats[param] = {"avg": None, "min": None, "max": None}
+                else:
+                    month_stats[param] = {"avg": avg, "min": low, "max": high}
             
             monthly_averages[month] = month_stats
         
@@ -165,9 +196,29 @@ class NASAPowerService:
             "source": "NASA_POWER",
             "monthly_averages": monthly_averages,
             "parameters": self.PARAMETERS,
-            "generated_at": datetime.now().isoformat()
+            "generated_at": generated_at
         }
     
+    @staticmethod
+    def _parse_months(dates: List[str]) -> np.ndarray:
+        """Month of each YYYYMMDD string, 0 where the string is not a valid date."""
+        chars = np.array(dates, dtype='U8')
+        digits = chars.view(np.uint32).reshape(len(dates), 8).astype(np.int64) - ord('0')
+        well_formed = (np.char.str_len(chars) == 8) & np.all((digits >= 0) & (digits <= 9), axis=1)
+        
+        year = digits[:, 0] * 1000 + digits[:, 1] * 100 + digits[:, 2] * 10 + digits[:, 3]
+        month = digits[:, 4] * 10 + digits[:, 5]
+        day = digits[:, 6] * 10 + digits[:, 7]
+        valid = well_formed & (year >= 1) & (month >= 1) & (month <= 12) & (day >= 1)
+        
+        # Reject days past the end of the month (e.g. 20230230), as strptime does
+        first = (np.where(valid, year, 1970) - 1970).astype('datetime64[Y]').astype('datetime64[M]') \
+            + (np.where(valid, month, 1) - 1)
+        days_in_month = (first + 1).astype('datetime64[D]') - first.astype('datetime64[D]')
+        valid &= day <= days_in_month.astype(np.int64)
+        
+        return np.where(valid, month, 0).astype(np.int8)
+    
     async def get_growing_season_forecast_async(
         self, 
         lat: float, 
@@ -0,0 +1,67 @@
+"""
+Pre-fork Service Preloading
+
+Loads every heavy model and JSON knowledge base once in the master process
+so forked workers share those pages copy-on-write instead of each loading
+their own copy. Used by gunicorn.conf.py (preload_app = True).
+
+The crop recommender arrays are memory-mapped (ML_MODEL_MMAP), so they stay
+shared no matter how workers are started. Python objects (JSON knowledge
+bases) are only shared after fork, and gc.freeze() keeps the collector from
+touching them - otherwise every worker's first GC pass dirties those pages.
+
+The TensorFlow soil classifier is not preloaded unless
+ML_PRELOAD_SOIL_CLASSIFIER=true: the TF runtime starts threads at import
+and is not fork-safe.
+"""
+
+import gc
+import os
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def preload_services():
+    """Instantiate every singleton service. Safe to call more than once."""
+    start = time.time()
+
+    from services.alert_service import get_alert_service
+    from services.crop_advisory_service import get_crop_advisory_service
+    from services.crop_calendar_service import get_crop_calendar_service
+    from services.crop_faq_service import get_crop_faq_service
+    from services.crop_monitoring_service import get_crop_monitoring_service
+    from services.daily_advisory_service import get_daily_advisory_service
+    from services.pest_warning_service import get_pest_warning_service
+    from services.soil_research_agent import get_soil_research_agent
+
+    loaders = [
+        get_alert_service,
+        get_crop_advisory_service,
+        get_crop_calendar_service,
+        get_crop_faq_service,
+        get_crop_monitoring_service,
+        get_daily_advisory_service,
+        get_pest_warning_service,
+        get_soil_research_agent,
+    ]
+
+    if os.getenv('ML_PRELOAD_SOIL_CLASSIFIER', 'false').lower() in ('1', 'true', 'yes'):
+        from services.soil_image_service import get_classifier
+        loaders.append(get_classifier)
+
+    for loader in loaders:
+        try:
+            loader()
+        except Exception as e:
+            logger.warning(f"Preload of {loader.__name__} failed: {e}")
+
+    logger.info(f"Services preloaded in {time.time() - start:.2f}s")
+
+
+def freeze_for_fork():
+    """Move everything allocated so far out of the collector's reach before forking."""
+    gc.collect()
+    gc.freeze()
+    logger.info(f"gc.freeze(): {gc.get_freeze_count()} objects frozen before fork")
@@ -0,0 +1,173 @@
+"""
+Price Cache - single-file SQLite cache for aggregated mandi prices
+
+Replaces the one-JSON-file-per-MD5-key cache under data/price_cache/. Entries
+live in one table keyed by (commodity, state, district), so lookups are an
+index seek instead of os.path.exists + open + json.load, and nothing piles
+up on disk: rows older than the retention window are swept periodically.
+
+The database runs in WAL mode with a busy timeout, so several uvicorn /
+gunicorn workers can read while one writes. Each thread (and each process
+after a fork) opens its own connection. Calls do blocking I/O; async callers
+run them with asyncio.to_thread.
+
+Stored rows keep their write time, callers decide what is fresh enough:
+
+    entry = cache.get("Paddy", "Andhra Pradesh", "Guntur", max_age=3 * 3600)
+    if entry:
+        stored_at, data = entry
+
+Migrate the old JSON files with scripts/migrate_price_cache.py.
+
+Config (env):
+    PRICE_CACHE_DB                 database file (default data/price_cache.sqlite3)
+    PRICE_CACHE_RETENTION_HOURS    rows older than this are swept (default 48)
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+
+from services.latency_metrics import get_counter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'price_cache.sqlite3')
+DEFAULT_RETENTION_HOURS = 48
+SWEEP_INTERVAL_SECONDS = 600
+BUSY_TIMEOUT_MS = 5000
+
+Entry = Tuple[float, Dict]  # (stored_at, data)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS prices (
+    commodity TEXT NOT NULL,
+    state     TEXT NOT NULL,
+    district  TEXT NOT NULL,  -- '' = whole state
+    stored_at REAL NOT NULL,
+    data      TEXT NOT NULL,
+    PRIMARY KEY (commodity, state, district)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS prices_stored_at ON prices (stored_at);
+"""
+
+
+class PriceCache:
+    """SQLite (WAL) table of aggregated prices keyed by (commodity, state, district)."""
+
+    def __init__(self, path: str = None):
+        self.path = path or os.getenv('PRICE_CACHE_DB') or DEFAULT_DB_PATH
+        self.retention_seconds = float(os.getenv('PRICE_CACHE_RETENTION_HOURS', DEFAULT_RETENTION_HOURS)) * 3600
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+        self._local = threading.local()
+        self._last_sweep = 0.0
+        self._lookups = get_counter(
+            "ml_engine_price_cache_lookups_total",
+            "Mandi price cache lookups by result (hit, expired, miss).",
+            ("result",)
+        )
+        with self.connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def get(self, commodity: str, state: str, district: str = None, max_age: float = None) -> Optional[Entry]:
+        """(stored_at, data) for the key, or None when missing or older than max_age seconds."""
+        try:
+            row = self.connection().execute(
+                "SELECT stored_at, data FROM prices WHERE commodity = ? AND state = ? AND district = ?",
+                (commodity, state, district or '')
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Price cache read error: {e}")
+            return None
+
+        if row is None:
+            self._lookups.inc(result="miss")
+            return None
+        if max_age is not None and time.time() - row[0] >= max_age:
+            self._lookups.inc(result="expired")
+            return None
+        self._lookups.inc(result="hit")
+        return row[0], json.loads(row[1])
+
+    def set(self, commodity: str, state: str, district: str, data: Dict, stored_at: float = None):
+        """
+        Insert or replace the entry for the key, keeping whichever was written last.
+        Imports that pass their own stored_at do not trigger a sweep.
+        """
+        try:
+            with self.connection() as conn:
+                conn.execute(
+                    "INSERT INTO prices (commodity, state, district, stored_at, data) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT (commodity, state, district) DO UPDATE "
+                    "SET stored_at = excluded.stored_at, data = excluded.data "
+                    "WHERE excluded.stored_at >= prices.stored_at",
+                    (commodity, state, district or '', stored_at or time.time(), json.dumps(data))
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Price cache write error: {e}")
+            return
+        if stored_at is None:
+            self._maybe_sweep()
+
+    def sweep(self) -> int:
+        """Delete rows past the retention window. Returns the number removed."""
+        self._last_sweep = time.time()
+        try:
+            with self.connection() as conn:
+                removed = conn.execute(
+                    "DELETE FROM prices WHERE stored_at < ?", (time.time() - self.retention_seconds,)
+                ).rowcount
+        except sqlite3.Error as e:
+            logger.warning(f"Price cache sweep error: {e}")
+            return 0
+        if removed:
+            logger.info(f"Price cache sweep removed {removed} expired entries")
+        return removed
+
+    def clear(self):
+        with self.connection() as conn:
+            conn.execute("DELETE FROM prices")
+
+    def stats(self) -> Dict:
+        try:
+            size, oldest = self.connection().execute("SELECT COUNT(*), MIN(stored_at) FROM prices").fetchone()
+        except sqlite3.Error:
+            size, oldest = None, None
+        return {
+            "size": size,
+            "oldest_age_seconds": round(time.time() - oldest) if oldest else None,
+            "retention_hours": self.retention_seconds / 3600,
+            "path": os.path.abspath(self.path),
+            "lookups": {result: self._lookups.value(result=result) for result in ("hit", "expired", "miss")}
+        }
+
+    def _maybe_sweep(self):
+        if time.time() - self._last_sweep >= SWEEP_INTERVAL_SECONDS:
+            self.sweep()
+
+    def connection(self) -> sqlite3.Connection:
+        """This thread's connection to the price database (also used by mandi_ingestion)."""
+        # One connection per thread; re-open after fork (connections must not cross processes)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+
+# Singleton instance
+_price_cache = None
+
+def get_price_cache() -> PriceCache:
+    """Get or create the shared price cache."""
+    global _price_cache
+    if _price_cache is None:
+        _price_cache = PriceCache()
+    return _price_cache
@@ -0,0 +1,314 @@
+"""
+Price History - append-only mandi price observations plus NumPy trend analytics
+
+The price cache keeps one aggregated snapshot per key for a few hours, and a
+snapshot's min/max spread says little about where prices are heading. Every
+observed row is therefore also appended here, in the price database
+(PRICE_CACHE_DB, table price_history):
+
+    (commodity, state, district, market, day) -> modal/min/max price, source
+
+Rows come from the bulk data.gov.in ingestion, live data.gov.in queries and
+one summary row per source and day for AGMARKNET / eNAM. The key keeps one
+row per market and day, so repeated fetches do not inflate the series.
+Dates are stored as days since 1970-01-01 and prices as integers, so a
+series is loaded straight into NumPy columns:
+
+    history = get_price_history()
+    cols = history.columns("Cotton", "Andhra Pradesh")    # day, modal, min, max arrays
+    stats = history.analytics("Cotton", "Andhra Pradesh")
+    stats["trend"], stats["ma_7"], stats["ma_30"], stats["volatility_30d"]
+
+Analytics reduce the markets to one mean price per calendar day and compute
+7/30-day moving averages (over calendar days, gaps skipped), a 30-day trend
+from a log-linear fit, and 30-day volatility as the spread around that fit.
+Results are memoized for ANALYTICS_TTL_SECONDS per process.
+
+Calls do blocking I/O; async callers run them with asyncio.to_thread.
+
+Config (env):
+    PRICE_HISTORY_RETENTION_DAYS    rows older than this are swept (default 400)
+"""
+
+import os
+import time
+import sqlite3
+import logging
+import threading
+from datetime import date, datetime
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from services.price_cache import get_price_cache
+from services.latency_metrics import get_counter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RETENTION_DAYS = 400
+ANALYTICS_WINDOW_DAYS = 90  # History loaded for analytics
+ANALYTICS_TTL_SECONDS = 600
+SWEEP_INTERVAL_SECONDS = 3600
+MIN_TREND_DAYS = 5  # Observed days in the last 30 needed for a trend
+TREND_THRESHOLD_PCT = 5.0  # 30-day change beyond which the trend is up/down
+VOLATILE_THRESHOLD = 0.10  # 30-day volatility beyond which the trend is "volatile"
+
+DATE_FORMATS = ("%d/%m/%Y", "%Y-%m-%d", "%d-%m-%Y", "%d-%b-%Y")
+EPOCH = date(1970, 1, 1)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS price_history (
+    commodity   TEXT NOT NULL,
+    state       TEXT NOT NULL,
+    district    TEXT NOT NULL COLLATE NOCASE,
+    market      TEXT NOT NULL,
+    day         INTEGER NOT NULL,  -- days since 1970-01-01
+    modal_price INTEGER NOT NULL,
+    min_price   INTEGER,
+    max_price   INTEGER,
+    source      TEXT,
+    PRIMARY KEY (commodity, state, district, market, day)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS price_history_day ON price_history (day);
+"""
+
+# Same layout as mandi_ingestion rows:
+# (commodity, state, district, market, arrival_date, modal, min, max)
+Observation = Tuple[str, str, str, str, str, int, Optional[int], Optional[int]]
+
+
+def to_day(value) -> Optional[int]:
+    """Days since 1970-01-01 for a mandi arrival date ('' or unparseable -> None)."""
+    if isinstance(value, datetime):
+        value = value.date()
+    if isinstance(value, date):
+        return (value - EPOCH).days
+    for fmt in DATE_FORMATS:
+        try:
+            return (datetime.strptime(str(value).strip(), fmt).date() - EPOCH).days
+        except ValueError:
+            continue
+    return None
+
+
+def to_price(value) -> Optional[int]:
+    """Integer price from an upstream field (string, float or missing -> None)."""
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def today() -> int:
+    return to_day(date.today())
+
+
+def daily_series(day: np.ndarray, modal: np.ndarray) -> Tuple[int, np.ndarray]:
+    """
+    Mean modal price per calendar day across markets.
+    Returns (first day, dense float array with NaN on days without data).
+    """
+    days, inverse = np.unique(day, return_inverse=True)
+    means = np.bincount(inverse, weights=modal) / np.bincount(inverse)
+    dense = np.full(days[-1] - days[0] + 1, np.nan)
+    dense[days - days[0]] = means
+    return int(days[0]), dense
+
+
+def moving_average(dense: np.ndarray, window: int) -> np.ndarray:
+    """Trailing mean over `window` calendar days, ignoring NaN days (NaN when the window is empty)."""
+    valid = ~np.isnan(dense)
+    sums = np.concatenate(([0.0], np.cumsum(np.where(valid, dense, 0.0))))
+    counts = np.concatenate(([0], np.cumsum(valid)))
+    hi = np.arange(1, len(dense) + 1)
+    lo = np.maximum(hi - window, 0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (sums[hi] - sums[lo]) / (counts[hi] - counts[lo])
+
+
+def trend_analytics(day: np.ndarray, modal: np.ndarray) -> Optional[Dict]:
+    """Trend, volatility and moving averages for raw (day, modal) observations. None without data."""
+    if len(day) == 0:
+        return None
+    first, dense = daily_series(np.asarray(day, dtype=np.int64), np.asarray(modal, dtype=np.float64))
+    observed = np.flatnonzero(~np.isnan(dense))
+    last = observed[-1]
+
+    # Last 30 calendar days of observed prices
+    recent = observed[observed > last - 30]
+    log_prices = np.log(dense[recent])
+
+    trend_pct, volatility = None, None
+    if len(recent) >= MIN_TREND_DAYS:
+        slope, intercept = np.polyfit(recent, log_prices, 1)
+        trend_pct = float(np.expm1(slope * 30) * 100)
+        # Typical relative deviation from the trend line (0.1 = prices swing about ±10%)
+        volatility = float(np.std(log_prices - (slope * recent + intercept)))
+
+    if trend_pct is None:
+        trend = "unknown"
+    elif volatility > VOLATILE_THRESHOLD:
+        trend = "volatile"
+    elif trend_pct > TREND_THRESHOLD_PCT:
+        trend = "up"
+    elif trend_pct < -TREND_THRESHOLD_PCT:
+        trend = "down"
+    else:
+        trend = "stable"
+
+    def rounded(value):
+        return None if value is None or np.isnan(value) else round(float(value))
+
+    return {
+        "trend": trend,
+        "trend_pct_30d": None if trend_pct is None else round(trend_pct, 1),
+        "volatility_30d": None if volatility is None else round(volatility, 3),
+        "last_price": rounded(dense[last]),
+        "ma_7": rounded(moving_average(dense, 7)[last]),
+        "ma_30": rounded(moving_average(dense, 30)[last]),
+        "days_observed": int(len(observed)),
+        "days_observed_30d": int(len(recent)),
+        "first_date": str(date.fromordinal(EPOCH.toordinal() + first)),
+        "last_date": str(date.fromordinal(EPOCH.toordinal() + first + int(last))),
+    }
+
+
+class PriceHistory:
+    """price_history table in the price database and the NumPy analytics over it."""
+
+    def __init__(self):
+        self.retention_days = int(os.getenv('PRICE_HISTORY_RETENTION_DAYS', DEFAULT_RETENTION_DAYS))
+        self.db = get_price_cache()
+        self._memo = {}  # (commodity, state, district) -> (expires_at, analytics)
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+        self._appended = get_counter(
+            "ml_engine_price_history_rows_total",
+            "Price observations appended to the history by source.",
+            ("source",)
+        )
+
+        with self.db.connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def append(self, rows: Iterable[Observation], source: str) -> int:
+        """Store observations (later rows for the same market and day replace earlier ones). Returns rows written."""
+        fallback_day = today()
+        params = [
+            (commodity, state, district or '', market or 'Unknown', to_day(arrival_date) or fallback_day,
+             modal, low, high, source)
+            for commodity, state, district, market, arrival_date, modal, low, high in rows
+        ]
+        if not params:
+            return 0
+        try:
+            with self.db.connection() as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO price_history (commodity, state, district, market, day, "
+                    "modal_price, min_price, max_price, source) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", params
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Price history write error: {e}")
+            return 0
+
+        self._appended.inc(len(params), source=source)
+        self._invalidate({(commodity, state) for commodity, state, *_ in params})
+        if time.time() - self._last_sweep >= SWEEP_INTERVAL_SECONDS:
+            self.sweep()
+        return len(params)
+
+    def _invalidate(self, keys):
+        """Drop memoized analytics covering the appended (commodity, state) keys, including all-state entries."""
+        commodities = {commodity for commodity, _ in keys}
+        with self._lock:
+            for memo_key in list(self._memo):
+                commodity, state, _ = memo_key
+                if (commodity, state) in keys or (state is None and commodity in commodities):
+                    del self._memo[memo_key]
+
+    def columns(self, commodity: str, state: str = None, district: str = None,
+                days: int = ANALYTICS_WINDOW_DAYS) -> Dict[str, np.ndarray]:
+        """day/modal/min/max columns for the key over the last `days` days (state None = every state)."""
+        query = "SELECT day, modal_price, min_price, max_price FROM price_history WHERE commodity = ? AND day >= ?"
+        params = [commodity, today() - days]
+        if state:
+            query += " AND state = ?"
+            params.append(state)
+        if district:
+            query += " AND district = ?"
+            params.append(district)
+        try:
+            rows = self.db.connection().execute(query + " ORDER BY day", params).fetchall()
+        except sqlite3.Error as e:
+            logger.warning(f"Price history read error: {e}")
+            rows = []
+
+        # NULL min/max become NaN
+        table = np.array(rows, dtype=np.float64).reshape(-1, 4)
+        return {
+            "day": table[:, 0].astype(np.int64),
+            "modal": table[:, 1],
+            "min": table[:, 2],
+            "max": table[:, 3],
+        }
+
+    def analytics(self, commodity: str, state: str = None, district: str = None) -> Optional[Dict]:
+        """Trend/volatility/moving averages for the key (memoized), None without history."""
+        key = (commodity, state, district)
+        now = time.time()
+        with self._lock:
+            cached = self._memo.get(key)
+        if cached and cached[0] > now:
+            return cached[1]
+
+        cols = self.columns(commodity, state, district)
+        result = trend_analytics(cols["day"], cols["modal"])
+        with self._lock:
+            self._memo[key] = (now + ANALYTICS_TTL_SECONDS, result)
+        return result
+
+    def sweep(self) -> int:
+        """Delete rows past the retention window. Returns the number removed."""
+        self._last_sweep = time.time()
+        try:
+            with self.db.connection() as conn:
+                removed = conn.execute(
+                    "DELETE FROM price_history WHERE day < ?", (today() - self.retention_days,)
+                ).rowcount
+        except sqlite3.Error as e:
+            logger.warning(f"Price history sweep error: {e}")
+            return 0
+        if removed:
+            logger.info(f"Price history sweep removed {removed} rows")
+        return removed
+
+    def clear(self):
+        with self.db.connection() as conn:
+            conn.execute("DELETE FROM price_history")
+        with self._lock:
+            self._memo.clear()
+
+    def stats(self) -> Dict:
+        try:
+            rows, commodities, first, last = self.db.connection().execute(
+                "SELECT COUNT(*), COUNT(DISTINCT commodity), MIN(day), MAX(day) FROM price_history"
+            ).fetchone()
+        except sqlite3.Error:
+            rows, commodities, first, last = None, None, None, None
+        return {
+            "rows": rows,
+            "commodities": commodities,
+            "days_covered": last - first + 1 if first is not None else 0,
+            "retention_days": self.retention_days,
+        }
+
+
+# Singleton instance
+_price_history = None
+
+def get_price_history() -> PriceHistory:
+    """Get or create the shared price history."""
+    global _price_history
+    if _price_history is None:
+        _price_history = PriceHistory()
+    return _price_history
@@ -0,0 +1,120 @@
+"""
+Recommendation Cache - Quantized-input LRU cache with TTL
+
+Crop recommendation inputs are low-entropy: soil type from a fixed list,
+one of three seasons, and weather/soil numbers that do not change the
+result below 0.5-unit resolution. Inputs are bucketed to that resolution
+and the computed recommendations are kept in a bounded LRU.
+
+Config (env):
+    RECOMMENDATION_CACHE_SIZE         max entries per cache (default 1024)
+    RECOMMENDATION_CACHE_TTL_SECONDS  entry lifetime (default 3600)
+"""
+
+import os
+import copy
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+QUANTIZE_STEP = 0.5
+DEFAULT_MAX_SIZE = 1024
+DEFAULT_TTL_SECONDS = 3600
+
+
+def quantize(value, step: float = QUANTIZE_STEP):
+    """Snap a numeric input to the nearest bucket (None passes through)."""
+    if value is None:
+        return None
+    return round(float(value) / step) * step
+
+
+class RecommendationCache:
+    """
+    Thread-safe LRU cache with per-entry TTL and hit/miss counters.
+    Values are deep-copied in and out because callers enrich the
+    returned recommendation dicts in place.
+    """
+
+    def __init__(self, name: str, max_size: int = None, ttl_seconds: int = None):
+        self.name = name
+        self.max_size = max_size or int(os.getenv('RECOMMENDATION_CACHE_SIZE', DEFAULT_MAX_SIZE))
+        self.ttl_seconds = ttl_seconds or int(os.getenv('RECOMMENDATION_CACHE_TTL_SECONDS', DEFAULT_TTL_SECONDS))
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return copy.deepcopy(value)
+
+    def set(self, key: Hashable, value: Any):
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Return the cached value for key, computing and storing it on a miss."""
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+
+        value = compute()
+        # Empty results are not cached so the caller's fallback path still runs next time
+        if value:
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0
+            }
+
+
+# Named cache instances (one per recommender)
+_caches: Dict[str, RecommendationCache] = {}
+
+def get_recommendation_cache(name: str) -> RecommendationCache:
+    """Get or create the named recommendation cache."""
+    if name not in _caches:
+        _caches[name] = RecommendationCache(name)
+    return _caches[name]
+
+
+def get_all_cache_stats() -> Dict[str, Dict]:
+    return {name: cache.stats() for name, cache in _caches.items()}
@@ -1,5 +1,6 @@
 import json
 import os
+from services.recommendation_cache import get_recommendation_cache, quantize
 
 # Soil type mapping from research output to crop profile format
 SOIL_MAPPING = {
@@ -25,6 +26,7 @@ class RecommendationService:
     def __init__(self):
         self.profiles_path = os.path.join(os.path.dirname(__file__), '../data/crop_profiles.json')
         self.profiles = self._load_profiles()
+        self.cache = get_recommendation_cache('rule_based')
 
     def _load_profiles(self):
         try:
@@ -111,15 +113,31 @@ class RecommendationService:
             soil_ph, soil_n, soil_p, soil_k: Soil parameters
             forecast: 5-day weather forecast data
             soil_source: Source of soil data ("database", "ai_researched", "fallback")
+        
+        Numeric inputs are bucketed to 0.5 units and results are served
+        from the 'rule_based' recommendation cache.
         """
+        # Only rain days and temperature trend of the forecast affect scoring
+        forecast_analysis = self._analyze_forecast(forecast)
+        temp, soil_ph, soil_n, soil_p, soil_k = (
+            quantize(v) for v in (temp, soil_ph, soil_n, soil_p, soil_k)
+        )
+        
+        cache_key = (soil_type, season, temp, soil_ph, soil_n, soil_p, soil_k,
+                     forecast_analysis["rain_days"], forecast_analysis["temp_trend"], soil_source)
+        return self.cache.get_or_compute(cache_key, lambda: self._compute_recommendations(
+            soil_type, season, temp, soil_ph, soil_n, soil_p, soil_k,
+            forecast_analysis, soil_source
+        ))
+
+    def _compute_recommendations(self, soil_type, season, temp, soil_ph, soil_n, soil_p, soil_k,
+                                 forecast_analysis, soil_source):
+        """Uncached rule-based scoring behind get_recommendations."""
         recommendations = []
         
         # Normalize soil type for matching
         normalized_soils = self._normalize_soil_type(soil_type)
         
-        # Analyze forecast
-        forecast_analysis = self._analyze_forecast(forecast)
-        
         for crop_name, profile in self.profiles.items():
             score = 100
             reasons = []
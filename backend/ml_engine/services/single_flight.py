@@ -0,0 +1,72 @@
+"""
+Single-Flight Request Coalescing
+
+When the daily push goes out, many farmers in the same village send the
+same /recommend request within a few seconds. Instead of each one fanning
+out to OpenWeather, NASA POWER and the mandi price workers, the first
+request (the leader) runs the computation and every identical request
+that arrives while it is in flight awaits the same result.
+
+Only in-flight work is shared - nothing is kept after the leader finishes,
+so this never serves a stale answer.
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from services.latency_metrics import get_counter
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key onto one asyncio task."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self._calls = get_counter(
+            "ml_engine_single_flight_calls_total",
+            "Coalescable calls by outcome (leader = computed, collapsed = shared an in-flight result).",
+            ("name", "outcome")
+        )
+
+    async def do(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._in_flight.get(key)
+        if task is None:
+            self._calls.inc(name=self.name, outcome="leader")
+            task = asyncio.ensure_future(compute())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self._calls.inc(name=self.name, outcome="collapsed")
+            logger.info(f"[{self.name}] Joined in-flight computation ({len(self._in_flight)} in flight)")
+
+        # Shielded: a caller that disconnects must not cancel the shared work
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Retrieve the exception so a failure nobody awaited (every caller
+        # disconnected) is not reported as "Task exception was never retrieved"
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug(f"[{self.name}] In-flight computation failed: {task.exception()!r}")
+
+    def stats(self) -> Dict:
+        return {
+            "in_flight": len(self._in_flight),
+            "leaders": self._calls.value(name=self.name, outcome="leader"),
+            "collapsed": self._calls.value(name=self.name, outcome="collapsed")
+        }
+
+
+# Named instances (one per coalesced endpoint)
+_flights: Dict[str, SingleFlight] = {}
+
+def get_single_flight(name: str) -> SingleFlight:
+    """Get or create the named single-flight group."""
+    if name not in _flights:
+        _flights[name] = SingleFlight(name)
+    return _flights[name]
@@ -379,7 +379,8 @@ class SMSBotService:
                 soil_ph=soil_ph,
                 soil_n=soil_n,
                 soil_p=soil_p,
-                soil_k=soil_k
+                soil_k=soil_k,
+                enrich=False  # SMS only shows crop + score
             )
             
             # Handle both list and dict returns
@@ -17,6 +17,7 @@ from typing import Dict, List, Optional, Tuple
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import hashlib
 import threading
+from services.upstream_guard import get_upstream_guard
 
 logger = logging.getLogger(__name__)
 
@@ -93,10 +94,15 @@ class SoilWorker:
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/json,*/*',
         })
+        self.guard = get_upstream_guard(f"soil:{name.lower()}", profile="soil_research")
     
     def fetch(self, region: str, state: str, district: str = None) -> Optional[Dict]:
         raise NotImplementedError
     
+    def _get(self, url: str, **kwargs) -> requests.Response:
+        """GET through this source's rate limiter / circuit breaker (raises UpstreamUnavailable when open)."""
+        return self.guard.call_sync(self.session.get, url, timeout=self.timeout, **kwargs)
+    
     def _extract_soil_type(self, text: str) -> Optional[str]:
         """Extract soil type from text using patterns."""
         text_lower = text.lower()
@@ -194,7 +200,7 @@ class WikipediaWorker(SoilWorker):
             
             for term in search_terms:
                 url = f"{WIKI_API}/{term}"
-                response = self.session.get(url, timeout=self.timeout)
+                response = self._get(url)
                 
                 if response.status_code == 200:
                     data = response.json()
@@ -247,7 +253,7 @@ class DataGovSoilWorker(SoilWorker):
             for resource in resources:
                 try:
                     url = f"https://api.data.gov.in/resource/{resource}"
-                    response = self.session.get(url, params=params, timeout=self.timeout)
+                    response = self._get(url, params=params)
                     
                     if response.status_code == 200:
                         data = response.json()
@@ -306,7 +312,7 @@ class SoilHealthCardWorker(SoilWorker):
             # Try to access state-specific soil health data
             search_url = f"{SHC_PORTAL}/soilanalysis/districtwise"
             
-            response = self.session.get(search_url, timeout=self.timeout)
+            response = self._get(search_url)
             
             if response.status_code == 200:
                 soup = BeautifulSoup(response.text, 'html.parser')
@@ -358,7 +364,7 @@ class WebSearchWorker(SoilWorker):
                 query = f"{district or region} {state} soil type NPK pH agriculture India"
                 
                 with DDGS() as ddgs:
-                    results = list(ddgs.text(query, max_results=5))
+                    results = self.guard.call_sync(lambda: list(ddgs.text(query, max_results=5)))
                     
                     aggregated_text = ""
                     for r in results:
@@ -402,7 +408,7 @@ class NBSSWorker(SoilWorker):
             # Try NBSS soil map data
             search_url = f"{NBSS_URL}/soil-maps/{state.lower().replace(' ', '-')}"
             
-            response = self.session.get(search_url, timeout=self.timeout)
+            response = self._get(search_url)
             
             if response.status_code == 200:
                 soup = BeautifulSoup(response.text, 'html.parser')
@@ -536,7 +542,7 @@ class SoilResearchAgent:
         
         # Fallback to state defaults
         logger.info(f"Using state default for {region}")
-        return self._get_state_default(state, region)
+        return self.get_state_default(state, region)
     
     def _check_database(self, region: str, state: str, district: str = None) -> Optional[Dict]:
         """Check if region exists in database."""
@@ -634,7 +640,7 @@ class SoilResearchAgent:
             "researched": True
         }
     
-    def _get_state_default(self, state: str, region: str) -> Dict:
+    def get_state_default(self, state: str, region: str) -> Dict:
         """Get state default soil values."""
         defaults = STATE_DEFAULT_SOILS.get(state, {
             "soil": "Loamy",
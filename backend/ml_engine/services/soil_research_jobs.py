@@ -0,0 +1,112 @@
+"""
+Soil Research Jobs - background research for unknown regions
+
+SoilResearchAgent.research_soil fans out to five scrapers and can take up
+to 30 seconds. Running it inside an async request handler stalls every
+other request on the worker, so /recommend answers immediately with the
+state default soil and submits a research job here instead.
+
+Jobs run on a small thread pool and are deduplicated per region: while a
+region is queued or running, further submissions return the same job.
+A completed job's result is handed to an on_complete callback (used to
+write it into the soil DB) and kept for polling via GET /soil/research/jobs/{id}.
+"""
+
+import uuid
+import logging
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+MAX_RESEARCH_THREADS = 2
+MAX_FINISHED_JOBS = 500  # Finished jobs kept for polling (oldest dropped first)
+
+
+class SoilResearchJobs:
+    """Deduplicated background runner for SoilResearchAgent.research_soil."""
+
+    def __init__(self, max_threads: int = MAX_RESEARCH_THREADS):
+        self._executor = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix="soil-research")
+        self._jobs: Dict[str, Dict] = {}
+        self._active: Dict[tuple, str] = {}  # region key -> job_id while queued/running
+        self._lock = threading.Lock()
+
+    def submit(self, region: str, district: str = None, state: str = "Andhra Pradesh",
+               on_complete: Callable[[Dict], None] = None) -> Dict:
+        """Queue research for a region (or join the job already queued/running). Returns the job."""
+        key = ((region or "").strip().lower(), (district or "").strip().lower(), state)
+
+        with self._lock:
+            job_id = self._active.get(key)
+            if job_id:
+                return dict(self._jobs[job_id])
+
+            job_id = uuid.uuid4().hex[:12]
+            self._jobs[job_id] = {
+                "job_id": job_id,
+                "status": "queued",
+                "region": region,
+                "district": district,
+                "state": state,
+                "created_at": datetime.now().isoformat(),
+                "finished_at": None,
+                "result": None,
+                "error": None
+            }
+            self._active[key] = job_id
+            self._trim()
+            job = dict(self._jobs[job_id])
+
+        logger.info(f"Queued soil research job {job_id} for {region} ({district}, {state})")
+        self._executor.submit(self._run, job_id, key, on_complete)
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def _run(self, job_id: str, key: tuple, on_complete: Optional[Callable[[Dict], None]]):
+        self._update(job_id, status="running")
+        job = self.get(job_id)
+        try:
+            from services.soil_research_agent import get_soil_research_agent
+            result = get_soil_research_agent().research_soil(
+                region=job["region"], state=job["state"], district=job["district"]
+            )
+            if result and on_complete:
+                on_complete(result)
+            self._update(job_id, status="completed", result=result)
+            logger.info(f"Soil research job {job_id} completed: {result.get('soil') if result else None}")
+        except Exception as e:
+            logger.warning(f"Soil research job {job_id} failed: {e}")
+            self._update(job_id, status="failed", error=str(e))
+        finally:
+            with self._lock:
+                self._active.pop(key, None)
+
+    def _update(self, job_id: str, **fields):
+        with self._lock:
+            self._jobs[job_id].update(fields)
+            if fields.get("status") in ("completed", "failed"):
+                self._jobs[job_id]["finished_at"] = datetime.now().isoformat()
+
+    def _trim(self):
+        """Drop the oldest finished jobs beyond MAX_FINISHED_JOBS (caller holds the lock)."""
+        finished = [jid for jid, job in self._jobs.items() if job["status"] in ("completed", "failed")]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job_id]
+
+
+# Singleton instance
+_soil_research_jobs = None
+
+def get_soil_research_jobs() -> SoilResearchJobs:
+    """Get or create the soil research job runner."""
+    global _soil_research_jobs
+    if _soil_research_jobs is None:
+        _soil_research_jobs = SoilResearchJobs()
+    return _soil_research_jobs
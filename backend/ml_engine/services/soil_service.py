@@ -1,7 +1,14 @@
+import copy
 import json
 import os
+import threading
 import pandas as pd
-from collections import Counter
+from collections import Counter, namedtuple
+from datetime import datetime
+
+# One consistent view of the soil DB. Never mutated after creation: writers build
+# a new one and swap it in, so readers can iterate it while research saves run.
+SoilMaps = namedtuple("SoilMaps", ["raw_data", "districts_map", "mandal_index"])
 
 class SoilService:
     # Soil type mapping from Agritech to our standard
@@ -20,9 +27,8 @@ class SoilService:
     
     def __init__(self):
         self.db_path = os.path.join(os.path.dirname(__file__), '../data/regions_soil_db.json')
-        self.raw_data = self._load_data()
-        self.districts_map = self._flatten_districts()
-        self.mandal_index = self._build_lookup_index()
+        self._write_lock = threading.Lock()  # Serializes DB updates (request handlers + research threads)
+        self._maps = self._build_maps(self._load_data())
         self.agritech_data = self._load_agritech_data()
     
     def _load_agritech_data(self):
@@ -105,18 +111,34 @@ class SoilService:
             print(f"Error loading soil DB: {e}")
             return {}
 
-    def _flatten_districts(self):
+    @property
+    def raw_data(self):
+        return self._maps.raw_data
+
+    @property
+    def districts_map(self):
+        return self._maps.districts_map
+
+    @property
+    def mandal_index(self):
+        return self._maps.mandal_index
+
+    def _build_maps(self, raw_data):
+        districts_map = self._flatten_districts(raw_data)
+        return SoilMaps(raw_data, districts_map, self._build_lookup_index(districts_map))
+
+    def _flatten_districts(self, raw_data):
         """Flattens State -> District hierarchy into a single District map."""
         flat_map = {}
-        for state, districts in self.raw_data.items():
+        for state, districts in raw_data.items():
             for district_name, district_data in districts.items():
                 flat_map[district_name] = district_data
         return flat_map
 
-    def _build_lookup_index(self):
+    def _build_lookup_index(self, districts_map):
         """Builds a reverse lookup map: Mandal -> District"""
         index = {}
-        for district, d_data in self.districts_map.items():
+        for district, d_data in districts_map.items():
             mandals = d_data.get("mandals", {})
             for mandal in mandals:
                 # Store lowercase for case-insensitive lookup
@@ -134,13 +156,17 @@ class SoilService:
         
         district_key = raw_district.title()
         mandal_key = raw_mandal.title()
+        maps = self._maps  # One snapshot for the whole lookup
 
         # 1. Direct District Lookup (using flattened map)
-        if district_key in self.districts_map:
-            district_data = self.districts_map[district_key]
+        if district_key in maps.districts_map:
+            district_data = maps.districts_map[district_key]
             # Try to find mandal in this district
             if mandal_key and mandal_key in district_data.get("mandals", {}):
-                return district_data["mandals"][mandal_key]
+                return dict(district_data["mandals"][mandal_key])
+            # Researched district-level parameters, if any
+            if district_data.get("default_params"):
+                return dict(district_data["default_params"])
             # If mandal not found or not provided, return district default
             default_soil = district_data.get("default_soil", "Loamy")
             return {
@@ -155,12 +181,12 @@ class SoilService:
         # 2. Global Mandal Lookup (if District not found)
         # Treat the 'district' input as a potential Mandal name (e.g. user searched "Amalapuram")
         search_term = raw_district.lower()
-        if search_term in self.mandal_index:
-            detected_district = self.mandal_index[search_term]
+        if search_term in maps.mandal_index:
+            detected_district = maps.mandal_index[search_term]
             detected_mandal = raw_district.title() # The input was actually a mandal
             
-            # Retrieve the specific mandal data
-            return self.districts_map[detected_district]["mandals"][detected_mandal]
+            # Retrieve the specific mandal data (a copy: callers adjust soil_info in place)
+            return dict(maps.districts_map[detected_district]["mandals"][detected_mandal])
         
         # 3. Agritech.csv Lookup (NEW - check real data)
         agritech_result = self._lookup_agritech(raw_district)
@@ -192,10 +218,22 @@ class SoilService:
             print("Error: District is required for update.")
             return False
 
+        with self._write_lock:
+            raw_data = copy.deepcopy(self._maps.raw_data)
+            self._set_mandal_soil(raw_data, district, mandal, new_soil_type)
+            saved = self._save_db(raw_data)
+
+        if saved:
+            print(f"Successfully updated soil for {mandal}, {district} to {new_soil_type}")
+            return True
+        return False
+
+    def _set_mandal_soil(self, raw_data: dict, district: str, mandal: str, new_soil_type: str):
+        """Apply a soil type update to raw_data (the writer's private copy) in place."""
         # Ensure District exists in raw_data (State lookup needed)
         # For simplicity, we search which state contains this district
         target_state = None
-        for state, districts in self.raw_data.items():
+        for state, districts in raw_data.items():
             if district in districts:
                 target_state = state
                 break
@@ -203,13 +241,13 @@ class SoilService:
         if not target_state:
             # Default to AP if not found (or create new state logic)
             target_state = "Andhra Pradesh" 
-            if target_state not in self.raw_data:
-                self.raw_data[target_state] = {}
-            if district not in self.raw_data[target_state]:
-                self.raw_data[target_state][district] = {"default_soil": new_soil_type, "mandals": {}}
+            if target_state not in raw_data:
+                raw_data[target_state] = {}
+            if district not in raw_data[target_state]:
+                raw_data[target_state][district] = {"default_soil": new_soil_type, "mandals": {}}
 
         # Update Logic
-        district_data = self.raw_data[target_state][district]
+        district_data = raw_data[target_state][district]
         
         if mandal:
             if "mandals" not in district_data:
@@ -227,15 +265,61 @@ class SoilService:
             # Update District Default
             district_data["default_soil"] = new_soil_type
 
-        # Persist to File
+    def save_researched_soil(self, district: str, mandal: str, data: dict):
+        """
+        Stores AI-researched soil parameters for a Mandal (or District) so the
+        region resolves from the DB from now on. Persists to DB.
+        """
+        district = district.title() if district else ""
+        mandal = mandal.title() if mandal else ""
+        if not district:
+            return False
+
+        entry = {
+            "soil": data.get("soil", "Loamy"),
+            "ph": data.get("ph", 7.0),
+            "n": data.get("n", 150),
+            "p": data.get("p", 50),
+            "k": data.get("k", 150),
+            "zone": data.get("zone", f"Researched data for {mandal or district}"),
+            "source": "AI Research",
+            "researched_at": datetime.now().isoformat()
+        }
+
+        with self._write_lock:
+            raw_data = copy.deepcopy(self._maps.raw_data)
+            target_state = next(
+                (state for state, districts in raw_data.items() if district in districts),
+                "Andhra Pradesh"
+            )
+            districts = raw_data.setdefault(target_state, {})
+            district_data = districts.setdefault(district, {"default_soil": entry["soil"], "mandals": {}})
+
+            if mandal:
+                district_data.setdefault("mandals", {})[mandal] = entry
+            else:
+                district_data["default_soil"] = entry["soil"]
+                district_data["default_params"] = entry
+            saved = self._save_db(raw_data)
+
+        if saved:
+            print(f"Saved researched soil for {mandal or '-'}, {district}: {entry['soil']}")
+            return True
+        return False
+
+    def _save_db(self, raw_data: dict):
+        """
+        Persist an updated copy of raw_data and swap it in. Callers hold _write_lock.
+        The file is replaced atomically; readers switch to the new maps in one assignment.
+        """
         try:
-            with open(self.db_path, 'w') as f:
-                json.dump(self.raw_data, f, indent=4)
+            tmp_path = f"{self.db_path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(raw_data, f, indent=4)
+            os.replace(tmp_path, self.db_path)
             
             # Refresh in-memory maps
-            self.districts_map = self._flatten_districts()
-            self.mandal_index = self._build_lookup_index()
-            print(f"Successfully updated soil for {mandal}, {district} to {new_soil_type}")
+            self._maps = self._build_maps(raw_data)
             return True
         except Exception as e:
             print(f"Error saving soil DB: {e}")
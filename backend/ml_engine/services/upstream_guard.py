@@ -0,0 +1,296 @@
+"""
+Upstream Guard - rate limiting, circuit breaking and hedging for outbound calls
+
+Every external dependency (OpenWeather, NASA POWER, the mandi price sources,
+the soil research scrapers) is called through a named UpstreamGuard:
+
+    guard = get_upstream_guard("openweather")
+    response = await guard.call(client.get, url, params=params, hedge=True)
+
+    response = guard.call_sync(session.get, url, timeout=10)
+
+Each guard has
+- a token bucket, so a burst of requests cannot exceed the upstream's quota.
+  When no token frees up within max_wait the call is rejected instead of
+  queueing behind it.
+- a circuit breaker. After failure_threshold consecutive failures (exceptions,
+  HTTP 5xx or 429) it opens and calls fail immediately with UpstreamUnavailable
+  for recovery_timeout seconds. Then one probe call is let through; success
+  closes the breaker, failure re-opens it.
+- optional hedging (async only). When the call has not answered after
+  hedge_after seconds a duplicate is sent and the first good response wins.
+  Only for idempotent GETs; the duplicate needs a spare token.
+
+Callers already degrade on exceptions (MSP prices, mock forecast, NASA
+_get_fallback_data, state default soil), so a rejected call lands on the
+same fallback - just without waiting for a timeout first.
+
+Breaker state is served at GET /upstreams/status and calls are counted in
+ml_engine_upstream_calls_total{upstream, outcome} at /metrics.
+
+Config (env):
+    UPSTREAM_HEDGING    enable hedged requests (default true)
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from services.latency_metrics import get_counter
+
+logger = logging.getLogger(__name__)
+
+# rate: tokens/s, burst: bucket size, max_wait: seconds to wait for a token,
+# failure_threshold: consecutive failures that open the breaker,
+# recovery_timeout: seconds open before a probe, hedge_after: seconds (None = never)
+UPSTREAM_CONFIG = {
+    "openweather": {"rate": 10.0, "burst": 20, "max_wait": 0.5, "failure_threshold": 5, "recovery_timeout": 30.0, "hedge_after": 0.8},
+    "nasa_power": {"rate": 2.0, "burst": 5, "max_wait": 2.0, "failure_threshold": 3, "recovery_timeout": 60.0, "hedge_after": None},
+    "data.gov.in": {"rate": 5.0, "burst": 10, "max_wait": 1.0, "failure_threshold": 5, "recovery_timeout": 60.0, "hedge_after": 2.0},
+    "agmarknet": {"rate": 2.0, "burst": 5, "max_wait": 1.0, "failure_threshold": 3, "recovery_timeout": 120.0, "hedge_after": None},
+    "enam": {"rate": 2.0, "burst": 5, "max_wait": 1.0, "failure_threshold": 3, "recovery_timeout": 120.0, "hedge_after": None},
+    "ap_agrisnet": {"rate": 2.0, "burst": 5, "max_wait": 1.0, "failure_threshold": 3, "recovery_timeout": 300.0, "hedge_after": None},
+    "soil_research": {"rate": 1.0, "burst": 5, "max_wait": 5.0, "failure_threshold": 3, "recovery_timeout": 300.0, "hedge_after": None},
+    "default": {"rate": 5.0, "burst": 10, "max_wait": 1.0, "failure_threshold": 5, "recovery_timeout": 60.0, "hedge_after": None},
+}
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class UpstreamUnavailable(Exception):
+    """Call rejected without reaching the upstream (breaker open or rate limited)."""
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at `rate` tokens/s."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self) -> float:
+        """Take a token if one is available. Returns 0, or the seconds until one will be."""
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def available(self) -> float:
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed -> open -> half_open (one probe) -> closed."""
+
+    def __init__(self, failure_threshold: int, recovery_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.recovery_timeout:
+                self.state = HALF_OPEN
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def release(self):
+        """A probe was admitted but never reached the upstream."""
+        with self._lock:
+            self._probing = False
+
+    def record(self, success: bool) -> Optional[str]:
+        """Record an outcome. Returns the new state when it changed."""
+        with self._lock:
+            previous = self.state
+            self._probing = False
+            if success:
+                self.failures = 0
+                self.state = CLOSED
+            else:
+                self.failures += 1
+                if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                    self.state = OPEN
+                    self.opened_at = time.monotonic()
+            return self.state if self.state != previous else None
+
+    def status(self) -> Dict:
+        with self._lock:
+            retry_in = None
+            if self.state == OPEN:
+                retry_in = round(max(0.0, self.recovery_timeout - (time.monotonic() - self.opened_at)), 1)
+            return {
+                "state": self.state,
+                "consecutive_failures": self.failures,
+                "failure_threshold": self.failure_threshold,
+                "retry_in_seconds": retry_in
+            }
+
+
+def _is_upstream_error(result: Any) -> bool:
+    """HTTP responses count as failures on 5xx and 429 (other results always succeed)."""
+    status = getattr(result, "status_code", None)
+    return status is not None and (status >= 500 or status == 429)
+
+
+class UpstreamGuard:
+    """Token bucket + circuit breaker (+ optional hedging) for one upstream."""
+
+    def __init__(self, name: str, profile: str = None):
+        self.name = name
+        config = UPSTREAM_CONFIG.get(profile or name, UPSTREAM_CONFIG["default"])
+        self.max_wait = config["max_wait"]
+        self.hedge_after = config["hedge_after"]
+        self.bucket = TokenBucket(config["rate"], config["burst"])
+        self.breaker = CircuitBreaker(config["failure_threshold"], config["recovery_timeout"])
+        self._calls = get_counter(
+            "ml_engine_upstream_calls_total",
+            "Outbound calls by upstream and outcome (success, failure, short_circuited, rate_limited, hedged).",
+            ("upstream", "outcome")
+        )
+
+    async def call(self, fn: Callable, *args, hedge: bool = False, **kwargs) -> Any:
+        """Await fn(*args, **kwargs) through the guard. Raises UpstreamUnavailable when rejected."""
+        self._admit()
+        try:
+            wait = self.bucket.try_acquire()
+            while wait:
+                if wait > self.max_wait:
+                    self._reject_rate_limited()
+                await asyncio.sleep(wait)
+                wait = self.bucket.try_acquire()
+
+            if hedge and self.hedge_after and _hedging_enabled():
+                result = await self._hedged(fn, args, kwargs)
+            else:
+                result = await fn(*args, **kwargs)
+        except UpstreamUnavailable:
+            raise
+        except asyncio.CancelledError:
+            self.breaker.release()
+            raise
+        except Exception:
+            self._record(False)
+            raise
+        self._record(not _is_upstream_error(result))
+        return result
+
+    def call_sync(self, fn: Callable, *args, **kwargs) -> Any:
+        """Blocking variant of call (no hedging) for requests-based callers and worker threads."""
+        self._admit()
+        wait = self.bucket.try_acquire()
+        while wait:
+            if wait > self.max_wait:
+                self._reject_rate_limited()
+            time.sleep(wait)
+            wait = self.bucket.try_acquire()
+
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self._record(False)
+            raise
+        self._record(not _is_upstream_error(result))
+        return result
+
+    async def _hedged(self, fn: Callable, args, kwargs) -> Any:
+        primary = asyncio.ensure_future(fn(*args, **kwargs))
+        pending = {primary}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=self.hedge_after)
+            if done or self.bucket.try_acquire() > 0:
+                # Answered in time, or no spare token for a duplicate
+                return await primary
+
+            self._calls.inc(upstream=self.name, outcome="hedged")
+            pending.add(asyncio.ensure_future(fn(*args, **kwargs)))
+            last = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None and not _is_upstream_error(task.result()):
+                        return task.result()
+                    last = task
+            # Both attempts failed: surface the last error (or error response)
+            return last.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def _admit(self):
+        if not self.breaker.allow():
+            self._calls.inc(upstream=self.name, outcome="short_circuited")
+            raise UpstreamUnavailable(f"{self.name}: circuit open")
+
+    def _reject_rate_limited(self):
+        self.breaker.release()
+        self._calls.inc(upstream=self.name, outcome="rate_limited")
+        raise UpstreamUnavailable(f"{self.name}: rate limited")
+
+    def _record(self, success: bool):
+        self._calls.inc(upstream=self.name, outcome="success" if success else "failure")
+        changed = self.breaker.record(success)
+        if changed == OPEN:
+            logger.warning(f"[{self.name}] Circuit opened after {self.breaker.failures} failures "
+                           f"(retry in {self.breaker.recovery_timeout:.0f}s)")
+        elif changed == CLOSED:
+            logger.info(f"[{self.name}] Circuit closed")
+
+    def status(self) -> Dict:
+        status = self.breaker.status()
+        status.update({
+            "tokens_available": round(self.bucket.available(), 2),
+            "rate_per_second": self.bucket.rate,
+            "burst": self.bucket.burst,
+            "hedge_after_seconds": self.hedge_after,
+            "calls": {
+                outcome: self._calls.value(upstream=self.name, outcome=outcome)
+                for outcome in ("success", "failure", "short_circuited", "rate_limited", "hedged")
+            }
+        })
+        return status
+
+
+def _hedging_enabled() -> bool:
+    return os.getenv('UPSTREAM_HEDGING', 'true').lower() in ('1', 'true', 'yes')
+
+
+# Named guards (one per upstream)
+_guards: Dict[str, UpstreamGuard] = {}
+_guards_lock = threading.Lock()
+
+def get_upstream_guard(name: str, profile: str = None) -> UpstreamGuard:
+    """Get or create the guard for an upstream. `profile` picks the UPSTREAM_CONFIG entry (defaults to name)."""
+    with _guards_lock:
+        if name not in _guards:
+            _guards[name] = UpstreamGuard(name, profile)
+        return _guards[name]
+
+
+def get_upstream_status() -> Dict:
+    with _guards_lock:
+        guards = dict(_guards)
+    return {name: guard.status() for name, guard in sorted(guards.items())}
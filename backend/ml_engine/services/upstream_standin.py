@@ -0,0 +1,370 @@
+"""
+Upstream Stand-in - offline replacement for OpenWeather, NASA POWER and the mandi sources
+
+A small ASGI app that answers the requests the services send to their
+upstreams, so /recommend, /daily-plan and the price workers can be load
+tested without network access or API quotas. Point the ML engine at it with
+
+    UPSTREAM_STANDIN_URL=http://127.0.0.1:8900   # stand-in running as a server
+    UPSTREAM_STANDIN_URL=inprocess               # mounted in-process, no sockets
+
+and the pooled clients in services/http_clients.py rewrite
+https://<host>/<path> to <stand-in>/<host>/<path>. Only the async (httpx)
+call paths are redirected; sync requests-based callers still go out.
+
+Responses are replayed from recorded fixtures under data/upstream_fixtures/
+when present (record them once with `--record`, needs OPENWEATHER_KEY and
+network), otherwise synthesized in the upstream's schema.
+
+Each upstream has its own behaviour - latency (mean +- jitter), error rate
+(HTTP 503) and timeout rate (the response hangs past any client timeout):
+
+    STANDIN_BEHAVIOUR["nasa_power"] = {"latency_ms": 2500, "jitter_ms": 800, ...}
+
+Override it with a JSON file (STANDIN_CONFIG), with configure() in-process,
+or at runtime with POST /_standin/config. GET /_standin/stats counts the
+requests served per upstream and outcome.
+
+Run as a server:
+    python -m services.upstream_standin --port 8900
+    python -m services.upstream_standin --record
+
+Config (env):
+    STANDIN_CONFIG      JSON file overriding STANDIN_BEHAVIOUR
+    STANDIN_SEED        random seed for latency/error draws (default 42)
+"""
+
+import os
+import json
+import time
+import random
+import asyncio
+import hashlib
+import logging
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+import numpy as np
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, JSONResponse, Response
+
+logger = logging.getLogger(__name__)
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), '..', 'data', 'upstream_fixtures')
+TIMEOUT_HANG_SECONDS = 120.0
+NASA_BODY_CACHE_SIZE = 64  # synthesized 5-year responses are ~240 KB each
+
+# Upstream host -> name (names match services/upstream_guard.py)
+STANDIN_HOSTS = {
+    "api.openweathermap.org": "openweather",
+    "power.larc.nasa.gov": "nasa_power",
+    "api.data.gov.in": "data.gov.in",
+    "agmarknet.gov.in": "agmarknet",
+    "enam.gov.in": "enam",
+    "www.apagrisnet.gov.in": "ap_agrisnet",
+}
+
+# Defaults roughly match what the real upstreams do from an Indian region
+STANDIN_BEHAVIOUR = {
+    "openweather": {"latency_ms": 150, "jitter_ms": 60, "error_rate": 0.01, "timeout_rate": 0.0},
+    "nasa_power": {"latency_ms": 2500, "jitter_ms": 800, "error_rate": 0.02, "timeout_rate": 0.01},
+    "data.gov.in": {"latency_ms": 900, "jitter_ms": 400, "error_rate": 0.03, "timeout_rate": 0.01},
+    "agmarknet": {"latency_ms": 1800, "jitter_ms": 900, "error_rate": 0.05, "timeout_rate": 0.02},
+    "enam": {"latency_ms": 700, "jitter_ms": 300, "error_rate": 0.05, "timeout_rate": 0.01},
+    "ap_agrisnet": {"latency_ms": 400, "jitter_ms": 150, "error_rate": 0.05, "timeout_rate": 0.0},
+}
+
+
+def configure(overrides: Dict[str, Dict]):
+    """Merge per-upstream behaviour overrides, e.g. {"nasa_power": {"error_rate": 0.5}}."""
+    for name, behaviour in overrides.items():
+        STANDIN_BEHAVIOUR.setdefault(name, {"latency_ms": 0, "jitter_ms": 0, "error_rate": 0.0, "timeout_rate": 0.0})
+        STANDIN_BEHAVIOUR[name].update(behaviour)
+
+
+if os.getenv('STANDIN_CONFIG'):
+    with open(os.getenv('STANDIN_CONFIG')) as f:
+        configure(json.load(f))
+
+_rng = random.Random(int(os.getenv('STANDIN_SEED', 42)))
+_served = Counter()  # (upstream, outcome) -> requests
+_fixtures: Dict[str, Optional[bytes]] = {}
+_nasa_bodies: Dict[tuple, bytes] = {}
+
+app = FastAPI(title="KisanMitra Upstream Stand-in")
+
+
+@app.get("/_standin/stats")
+async def standin_stats():
+    stats = {}
+    for (upstream, outcome), count in sorted(_served.items()):
+        stats.setdefault(upstream, {})[outcome] = count
+    return {"behaviour": STANDIN_BEHAVIOUR, "served": stats}
+
+
+@app.post("/_standin/config")
+async def standin_config(overrides: Dict[str, Dict]):
+    configure(overrides)
+    return {"behaviour": STANDIN_BEHAVIOUR}
+
+
+@app.get("/{host}/{path:path}")
+async def upstream(host: str, path: str, request: Request):
+    name = STANDIN_HOSTS.get(host)
+    if name is None:
+        _served[(host, "unknown_host")] += 1
+        return JSONResponse({"error": f"no stand-in for {host}"}, status_code=404)
+
+    behaviour = STANDIN_BEHAVIOUR[name]
+    draw = _rng.random()
+    if draw < behaviour["timeout_rate"]:
+        _served[(name, "timeout")] += 1
+        await asyncio.sleep(TIMEOUT_HANG_SECONDS)
+        return Response(status_code=504)
+
+    latency = max(0.0, _rng.gauss(behaviour["latency_ms"], behaviour["jitter_ms"])) / 1000
+    await asyncio.sleep(latency)
+    if draw < behaviour["timeout_rate"] + behaviour["error_rate"]:
+        _served[(name, "error")] += 1
+        return JSONResponse({"error": "stand-in injected failure"}, status_code=503)
+
+    _served[(name, "ok")] += 1
+    return RESPONDERS[name](path, request.query_params)
+
+
+# ============ RESPONDERS ============
+
+def _fixture(name: str) -> Optional[bytes]:
+    """Recorded response body for data/upstream_fixtures/<name>, cached after the first read."""
+    if name not in _fixtures:
+        path = os.path.join(FIXTURE_DIR, name)
+        try:
+            with open(path, 'rb') as f:
+                _fixtures[name] = f.read()
+        except FileNotFoundError:
+            _fixtures[name] = None
+    return _fixtures[name]
+
+
+def _seed(*parts) -> int:
+    return int(hashlib.md5("|".join(str(p) for p in parts).encode()).hexdigest()[:8], 16)
+
+
+def _weather_slot(rng: random.Random, dt: int) -> Dict:
+    temp = round(rng.uniform(24, 36), 1)
+    rain = round(rng.choice([0, 0, 0, 0.4, 2.5, 8.0]), 1)
+    return {
+        "dt": dt,
+        "main": {"temp": temp, "feels_like": temp + 2, "temp_min": temp - 2, "temp_max": temp + 2,
+                 "pressure": 1008, "humidity": rng.randint(45, 90)},
+        "weather": [{"main": "Rain" if rain else "Clouds",
+                     "description": "light rain" if rain else "scattered clouds",
+                     "icon": "10d" if rain else "03d"}],
+        "wind": {"speed": round(rng.uniform(1, 7), 1)},
+        "rain": {"3h": rain},
+        "visibility": 10000,
+    }
+
+
+def _openweather(path: str, params) -> Response:
+    kind = "forecast" if path.endswith("forecast") else "weather"
+    now = int(time.time())
+    recorded = _fixture(f"openweather/{kind}.json")
+    if recorded is not None:
+        payload = json.loads(recorded)
+        # Rebase recorded timestamps so the forecast always starts now
+        if kind == "forecast" and payload.get("list"):
+            shift = now - payload["list"][0]["dt"]
+            for slot in payload["list"]:
+                slot["dt"] += shift
+        else:
+            payload["dt"] = now
+        return JSONResponse(payload)
+
+    rng = random.Random(_seed(params.get("lat"), params.get("lon"), now // 3600))
+    if kind == "forecast":
+        return JSONResponse({"cnt": 40, "list": [_weather_slot(rng, now + i * 3 * 3600) for i in range(40)]})
+    return JSONResponse(dict(_weather_slot(rng, now), name="Stand-in"))
+
+
+def _nasa_power(path: str, params) -> Response:
+    recorded = _fixture("nasa_power/daily_point.json")
+    if recorded is not None:
+        return Response(recorded, media_type="application/json")
+
+    key = (params.get("latitude"), params.get("longitude"), params.get("start"), params.get("end"))
+    body = _nasa_bodies.get(key)
+    if body is None:
+        start = datetime.strptime(params.get("start", "20200101"), "%Y%m%d")
+        end = datetime.strptime(params.get("end", "20241231"), "%Y%m%d")
+        days = (end - start).days + 1
+        dates = [(start + timedelta(days=i)).strftime("%Y%m%d") for i in range(days)]
+        month = np.array([int(d[4:6]) for d in dates])
+        season = np.sin((month - 3) / 12 * 2 * np.pi)  # Peaks in June
+        monsoon = np.isin(month, [6, 7, 8, 9])
+        gen = np.random.default_rng(_seed(*key))
+        series = {
+            "T2M_MAX": 33 + 5 * season + gen.normal(0, 1.5, days),
+            "T2M_MIN": 21 + 5 * season + gen.normal(0, 1.5, days),
+            "T2M": 27 + 5 * season + gen.normal(0, 1.2, days),
+            "PRECTOTCORR": np.where(monsoon, gen.gamma(1.2, 6.0, days), gen.gamma(0.3, 2.0, days)),
+            "RH2M": np.clip(60 + 20 * monsoon + gen.normal(0, 8, days), 10, 100),
+            "ALLSKY_SFC_SW_DWN": 18 + 3 * season + gen.normal(0, 2, days),
+            "WS2M": np.abs(2 + gen.normal(0, 0.8, days)),
+        }
+        parameter = {
+            name: dict(zip(dates, np.round(values, 2).tolist()))
+            for name, values in series.items()
+        }
+        body = json.dumps({"properties": {"parameter": parameter}}).encode()
+        if len(_nasa_bodies) >= NASA_BODY_CACHE_SIZE:
+            _nasa_bodies.pop(next(iter(_nasa_bodies)))
+        _nasa_bodies[key] = body
+    return Response(body, media_type="application/json")
+
+
+def _base_price(commodity: str) -> int:
+    # Imported lazily: the market service pulls in bs4, the stand-in should not need it to start
+    from services.market_price_service import COMMODITY_MAPPINGS, MSP_PRICES
+    for canonical, aliases in COMMODITY_MAPPINGS.items():
+        if commodity in aliases and canonical in MSP_PRICES:
+            return MSP_PRICES[canonical]["price"]
+    return MSP_PRICES.get(commodity, {}).get("price", 3000)
+
+
+def _data_gov(path: str, params) -> Response:
+    recorded = _fixture("data.gov.in/resource.json")
+    if recorded is not None:
+        return Response(recorded, media_type="application/json")
+
+    state = params.get("filters[state]", "Andhra Pradesh")
+    limit = int(params.get("limit", 10))
+    offset = int(params.get("offset", 0))
+    if "filters[commodity]" in params:
+        commodities = [params["filters[commodity]"]]
+    else:
+        # Bulk download: every commodity for the state, paged with offset/limit
+        from services.market_price_service import COMMODITY_MAPPINGS
+        commodities = sorted({aliases[0] for aliases in COMMODITY_MAPPINGS.values()})
+
+    today = datetime.now().strftime("%d/%m/%Y")
+    records = []
+    for commodity in commodities:
+        rng = random.Random(_seed(commodity, state, datetime.now().date()))
+        base = _base_price(commodity)
+        for i in range(rng.randint(4, 20)):
+            modal = round(base * rng.uniform(0.9, 1.15))
+            records.append({
+                "state": state,
+                "district": params.get("filters[district]", f"District {i % 5 + 1}"),
+                "market": f"Market {i + 1}",
+                "commodity": commodity,
+                "arrival_date": today,
+                "min_price": str(round(modal * 0.92)),
+                "max_price": str(round(modal * 1.08)),
+                "modal_price": str(modal),
+            })
+    page = records[offset:offset + limit]
+    return JSONResponse({"total": len(records), "count": len(page), "offset": offset, "records": page})
+
+
+def _agmarknet(path: str, params) -> Response:
+    recorded = _fixture("agmarknet/SearchCmmMkt.html")
+    if recorded is not None:
+        return HTMLResponse(recorded)
+
+    commodity = params.get("Tx_Commodity", "Paddy")
+    rng = random.Random(_seed("agmarknet", commodity, datetime.now().date()))
+    base = _base_price(commodity)
+    rows = "".join(
+        f"<tr><td>Market {i + 1}</td><td>{commodity}</td><td>{round(base * rng.uniform(0.9, 1.15))}</td></tr>"
+        for i in range(rng.randint(3, 12))
+    )
+    return HTMLResponse(f"<html><body><table><tr><th>Market</th><th>Commodity</th><th>Modal Price</th></tr>"
+                        f"{rows}</table></body></html>")
+
+
+def _enam(path: str, params) -> Response:
+    recorded = _fixture("enam/trade_data.json")
+    if recorded is not None:
+        return Response(recorded, media_type="application/json")
+
+    commodity = path.rsplit(",", 1)[-1].title()
+    rng = random.Random(_seed("enam", commodity, datetime.now().date()))
+    base = _base_price(commodity)
+    return JSONResponse([{"modal_price": round(base * rng.uniform(0.9, 1.15))} for _ in range(rng.randint(2, 8))])
+
+
+def _ap_agrisnet(path: str, params) -> Response:
+    recorded = _fixture("ap_agrisnet/market-prices.json")
+    return Response(recorded or b"{}", media_type="application/json")
+
+
+RESPONDERS = {
+    "openweather": _openweather,
+    "nasa_power": _nasa_power,
+    "data.gov.in": _data_gov,
+    "agmarknet": _agmarknet,
+    "enam": _enam,
+    "ap_agrisnet": _ap_agrisnet,
+}
+
+
+# ============ RECORDING ============
+
+def record_fixtures(lat: float = 16.29, lon: float = 80.45, commodity: str = "Paddy", state: str = "Andhra Pradesh"):
+    """Save one real response per upstream endpoint under data/upstream_fixtures/."""
+    import requests
+    from services.nasa_power_service import NASAPowerService
+    from services.market_price_service import DATA_GOV_API, DATA_GOV_KEY, AGMARKNET_URL
+
+    end = datetime.now() - timedelta(days=1)
+    today = datetime.now().strftime('%d-%b-%Y')
+    weather_params = {"lat": lat, "lon": lon, "appid": os.getenv("OPENWEATHER_KEY"), "units": "metric"}
+    targets = {
+        "openweather/weather.json": ("https://api.openweathermap.org/data/2.5/weather", weather_params),
+        "openweather/forecast.json": ("https://api.openweathermap.org/data/2.5/forecast", weather_params),
+        "nasa_power/daily_point.json": (NASAPowerService.BASE_URL, {
+            "parameters": ",".join(NASAPowerService.PARAMETERS), "community": "AG",
+            "longitude": lon, "latitude": lat, "format": "JSON",
+            "start": (end - timedelta(days=365 * 5)).strftime("%Y%m%d"), "end": end.strftime("%Y%m%d"),
+        }),
+        "data.gov.in/resource.json": (DATA_GOV_API, {
+            "api-key": DATA_GOV_KEY, "format": "json", "limit": 20,
+            "filters[commodity]": commodity, "filters[state]": state,
+        }),
+        "agmarknet/SearchCmmMkt.html": (AGMARKNET_URL, {
+            "Tx_Commodity": commodity, "Tx_State": state, "DateFrom": today, "DateTo": today,
+        }),
+        "enam/trade_data.json": (f"https://enam.gov.in/web/Ajax_ctrl/trade_data_,commodity_,,{commodity.lower()}", None),
+    }
+
+    for name, (url, params) in targets.items():
+        try:
+            response = requests.get(url, params=params, timeout=60)
+            response.raise_for_status()
+        except Exception as e:
+            print(f"❌ {name}: {e}")
+            continue
+        path = os.path.join(FIXTURE_DIR, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(response.content)
+        print(f"✅ {name} ({len(response.content)} bytes)")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Offline stand-in for the ML engine's upstream APIs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--record", action="store_true", help="record fixtures from the real upstreams and exit")
+    args = parser.parse_args()
+
+    if args.record:
+        record_fixtures()
+    else:
+        import uvicorn
+        uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,218 @@
+"""
+Weather Cache - geo-quantized read-through cache for OpenWeather payloads
+
+Farms in one village share weather, so raw OpenWeather responses are cached
+per grid cell (WEATHER_CACHE_CELL_DEG, default 0.05 deg ~ 5.5 km) rather
+than per exact coordinate. Upstream calls are made for the cell centre, so
+every farm in the cell sees the same answer.
+
+Current conditions and the 3-hourly forecast have separate TTLs. Entries
+live in an in-memory LRU; an optional on-disk tier (WEATHER_CACHE_DISK=true)
+keeps them across restarts and between worker processes. Concurrent async
+misses for the same cell share one upstream call.
+
+Consumers (WeatherService, CropMonitoringService, DailyAdvisoryService via
+WeatherService) cache the raw payload and parse it themselves; cached
+payloads are shared and must be treated as read-only.
+
+Config (env):
+    WEATHER_CACHE_CELL_DEG         grid cell size in degrees (default 0.05)
+    WEATHER_CACHE_CURRENT_TTL      current conditions TTL in seconds (default 600)
+    WEATHER_CACHE_FORECAST_TTL     forecast TTL in seconds (default 3600)
+    WEATHER_CACHE_SIZE             max in-memory entries (default 4096)
+    WEATHER_CACHE_DISK             enable the disk tier (default false)
+    WEATHER_CACHE_DIR              disk tier directory (default data/weather_cache/openweather)
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from services.latency_metrics import get_counter
+from services.single_flight import get_single_flight
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CELL_DEG = 0.05
+DEFAULT_TTLS = {"current": 600, "forecast": 3600}
+DEFAULT_MAX_SIZE = 4096
+DEFAULT_DISK_DIR = os.path.join(os.path.dirname(__file__), '..', 'data', 'weather_cache', 'openweather')
+
+
+class WeatherCache:
+    """Two-tier (memory LRU + optional disk) cache keyed by (kind, grid cell)."""
+
+    def __init__(self):
+        self.cell_deg = float(os.getenv('WEATHER_CACHE_CELL_DEG', DEFAULT_CELL_DEG))
+        self.ttls = {
+            "current": int(os.getenv('WEATHER_CACHE_CURRENT_TTL', DEFAULT_TTLS["current"])),
+            "forecast": int(os.getenv('WEATHER_CACHE_FORECAST_TTL', DEFAULT_TTLS["forecast"]))
+        }
+        self.max_size = int(os.getenv('WEATHER_CACHE_SIZE', DEFAULT_MAX_SIZE))
+        self.disk_dir = None
+        if os.getenv('WEATHER_CACHE_DISK', 'false').lower() in ('1', 'true', 'yes'):
+            self.disk_dir = os.getenv('WEATHER_CACHE_DIR', DEFAULT_DISK_DIR)
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+        self._entries = OrderedDict()  # (kind, cell) -> (stored_at, payload)
+        self._lock = threading.Lock()
+        self._lookups = get_counter(
+            "ml_engine_weather_cache_lookups_total",
+            "Weather cache lookups by kind and result (memory, disk, miss).",
+            ("kind", "result")
+        )
+
+    def cell(self, lat: float, lon: float) -> Tuple[float, float]:
+        """Snap coordinates to the centre of their grid cell."""
+        step = self.cell_deg
+        return (round(round(lat / step) * step, 4), round(round(lon / step) * step, 4))
+
+    def get(self, kind: str, lat: float, lon: float) -> Optional[Any]:
+        key = (kind, self.cell(lat, lon))
+        payload = self._get_memory(key)
+        if payload is not None:
+            self._lookups.inc(kind=kind, result="memory")
+            return payload
+
+        payload = self._get_disk(key)
+        if payload is not None:
+            self._lookups.inc(kind=kind, result="disk")
+            return payload
+
+        self._lookups.inc(kind=kind, result="miss")
+        return None
+
+    def set(self, kind: str, lat: float, lon: float, payload: Any):
+        key = (kind, self.cell(lat, lon))
+        self._set_memory(key, time.time(), payload)
+        self._set_disk(key, payload)
+
+    def get_or_fetch(self, kind: str, lat: float, lon: float,
+                     fetch: Callable[[float, float], Any]) -> Any:
+        """Sync read-through. fetch(cell_lat, cell_lon) returns the raw payload or raises."""
+        payload = self.get(kind, lat, lon)
+        if payload is None:
+            cell_lat, cell_lon = self.cell(lat, lon)
+            payload = fetch(cell_lat, cell_lon)
+            self.set(kind, lat, lon, payload)
+        return payload
+
+    async def get_or_fetch_async(self, kind: str, lat: float, lon: float,
+                                 fetch: Callable[[float, float], Awaitable[Any]]) -> Any:
+        """Async read-through; concurrent misses for one cell share a single fetch."""
+        key = (kind, self.cell(lat, lon))
+        payload = self._get_memory(key)
+        if payload is not None:
+            self._lookups.inc(kind=kind, result="memory")
+            return payload
+
+        async def load():
+            if self.disk_dir:
+                cached = await asyncio.to_thread(self._get_disk, key)
+                if cached is not None:
+                    self._lookups.inc(kind=kind, result="disk")
+                    return cached
+
+            self._lookups.inc(kind=kind, result="miss")
+            cell_lat, cell_lon = key[1]
+            fresh = await fetch(cell_lat, cell_lon)
+            self._set_memory(key, time.time(), fresh)
+            if self.disk_dir:
+                await asyncio.to_thread(self._set_disk, key, fresh)
+            return fresh
+
+        return await get_single_flight("weather_cache").do(key, load)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            size = len(self._entries)
+        lookups = {
+            kind: {result: self._lookups.value(kind=kind, result=result) for result in ("memory", "disk", "miss")}
+            for kind in self.ttls
+        }
+        return {
+            "size": size,
+            "max_size": self.max_size,
+            "cell_deg": self.cell_deg,
+            "ttl_seconds": self.ttls,
+            "disk": self.disk_dir is not None,
+            "lookups": lookups
+        }
+
+    # ---- memory tier ----
+
+    def _get_memory(self, key) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, payload = entry
+            if time.time() - stored_at >= self.ttls.get(key[0], DEFAULT_TTLS["current"]):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return payload
+
+    def _set_memory(self, key, stored_at: float, payload: Any):
+        with self._lock:
+            self._entries[key] = (stored_at, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    # ---- disk tier ----
+
+    def _disk_path(self, key) -> str:
+        kind, (lat, lon) = key
+        return os.path.join(self.disk_dir, f"{kind}_{lat:.4f}_{lon:.4f}.json")
+
+    def _get_disk(self, key) -> Optional[Any]:
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, 'r') as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Weather cache read error ({path}): {e}")
+            return None
+
+        if time.time() - entry['stored_at'] >= self.ttls.get(key[0], DEFAULT_TTLS["current"]):
+            return None
+        # Promote to memory with the original timestamp so the TTL is not extended
+        self._set_memory(key, entry['stored_at'], entry['payload'])
+        return entry['payload']
+
+    def _set_disk(self, key, payload: Any):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        try:
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump({'stored_at': time.time(), 'payload': payload}, f)
+            os.replace(tmp_path, path)  # Atomic for readers in other workers
+        except Exception as e:
+            logger.warning(f"Weather cache write error ({path}): {e}")
+
+
+# Singleton instance
+_weather_cache = None
+
+def get_weather_cache() -> WeatherCache:
+    """Get or create the shared weather cache."""
+    global _weather_cache
+    if _weather_cache is None:
+        _weather_cache = WeatherCache()
+    return _weather_cache
@@ -1,9 +1,10 @@
-import httpx
-import requests
 import os
 import logging
 import asyncio
 from datetime import datetime, timedelta
+from services.http_clients import get_http_clients
+from services.weather_cache import get_weather_cache
+from services.upstream_guard import get_upstream_guard
 
 logger = logging.getLogger(__name__)
 
@@ -12,6 +13,118 @@ class WeatherService:
         self.api_key = api_key or os.getenv("OPENWEATHER_KEY")
         self.base_url_current = "https://api.openweathermap.org/data/2.5/weather"
         self.base_url_forecast = "https://api.openweathermap.org/data/2.5/forecast"
+        self.cache = get_weather_cache()
+        self.guard = get_upstream_guard("openweather")
+
+    def _url(self, kind):
+        return self.base_url_current if kind == "current" else self.base_url_forecast
+
+    def _params(self, lat, lon):
+        return {
+            "lat": lat,
+            "lon": lon,
+            "appid": self.api_key,
+            "units": "metric"
+        }
+
+    async def get_raw_async(self, kind, lat, lon):
+        """
+        Raw OpenWeather payload ("current" or "forecast") for the grid cell
+        containing lat/lon, read through the shared weather cache.
+        Raises on upstream failure (or UpstreamUnavailable when the breaker is open).
+        """
+        async def fetch(cell_lat, cell_lon):
+            async with get_http_clients().client("weather") as client:
+                response = await self.guard.call(
+                    client.get, self._url(kind), params=self._params(cell_lat, cell_lon), hedge=True
+                )
+                response.raise_for_status()
+                return response.json()
+
+        return await self.cache.get_or_fetch_async(kind, lat, lon, fetch)
+
+    def get_raw(self, kind, lat, lon):
+        """Sync version of get_raw_async (same cache)."""
+        def fetch(cell_lat, cell_lon):
+            client = get_http_clients().sync_client("weather")
+            response = self.guard.call_sync(client.get, self._url(kind), params=self._params(cell_lat, cell_lon))
+            response.raise_for_status()
+            return response.json()
+
+        return self.cache.get_or_fetch(kind, lat, lon, fetch)
+
+    def _precision_mode(self, precision=None):
+        """Two upstream calls (current + forecast) instead of one; WEATHER_MODE=precision."""
+        if precision is not None:
+            return precision
+        return os.getenv("WEATHER_MODE", "snapshot").lower() == "precision"
+
+    async def get_raw_snapshot_async(self, lat, lon, precision=None):
+        """
+        Raw (current, forecast) payloads. Snapshot mode makes one forecast call
+        and derives current conditions from its nearest 3-hour slot; precision
+        mode also calls the current-weather endpoint.
+        """
+        if self._precision_mode(precision):
+            return await asyncio.gather(
+                self.get_raw_async("current", lat, lon),
+                self.get_raw_async("forecast", lat, lon)
+            )
+        forecast = await self.get_raw_async("forecast", lat, lon)
+        return self._current_from_forecast(forecast), forecast
+
+    def get_raw_snapshot(self, lat, lon, precision=None):
+        """Sync version of get_raw_snapshot_async."""
+        if self._precision_mode(precision):
+            return self.get_raw("current", lat, lon), self.get_raw("forecast", lat, lon)
+        forecast = self.get_raw("forecast", lat, lon)
+        return self._current_from_forecast(forecast), forecast
+
+    async def get_weather_snapshot_async(self, lat, lon, precision=None):
+        """
+        (current, forecast) in the get_current_weather_async / get_forecast_async
+        shapes, from one upstream call unless precision mode is on.
+        """
+        if not self.api_key:
+            logger.warning("No OpenWeather API Key. Using mock weather.")
+            return {"temp": 30.0, "humidity": 60.0, "moisture": 40.0, "desc": "Sunny (Mock)"}, self._get_mock_forecast()
+
+        try:
+            current, forecast = await self.get_raw_snapshot_async(lat, lon, precision)
+            return self._parse_current(current), self._parse_forecast(forecast)
+        except Exception as e:
+            logger.error(f"Weather snapshot error (async): {e}")
+            return {"temp": 28.0, "humidity": 55.0, "moisture": 50.0, "desc": "Error Fallback"}, self._get_mock_forecast()
+
+    def get_weather_snapshot(self, lat, lon, precision=None):
+        """Sync version of get_weather_snapshot_async."""
+        if not self.api_key:
+            logger.warning("No OpenWeather API Key. Using mock weather.")
+            return {"temp": 30.0, "humidity": 60.0, "moisture": 40.0, "desc": "Sunny (Mock)"}, self._get_mock_forecast()
+
+        try:
+            current, forecast = self.get_raw_snapshot(lat, lon, precision)
+            return self._parse_current(current), self._parse_forecast(forecast)
+        except Exception as e:
+            logger.error(f"Weather snapshot error: {e}")
+            return {"temp": 28.0, "humidity": 55.0, "moisture": 50.0, "desc": "Error Fallback"}, self._get_mock_forecast()
+
+    def _current_from_forecast(self, forecast):
+        """
+        Current-weather shaped payload built from the forecast slot closest to
+        now (slots are 3-hourly, so at most 1.5 h away).
+        """
+        now = datetime.now().timestamp()
+        slot = min(forecast['list'], key=lambda item: abs(item['dt'] - now))
+        return {
+            "main": slot['main'],
+            "weather": slot['weather'],
+            "wind": slot.get('wind', {}),
+            "rain": {"3h": slot.get('rain', {}).get('3h', 0)},
+            "visibility": slot.get('visibility', 10000),
+            "dt": slot['dt'],
+            "derived_from": "forecast"
+        }
 
     async def get_current_weather_async(self, lat, lon):
         """
@@ -23,23 +136,7 @@ class WeatherService:
             return {"temp": 30.0, "humidity": 60.0, "moisture": 40.0, "desc": "Sunny (Mock)"}
 
         try:
-            params = {
-                "lat": lat,
-                "lon": lon,
-                "appid": self.api_key,
-                "units": "metric"
-            }
-            async with httpx.AsyncClient(timeout=3.0) as client:
-                response = await client.get(self.base_url_current, params=params)
-                response.raise_for_status()
-                data = response.json()
-
-                return {
-                    "temp": data["main"]["temp"],
-                    "humidity": data["main"]["humidity"],
-                    "moisture": 45.0, # Soil moisture not available in standard API, mocking it
-                    "desc": data["weather"][0]["description"]
-                }
+            return self._parse_current(await self.get_raw_async("current", lat, lon))
         except Exception as e:
             logger.error(f"Weather fetch error (async): {e}")
             return {"temp": 28.0, "humidity": 55.0, "moisture": 50.0, "desc": "Error Fallback"}
@@ -54,22 +151,7 @@ class WeatherService:
             return {"temp": 30.0, "humidity": 60.0, "moisture": 40.0, "desc": "Sunny (Mock)"}
 
         try:
-            params = {
-                "lat": lat,
-                "lon": lon,
-                "appid": self.api_key,
-                "units": "metric"
-            }
-            response = requests.get(self.base_url_current, params=params, timeout=3)
-            response.raise_for_status()
-            data = response.json()
-
-            return {
-                "temp": data["main"]["temp"],
-                "humidity": data["main"]["humidity"],
-                "moisture": 45.0, 
-                "desc": data["weather"][0]["description"]
-            }
+            return self._parse_current(self.get_raw("current", lat, lon))
         except Exception as e:
             logger.error(f"Weather fetch error: {e}")
             return {"temp": 28.0, "humidity": 55.0, "moisture": 50.0, "desc": "Error Fallback"}
@@ -82,44 +164,7 @@ class WeatherService:
             return self._get_mock_forecast()
 
         try:
-            params = {
-                "lat": lat,
-                "lon": lon,
-                "appid": self.api_key,
-                "units": "metric"
-            }
-            async with httpx.AsyncClient(timeout=3.0) as client:
-                response = await client.get(self.base_url_forecast, params=params)
-                response.raise_for_status()
-                data = response.json()
-                
-                # Process 5-day forecast (taking one reading per day at noon)
-                daily_forecast = []
-                seen_dates = set()
-                
-                for item in data['list']:
-                    dt = datetime.fromtimestamp(item['dt'])
-                    date_str = dt.strftime('%Y-%m-%d')
-                    
-                    if date_str not in seen_dates and dt.hour >= 12:
-                        seen_dates.add(date_str)
-                        daily_forecast.append({
-                            "date": date_str,
-                            "temp": item['main']['temp'],
-                            "humidity": item['main']['humidity'],
-                            "desc": item['weather'][0]['description'],
-                            "icon": item['weather'][0]['icon']
-                        })
-                        if len(daily_forecast) >= 5:
-                            break
-                
-                seasonal_projection = self._generate_seasonal_projection()
-                
-                return {
-                    "daily": daily_forecast,
-                    "seasonal": seasonal_projection
-                }
-
+            return self._parse_forecast(await self.get_raw_async("forecast", lat, lon))
         except Exception as e:
             logger.error(f"Forecast fetch error (async): {e}")
             return self._get_mock_forecast()
@@ -130,46 +175,55 @@ class WeatherService:
             return self._get_mock_forecast()
 
         try:
-            params = {
-                "lat": lat,
-                "lon": lon,
-                "appid": self.api_key,
-                "units": "metric"
-            }
-            response = requests.get(self.base_url_forecast, params=params, timeout=3)
-            response.raise_for_status()
-            data = response.json()
-            
-            daily_forecast = []
-            seen_dates = set()
-            
-            for item in data['list']:
-                dt = datetime.fromtimestamp(item['dt'])
-                date_str = dt.strftime('%Y-%m-%d')
-                
-                if date_str not in seen_dates and dt.hour >= 12:
-                    seen_dates.add(date_str)
-                    daily_forecast.append({
-                        "date": date_str,
-                        "temp": item['main']['temp'],
-                        "humidity": item['main']['humidity'],
-                        "desc": item['weather'][0]['description'],
-                        "icon": item['weather'][0]['icon']
-                    })
-                    if len(daily_forecast) >= 5:
-                        break
-            
-            seasonal_projection = self._generate_seasonal_projection()
-            
-            return {
-                "daily": daily_forecast,
-                "seasonal": seasonal_projection
-            }
-
+            return self._parse_forecast(self.get_raw("forecast", lat, lon))
         except Exception as e:
             logger.error(f"Forecast fetch error: {e}")
             return self._get_mock_forecast()
 
+    def _parse_current(self, data):
+        return {
+            "temp": data["main"]["temp"],
+            "humidity": data["main"]["humidity"],
+            "moisture": 45.0, # Soil moisture not available in standard API, mocking it
+            "desc": data["weather"][0]["description"]
+        }
+
+    def _parse_forecast(self, data):
+        # Process 5-day forecast (taking one reading per day at noon)
+        daily_forecast = []
+        seen_dates = set()
+        
+        for item in data['list']:
+            dt = datetime.fromtimestamp(item['dt'])
+            date_str = dt.strftime('%Y-%m-%d')
+            
+            if date_str not in seen_dates and dt.hour >= 12:
+                seen_dates.add(date_str)
+                daily_forecast.append({
+                    "date": date_str,
+                    "temp": item['main']['temp'],
+                    "humidity": item['main']['humidity'],
+                    "desc": item['weather'][0]['description'],
+                    "icon": item['weather'][0]['icon']
+                })
+                if len(daily_forecast) >= 5:
+                    break
+        
+        seasonal_projection = self._generate_seasonal_projection()
+        
+        # Expected rain over the next 6 hours (the two nearest 3-hour slots)
+        cutoff = datetime.now() + timedelta(hours=6)
+        next_6h_rain = sum(
+            item.get('rain', {}).get('3h', 0)
+            for item in data['list'] if datetime.fromtimestamp(item['dt']) <= cutoff
+        )
+        
+        return {
+            "daily": daily_forecast,
+            "next_6h_rain": round(next_6h_rain, 1),
+            "seasonal": seasonal_projection
+        }
+
     def _generate_seasonal_projection(self):
         """
         Generates a 3-month outlook based on the current month in India.
@@ -216,5 +270,6 @@ class WeatherService:
                 {"date": "2023-10-04", "temp": 29, "humidity": 60, "desc": "Sunny", "icon": "01d"},
                 {"date": "2023-10-05", "temp": 30, "humidity": 55, "desc": "Sunny", "icon": "01d"}
             ],
+            "next_6h_rain": 0,
             "seasonal": self._generate_seasonal_projection()
         }
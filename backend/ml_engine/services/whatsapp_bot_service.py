@@ -229,7 +229,8 @@ class WhatsAppBotService:
                 soil_type=soil_data.get("soil", "Loamy"),
                 season=season,
                 temp=weather.get("temp", 28),
-                humidity=weather.get("humidity", 60)
+                humidity=weather.get("humidity", 60),
+                enrich=False
             )[:5]
             
             # Get monitoring service for stage data
@@ -316,7 +317,8 @@ class WhatsAppBotService:
                 soil_type=soil_data.get("soil", "Loamy"),
                 season=season,
                 temp=28,
-                humidity=60
+                humidity=60,
+                enrich=False
             )[:3]
             
             monitoring_service = get_crop_monitoring_service()
@@ -433,8 +435,7 @@ class WhatsAppBotService:
             from services.weather_service import WeatherService
             
             weather_service = WeatherService()
-            weather = weather_service.get_current_weather(lat, lon)
-            forecast = weather_service.get_forecast(lat, lon)
+            weather, forecast = weather_service.get_weather_snapshot(lat, lon)
             
             message = f"""🌤️ *వాతావరణ సమాచారం*
 
@@ -0,0 +1,73 @@
+"""
+Parity test: flat-array forest evaluator vs scikit-learn predict_proba
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(__file__))
+
+import joblib
+import numpy as np
+from services.flat_forest import load_flat_model
+from services.ml_recommendation_service import MODEL_PATH, FLAT_MODEL_DIR
+
+sk_data = joblib.load(MODEL_PATH)
+flat_data = load_flat_model(FLAT_MODEL_DIR)
+
+# Random inputs spanning (and beyond) the training ranges, plus every crop code
+rng = np.random.default_rng(42)
+n_rows = 2000
+X = np.column_stack([
+    rng.integers(0, len(sk_data['soil_types']), n_rows),
+    rng.integers(0, 3, n_rows),
+    rng.uniform(0, 50, n_rows),
+    rng.uniform(0, 100, n_rows),
+    rng.uniform(3, 10, n_rows),
+    rng.uniform(0, 400, n_rows),
+    rng.uniform(0, 120, n_rows),
+    rng.uniform(0, 400, n_rows),
+    rng.integers(0, 8, n_rows),
+    rng.integers(0, len(sk_data['crops']), n_rows),
+]).astype(np.float64)
+
+print("=" * 60)
+print("TEST 1: Preprocessing parity")
+print("=" * 60)
+assert np.array_equal(sk_data['scaler'].transform(X), flat_data['scaler'].transform(X))
+for enc in ['soil_encoder', 'season_encoder', 'crop_encoder']:
+    labels = list(sk_data[enc].classes_)
+    assert np.array_equal(sk_data[enc].transform(labels), flat_data[enc].transform(labels))
+try:
+    flat_data['soil_encoder'].transform(['Not A Soil'])
+    raise AssertionError("Unknown label should raise ValueError")
+except ValueError:
+    pass
+print("✅ Scaler and encoders identical")
+
+print("\n" + "=" * 60)
+print(f"TEST 2: predict_proba parity ({n_rows} rows)")
+print("=" * 60)
+X_scaled = sk_data['scaler'].transform(X)
+sk_proba = sk_data['model'].predict_proba(X_scaled)
+flat_proba = flat_data['model'].predict_proba(X_scaled)
+max_diff = np.abs(sk_proba - flat_proba).max()
+print(f"   Max abs difference: {max_diff:.2e}")
+# Only float summation order differs (sklearn accumulates trees across threads)
+assert np.allclose(sk_proba, flat_proba, rtol=0, atol=1e-12)
+assert np.array_equal(sk_data['model'].predict(X_scaled), flat_data['model'].predict(X_scaled))
+print("✅ Probabilities and predictions match")
+
+print("\n" + "=" * 60)
+print("TEST 3: End-to-end recommendations")
+print("=" * 60)
+from services.ml_recommendation_service import MLRecommendationService
+service = MLRecommendationService()
+for soil, season in [("Loamy", "Zaid"), ("Black Cotton", "Kharif"), ("Red Soil", "Rabi")]:
+    args = (soil, season, 27, 65, 6.8, 180, 50, 200, 2)
+    service.model_data = sk_data
+    expected = [(c, s, int(p)) for c, s, p in service.predict_all_crops(*args)]
+    service.model_data = flat_data
+    actual = [(c, s, int(p)) for c, s, p in service.predict_all_crops(*args)]
+    assert expected == actual, f"Mismatch for {soil}/{season}"
+    print(f"✅ {soil} / {season}: identical crop scores")
+
+print("\n✅ All parity tests passed!")
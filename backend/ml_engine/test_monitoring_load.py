@@ -0,0 +1,127 @@
+"""
+Load test: daily action plans under a slow OpenWeather upstream.
+Runs N concurrent plans on one event loop the old way (sync
+generate_daily_action_plan called from the coroutine, as the endpoints did)
+and the new way (generate_daily_action_plan_async). A heartbeat task measures
+how long the event loop stalls - with blocking calls every other request on
+the worker waits behind the slow upstream.
+"""
+import sys
+import os
+import time
+import asyncio
+from contextlib import asynccontextmanager
+sys.path.append(os.path.dirname(__file__))
+
+import httpx
+from datetime import datetime, timedelta
+import services.weather_service as weather_service_module
+from services.weather_cache import get_weather_cache
+from services.crop_monitoring_service import get_crop_monitoring_service
+
+UPSTREAM_LATENCY = 0.3  # seconds per simulated OpenWeather call
+CONCURRENCY = 20
+
+
+def forecast_payload():
+    now = int(time.time())
+    return {"list": [{
+        "dt": now + i * 3 * 3600,
+        "main": {"temp": 31.0, "temp_min": 27.0, "temp_max": 33.0, "humidity": 70},
+        "weather": [{"main": "Clouds", "description": "broken clouds", "icon": "04d"}],
+        "wind": {"speed": 3.0},
+        "rain": {"3h": 0.2}
+    } for i in range(40)]}
+
+
+# Sync path: the blocking client sleeps in the calling thread
+def slow_sync_handler(request):
+    time.sleep(UPSTREAM_LATENCY)
+    return httpx.Response(200, json=forecast_payload())
+
+
+# Async path: httpx transport that awaits the same latency
+async def slow_handler(request):
+    await asyncio.sleep(UPSTREAM_LATENCY)
+    return httpx.Response(200, json=forecast_payload())
+
+class SlowUpstreamClients:
+    @asynccontextmanager
+    async def client(self, service):
+        async with httpx.AsyncClient(transport=httpx.MockTransport(slow_handler)) as client:
+            yield client
+
+    def sync_client(self, service):
+        return httpx.Client(transport=httpx.MockTransport(slow_sync_handler))
+
+weather_service_module.get_http_clients = lambda: SlowUpstreamClients()
+
+
+def subscription(i):
+    # One grid cell per plan so the weather cache cannot hide the upstream latency
+    return {
+        "subscriptionId": f"load-{i}",
+        "crop": "Paddy",
+        "sowingDate": (datetime.now() - timedelta(days=40)).strftime('%Y-%m-%d'),
+        "areaAcres": 2,
+        "location": {"lat": 15.0 + i * 0.2, "lon": 79.0 + i * 0.2}
+    }
+
+
+async def run(make_plan):
+    get_weather_cache().clear()
+    stalls = []
+    stop = asyncio.Event()
+
+    async def heartbeat():
+        while not stop.is_set():
+            tick = time.perf_counter()
+            await asyncio.sleep(0.01)
+            stalls.append(time.perf_counter() - tick - 0.01)
+
+    beat = asyncio.create_task(heartbeat())
+    await asyncio.sleep(0.02)
+    start = time.perf_counter()
+    plans = await asyncio.gather(*(make_plan(subscription(i)) for i in range(CONCURRENCY)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await beat
+    return plans, elapsed, max(stalls)
+
+
+service = get_crop_monitoring_service()
+service.weather_service.api_key = "load-test"
+
+async def blocking_plan(sub):
+    return service.generate_daily_action_plan(sub)
+
+blocking_plans, blocking_time, blocking_stall = asyncio.run(run(blocking_plan))
+async_plans, async_time, async_stall = asyncio.run(run(service.generate_daily_action_plan_async))
+
+print("=" * 60)
+print(f"DAILY PLAN LOAD TEST ({CONCURRENCY} concurrent plans, {UPSTREAM_LATENCY * 1000:.0f} ms upstream)")
+print("=" * 60)
+print(f"{'':22}{'wall (s)':>12}{'max loop stall (s)':>22}")
+print(f"{'Blocking (old)':22}{blocking_time:12.2f}{blocking_stall:22.2f}")
+print(f"{'Async (new)':22}{async_time:12.2f}{async_stall:22.2f}")
+
+failed = False
+if all(p['forecast_actions'] for p in async_plans) and len(async_plans) == CONCURRENCY:
+    print(f"✅ All {CONCURRENCY} async plans built from upstream weather")
+else:
+    print("❌ Async plans are missing forecast data")
+    failed = True
+
+if [p['alerts'] for p in async_plans] == [p['alerts'] for p in blocking_plans]:
+    print("✅ Async and blocking plans produce the same alerts")
+else:
+    print("❌ Async and blocking plans differ")
+    failed = True
+
+if async_time < blocking_time / 4 and async_stall < UPSTREAM_LATENCY:
+    print("✅ Concurrency holds: slow upstream no longer blocks the event loop")
+else:
+    print("❌ Async plans still serialize behind the upstream")
+    failed = True
+
+sys.exit(1 if failed else 0)
@@ -0,0 +1,146 @@
+"""
+Test: mandi price history and its NumPy trend analytics.
+Checks the moving averages against a plain Python reference, trend and
+volatility labels on synthetic series, that repeated observations of a
+market and day replace each other, that a price refresh against the
+in-process upstream stand-in records data.gov.in rows and reports the
+history trend, and that the decision simulator's market risk uses it for
+the app's market state only.
+"""
+import sys
+import os
+import time
+import asyncio
+import tempfile
+sys.path.append(os.path.dirname(__file__))
+
+os.environ["UPSTREAM_STANDIN_URL"] = "inprocess"
+os.environ["PRICE_CACHE_DB"] = os.path.join(tempfile.mkdtemp(prefix="price_history_"), "prices.sqlite3")
+os.environ["MANDI_INGEST_ENABLED"] = "false"
+
+import numpy as np
+
+from services import upstream_standin
+from services.price_history import get_price_history, trend_analytics, moving_average, daily_series, today
+from services.market_price_service import get_market_price_service
+from services.decision_simulator_service import decision_simulator
+
+upstream_standin.configure({
+    name: {"latency_ms": 50, "jitter_ms": 0, "error_rate": 0.0, "timeout_rate": 0.0}
+    for name in upstream_standin.STANDIN_BEHAVIOUR
+})
+
+STATE = "Andhra Pradesh"
+history = get_price_history()
+rng = np.random.default_rng(7)
+failed = False
+
+
+def check(name, ok, detail=""):
+    global failed
+    print(f"{'✅' if ok else '❌'} {name}{': ' + detail if detail else ''}")
+    failed = failed or not ok
+
+
+def synthetic(start_price, daily_change, days=60, markets=4, noise=0.01, skip=0.2):
+    """(day, modal) observations: `markets` mandis per day, some days missing."""
+    day, modal = [], []
+    for d in range(days):
+        if d and rng.random() < skip:
+            continue
+        base = start_price * (1 + daily_change) ** d
+        for _ in range(markets):
+            day.append(today() - days + 1 + d)
+            modal.append(round(base * (1 + rng.normal(0, noise))))
+    return np.array(day), np.array(modal)
+
+
+def seed(commodity, day, modal, state=STATE):
+    history.append([
+        (commodity, state, "Guntur", f"Market {i % 4 + 1}", str(np.datetime64(int(d), "D")), int(p), None, None)
+        for i, (d, p) in enumerate(zip(day, modal))
+    ], source="seed")
+
+
+print("=" * 60)
+print("MANDI PRICE HISTORY")
+print("=" * 60)
+
+# Moving averages against a plain loop
+day, modal = synthetic(5000, 0.004)
+first, dense = daily_series(day, modal)
+for window in (7, 30):
+    fast = moving_average(dense, window)
+    slow = []
+    for i in range(len(dense)):
+        values = [v for v in dense[max(0, i - window + 1):i + 1] if not np.isnan(v)]
+        slow.append(sum(values) / len(values) if values else np.nan)
+    check(f"{window}-day moving average matches reference", np.allclose(fast, slow, equal_nan=True))
+
+# Trend labels
+stats = trend_analytics(*synthetic(5000, 0.01))
+check("Rising series -> up", stats["trend"] == "up", f"{stats['trend_pct_30d']}% / 30 days, vol {stats['volatility_30d']}")
+stats = trend_analytics(*synthetic(5000, -0.01))
+check("Falling series -> down", stats["trend"] == "down", f"{stats['trend_pct_30d']}% / 30 days")
+stats = trend_analytics(*synthetic(5000, 0.0))
+check("Flat series -> stable", stats["trend"] == "stable", f"{stats['trend_pct_30d']}% / 30 days")
+stats = trend_analytics(*synthetic(5000, 0.0, noise=0.15, markets=1))
+check("Noisy series -> volatile", stats["trend"] == "volatile", f"vol {stats['volatility_30d']}")
+stats = trend_analytics(*synthetic(5000, 0.01, days=3))
+check("Too little history -> unknown", stats["trend"] == "unknown")
+
+# Store: one row per market and day
+history.clear()
+day, modal = synthetic(7000, 0.01)
+seed("Cotton", day, modal)
+seed("Cotton", day, modal)
+cols = history.columns("Cotton", STATE)
+check("Repeated observations replace each other", len(cols["day"]) == len(day), f"{len(cols['day'])} rows")
+
+start = time.perf_counter()
+stats = history.columns("Cotton", STATE)
+stats = trend_analytics(stats["day"], stats["modal"])
+ms = (time.perf_counter() - start) * 1000
+check("Stored series analytics", stats["trend"] == "up" and stats["ma_7"] > stats["ma_30"],
+      f"ma_7 ₹{stats['ma_7']} > ma_30 ₹{stats['ma_30']} in {ms:.1f} ms")
+
+# Refresh through the workers: data.gov.in rows recorded, history trend reported
+service = get_market_price_service()
+before = history.stats()["rows"]
+price = asyncio.run(service.get_commodity_price_async("Cotton", STATE, "Guntur"))
+check("Refresh appends data.gov.in rows", history.stats()["rows"] > before,
+      f"{before} -> {history.stats()['rows']} rows")
+check("Refreshed price carries the history trend", price.get("history", {}).get("trend") == price["trend"],
+      f"trend {price['trend']}")
+
+# Decision simulator market risk
+risk = decision_simulator._calculate_market_risk("Cotton", "Medium")
+check("Market risk uses mandi history when present",
+      risk["source"] == "mandi_history" and risk["price_history"]["trend"] in ("up", "volatile"),
+      f"score {risk['score']}, {risk['price_history']['trend']}")
+risk = decision_simulator._calculate_market_risk("Tobacco", "Medium")
+check("Market risk falls back to crop profile without history",
+      risk["source"] == "crop_profile" and risk["score"] == 70)
+
+# Only the appended keys are invalidated
+history.analytics("Cotton", STATE)
+history.analytics("Tobacco", STATE)
+seed("Cotton", *synthetic(7000, 0.01, days=5))
+check("Append invalidates only its own memo entries",
+      ("Cotton", STATE, None) not in history._memo and ("Tobacco", STATE, None) in history._memo)
+
+# /recommend risk analysis reads the market state only
+from app import _simulate_risk, MARKET_STATE
+seed("Maize", *synthetic(2200, 0.01), state=MARKET_STATE)
+seed("Maize", *synthetic(2200, -0.02), state="Telangana")
+queried = []
+analytics = history.analytics
+history.analytics = lambda commodity, state=None, district=None: queried.append(state) or analytics(commodity, state, district)
+recs = _simulate_risk([{"crop": "Maize", "confidence": 80}], {"rain_days": 4, "total_rainfall": 60},
+                      28, 60, {"ph": 7.0}, "Kharif", "Guntur")
+history.analytics = analytics
+market = recs[0]["risk_analysis"]["risk_breakdown"]["market_risk"]
+check("Risk analysis queries the market state", queried == [MARKET_STATE] and market["price_history"]["trend"] == "up",
+      f"queried {queried}, trend {market['price_history']['trend']}")
+
+sys.exit(1 if failed else 0)
@@ -0,0 +1,109 @@
+"""
+Test: first-good-result racing across the mandi price workers.
+Runs MarketPriceService against the in-process upstream stand-in with fast
+official sources (data.gov.in, eNAM) and slow scrapers (AGMARKNET, AP
+Agrisnet) and checks that a refresh returns on the first trusted result and
+cancels the scrapers, that quorum and all wait for more sources, and that
+PRICE_MERGE_LATE folds the slow results into the cache afterwards, and
+that past the deadline the first valid result answers.
+"""
+import sys
+import os
+import time
+import asyncio
+import tempfile
+sys.path.append(os.path.dirname(__file__))
+
+os.environ["UPSTREAM_STANDIN_URL"] = "inprocess"
+os.environ["PRICE_CACHE_DB"] = os.path.join(tempfile.mkdtemp(prefix="price_race_"), "prices.sqlite3")
+os.environ["MANDI_INGEST_ENABLED"] = "false"
+
+from services import upstream_standin
+from services.market_price_service import get_market_price_service
+
+FAST_MS, SLOW_MS = 200, 3000
+upstream_standin.configure({
+    name: {"latency_ms": SLOW_MS if name in ("agmarknet", "ap_agrisnet") else FAST_MS,
+           "jitter_ms": 0, "error_rate": 0.0, "timeout_rate": 0.0}
+    for name in upstream_standin.STANDIN_BEHAVIOUR
+})
+
+CROP, STATE, DISTRICT = "Cotton", "Andhra Pradesh", "Guntur"
+service = get_market_price_service()
+service.race_deadline = 10.0  # Longer than the slow sources: only the strategy ends a race here
+failed = False
+
+
+def check(name, ok, detail=""):
+    global failed
+    print(f"{'✅' if ok else '❌'} {name}{': ' + detail if detail else ''}")
+    failed = failed or not ok
+
+
+async def refresh(strategy, merge_late=False):
+    """Blocking refresh with an empty cache; returns (price, ms)."""
+    service.strategy, service.merge_late = strategy, merge_late
+    service.cache.clear()
+    start = time.perf_counter()
+    price = await service.get_commodity_price_async(CROP, STATE, DISTRICT)
+    return price, (time.perf_counter() - start) * 1000
+
+
+def cancelled():
+    return sum(service._cancelled.value(worker=w.name) for w in service.workers)
+
+
+async def settle():
+    while service._fan_outs:
+        await asyncio.sleep(0.05)
+
+
+async def main():
+    print("=" * 60)
+    print(f"PRICE WORKER RACE ({FAST_MS} ms official, {SLOW_MS} ms scrapers)")
+    print("=" * 60)
+
+    before = cancelled()
+    price, ms = await refresh("first")
+    check("first returns on a trusted result", ms < SLOW_MS / 2 and price["source"] != "MSP (Government)",
+          f"{ms:.0f} ms, ₹{price['price']} from {price['source']}")
+    check("first cancels the slow scrapers", cancelled() - before == 2, f"{cancelled() - before:.0f} cancelled")
+    await settle()
+
+    price, ms = await refresh("quorum")
+    check("quorum returns once two sources agree", ms < SLOW_MS / 2 and price.get("num_sources", 1) >= 2,
+          f"{ms:.0f} ms, {price.get('num_sources', 1)} sources")
+    await settle()
+
+    price, ms = await refresh("all")
+    check("all waits for every source", ms >= SLOW_MS, f"{ms:.0f} ms, {price.get('num_sources', 1)} sources")
+
+    price, ms = await refresh("first", merge_late=True)
+    answered_sources = price.get("num_sources", 1)
+    await settle()
+    _, merged = service.cache.get(CROP, STATE, DISTRICT)
+    check("merge_late answers early, then caches every source",
+          ms < SLOW_MS / 2 and merged.get("num_sources", 1) > answered_sources,
+          f"{ms:.0f} ms with {answered_sources}, cache now {merged.get('num_sources', 1)}")
+
+    service.race_deadline = 0.05
+    price, ms = await refresh("quorum")
+    check("deadline answers with what has arrived", ms < SLOW_MS / 2 and price.get("num_sources", 1) >= 1,
+          f"{ms:.0f} ms, {price.get('num_sources', 1)} source(s)")
+
+    # Nothing by the deadline: the first valid result afterwards answers, even from an untrusted source
+    upstream_standin.configure({
+        "data.gov.in": {"error_rate": 1.0},
+        "enam": {"latency_ms": 8000},
+        "agmarknet": {"latency_ms": 1500},
+    })
+    service.race_deadline = 0.3
+    before = service._cancelled.value(worker="eNAM")
+    price, ms = await refresh("first")
+    check("first result after the deadline answers", 1500 <= ms < 3000 and price["source"] == "AGMARKNET",
+          f"{ms:.0f} ms from {price['source']}")
+    check("still-running workers are cancelled", service._cancelled.value(worker="eNAM") - before == 1)
+
+
+asyncio.run(main())
+sys.exit(1 if failed else 0)
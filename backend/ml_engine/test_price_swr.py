@@ -0,0 +1,99 @@
+"""
+Test: stale-while-revalidate mandi prices.
+Runs MarketPriceService against the in-process upstream stand-in with a
+slow data.gov.in and checks that a stale cached price is served at once,
+that concurrent stale hits start a single background refresh, and that
+entries past the hard max age still block on a refresh.
+"""
+import sys
+import os
+import time
+import asyncio
+import tempfile
+sys.path.append(os.path.dirname(__file__))
+
+os.environ["UPSTREAM_STANDIN_URL"] = "inprocess"
+os.environ["PRICE_CACHE_DB"] = os.path.join(tempfile.mkdtemp(prefix="price_swr_"), "prices.sqlite3")
+os.environ["PRICE_SWR"] = "true"
+os.environ["PRICE_MAX_STALE_HOURS"] = "24"
+
+from services import upstream_standin
+from services.market_price_service import get_market_price_service
+
+UPSTREAM_LATENCY_MS = 500
+upstream_standin.configure({
+    name: {"latency_ms": UPSTREAM_LATENCY_MS, "jitter_ms": 0, "error_rate": 0.0, "timeout_rate": 0.0}
+    for name in upstream_standin.STANDIN_BEHAVIOUR
+})
+
+CROP, STATE, DISTRICT = "Cotton", "Andhra Pradesh", "Guntur"
+service = get_market_price_service()
+failed = False
+
+
+def check(name, ok, detail=""):
+    global failed
+    print(f"{'✅' if ok else '❌'} {name}{': ' + detail if detail else ''}")
+    failed = failed or not ok
+
+
+def seed(age_hours, price=1234):
+    service.cache.clear()  # set() keeps the newest row, so start over
+    service.cache.set(CROP, STATE, DISTRICT, {"price": price, "source": "seed"},
+                      stored_at=time.time() - age_hours * 3600)
+
+
+def upstream_calls():
+    return upstream_standin._served[("data.gov.in", "ok")]
+
+
+async def timed(coro):
+    start = time.perf_counter()
+    result = await coro
+    return result, (time.perf_counter() - start) * 1000
+
+
+async def main():
+    print("=" * 60)
+    print(f"STALE-WHILE-REVALIDATE PRICES ({UPSTREAM_LATENCY_MS} ms upstream)")
+    print("=" * 60)
+
+    # Fresh entry: served from cache, no refresh
+    seed(age_hours=1)
+    before = upstream_calls()
+    price, ms = await timed(service.get_commodity_price_async(CROP, STATE, DISTRICT))
+    check("Fresh entry served from cache", price["price"] == 1234 and not price["stale"] and upstream_calls() == before,
+          f"{ms:.1f} ms")
+
+    # Stale entry: 5 concurrent requests, all served stale, one background refresh
+    seed(age_hours=5)
+    before = upstream_calls()
+    results = await asyncio.gather(*(timed(service.get_commodity_price_async(CROP, STATE, DISTRICT)) for _ in range(5)))
+    slowest = max(ms for _, ms in results)
+    check("Stale entry served immediately",
+          all(p["stale"] and p["price"] == 1234 and p["age_seconds"] >= 5 * 3600 for p, _ in results) and
+          slowest < UPSTREAM_LATENCY_MS / 2, f"slowest {slowest:.1f} ms")
+    check("One background refresh for concurrent stale hits", len(service._background) == 1)
+
+    while service._background:
+        await asyncio.sleep(0.05)
+    check("Background refresh called data.gov.in once", upstream_calls() - before == 1,
+          f"{upstream_calls() - before} call(s)")
+    price, _ = await timed(service.get_commodity_price_async(CROP, STATE, DISTRICT))
+    check("Refreshed price served fresh afterwards", not price["stale"] and price["price"] != 1234, f"₹{price['price']}")
+
+    # Past the hard max age: the request waits for the refresh
+    seed(age_hours=30)
+    price, ms = await timed(service.get_commodity_price_async(CROP, STATE, DISTRICT))
+    check("Entry past hard max age blocks on refresh",
+          not price["stale"] and price["price"] != 1234 and ms >= UPSTREAM_LATENCY_MS, f"{ms:.0f} ms")
+
+
+asyncio.run(main())
+
+# Sync wrapper never serves stale (its loop would cancel the refresh)
+seed(age_hours=5)
+price = service.get_commodity_price(CROP, STATE, DISTRICT)
+check("Sync wrapper refreshes instead of serving stale", not price["stale"] and price["price"] != 1234)
+
+sys.exit(1 if failed else 0)
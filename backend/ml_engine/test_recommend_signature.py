@@ -0,0 +1,70 @@
+"""
+Test: /recommend request coalescing key.
+Checks that _recommend_signature only looks at the custom_npk keys the
+handler uses and never coerces their values, and that POST /recommend
+with extra soil report fields succeeds (in-process, against the upstream
+stand-in).
+"""
+import sys
+import os
+import asyncio
+import tempfile
+sys.path.append(os.path.dirname(__file__))
+
+os.environ["UPSTREAM_STANDIN_URL"] = "inprocess"
+os.environ["MANDI_INGEST_ENABLED"] = "false"
+os.environ["NASA_CACHE_DIR"] = tempfile.mkdtemp(prefix="nasa_cache_")
+os.environ["PRICE_CACHE_DB"] = os.path.join(tempfile.mkdtemp(prefix="price_cache_"), "prices.sqlite3")
+
+import httpx
+
+from services import upstream_standin
+from app import app, LocationRequest, _recommend_signature
+
+upstream_standin.configure({
+    name: {"latency_ms": 20, "jitter_ms": 0, "error_rate": 0.0, "timeout_rate": 0.0}
+    for name in upstream_standin.STANDIN_BEHAVIOUR
+})
+
+NPK = {"n": 150, "p": 50, "k": 200, "ph": 7.0}
+failed = False
+
+
+def check(name, ok, detail=""):
+    global failed
+    print(f"{'✅' if ok else '❌'} {name}{': ' + detail if detail else ''}")
+    failed = failed or not ok
+
+
+def signature(custom_npk):
+    return _recommend_signature(LocationRequest(location_name="Guntur", custom_npk=custom_npk))
+
+
+print("=" * 60)
+print("RECOMMEND SIGNATURE")
+print("=" * 60)
+
+check("Extra soil report fields do not change the key",
+      signature(dict(NPK, lab="SGS Hyd")) == signature(NPK))
+check("Different NPK values give different keys", signature(NPK) != signature(dict(NPK, n=180)))
+try:
+    signature(dict(NPK, n="lots", notes=["unhashable"]))
+    check("Bad values do not fail while computing the key", True)
+except Exception as e:
+    check("Bad values do not fail while computing the key", False, repr(e))
+
+
+async def post(custom_npk):
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://ml-engine",
+                                     timeout=120) as client:
+            return await client.post("/recommend", json={
+                "location_name": "Guntur", "lat": 16.3, "lon": 80.44, "custom_npk": custom_npk
+            })
+
+
+response = asyncio.run(post(dict(NPK, lab="SGS Hyd")))
+check("POST /recommend with extra custom_npk keys", response.status_code == 200,
+      f"HTTP {response.status_code}")
+
+sys.exit(1 if failed else 0)
@@ -0,0 +1,124 @@
+"""
+Test: OpenWeather upstream calls per daily plan.
+The weather cache TTLs are set to zero so only the request-scoped
+WeatherContext can prevent duplicate fetches inside a plan.
+"""
+import sys
+import os
+import time
+import asyncio
+from contextlib import asynccontextmanager
+sys.path.append(os.path.dirname(__file__))
+
+os.environ["WEATHER_CACHE_CURRENT_TTL"] = "0"
+os.environ["WEATHER_CACHE_FORECAST_TTL"] = "0"
+
+import httpx
+from datetime import datetime, timedelta
+import services.weather_service as weather_service_module
+from services.crop_monitoring_service import get_crop_monitoring_service, WeatherContext
+
+calls = []
+
+
+def payload(url):
+    now = int(time.time())
+    slot = {
+        "dt": now,
+        "main": {"temp": 36.0, "temp_min": 30.0, "temp_max": 41.0, "humidity": 88},
+        "weather": [{"main": "Rain", "description": "light rain", "icon": "10d"}],
+        "wind": {"speed": 4.0},
+        "rain": {"3h": 6.0}
+    }
+    if url.endswith("/forecast"):
+        return {"list": [dict(slot, dt=now + i * 3 * 3600) for i in range(40)]}
+    return slot
+
+
+def fake_handler(request):
+    calls.append(str(request.url))
+    return httpx.Response(200, json=payload(request.url.path))
+
+async def fake_async_handler(request):
+    return fake_handler(request)
+
+class FakeClients:
+    @asynccontextmanager
+    async def client(self, service):
+        async with httpx.AsyncClient(transport=httpx.MockTransport(fake_async_handler)) as client:
+            yield client
+
+    def sync_client(self, service):
+        return httpx.Client(transport=httpx.MockTransport(fake_handler))
+
+weather_service_module.get_http_clients = lambda: FakeClients()
+
+
+def subscription(lat=16.3, lon=80.4, crop="Paddy"):
+    return {
+        "subscriptionId": f"test-{crop}",
+        "crop": crop,
+        "sowingDate": (datetime.now() - timedelta(days=40)).strftime('%Y-%m-%d'),
+        "areaAcres": 2,
+        "location": {"lat": lat, "lon": lon}
+    }
+
+
+def count_calls(run):
+    calls.clear()
+    result = run()
+    return len(calls), result
+
+
+service = get_crop_monitoring_service()
+service.weather_service.api_key = "test"
+failed = False
+
+def check(name, actual, expected):
+    global failed
+    if actual == expected:
+        print(f"✅ {name}: {actual} upstream call(s)")
+    else:
+        print(f"❌ {name}: {actual} upstream call(s), expected {expected}")
+        failed = True
+
+
+print("=" * 60)
+print("UPSTREAM CALLS PER PLAN")
+print("=" * 60)
+
+os.environ["WEATHER_MODE"] = "snapshot"
+n, plan = count_calls(lambda: service.generate_daily_action_plan(subscription()))
+check("Daily plan (sync, snapshot)", n, 1)
+if not plan['alerts']:
+    print("❌ Alerts were not built from the shared weather")
+    failed = True
+
+n, _ = count_calls(lambda: asyncio.run(service.generate_daily_action_plan_async(subscription())))
+check("Daily plan (async, snapshot)", n, 1)
+
+n, _ = count_calls(lambda: asyncio.run(service.generate_weekly_plan_async(subscription())))
+check("Weekly plan (async, snapshot)", n, 1)
+
+os.environ["WEATHER_MODE"] = "precision"
+n, _ = count_calls(lambda: service.generate_daily_action_plan(subscription()))
+check("Daily plan (sync, precision)", n, 2)
+os.environ["WEATHER_MODE"] = "snapshot"
+
+# /my-crops: several subscriptions in one request share one context
+async def my_crops(subs):
+    context = WeatherContext(service)
+    return await asyncio.gather(*(
+        service.generate_weather_alerts_async(s['location']['lat'], s['location']['lon'], s['crop'], context=context)
+        for s in subs
+    ))
+
+same_village = [subscription(crop=c) for c in ("Paddy", "Cotton", "Maize")]
+n, _ = count_calls(lambda: asyncio.run(my_crops(same_village)))
+check("3 subscriptions, same location", n, 1)
+
+spread = [subscription(lat=16.3 + i, crop=c) for i, c in enumerate(("Paddy", "Cotton", "Maize"))]
+n, _ = count_calls(lambda: asyncio.run(my_crops(spread)))
+check("3 subscriptions, 3 locations", n, 3)
+
+sys.exit(1 if failed else 0)
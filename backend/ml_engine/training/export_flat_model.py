@@ -0,0 +1,30 @@
+"""
+Export an existing crop_recommender_ml.joblib to the flat-array format
+used by MLRecommendationService (models/crop_recommender_ml_flat/).
+Run this after training if the model was saved without the export step.
+"""
+
+import os
+import sys
+import joblib
+import logging
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from services.flat_forest import export_flat_model
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MODEL_PATH = os.path.join(os.path.dirname(__file__), '../models/crop_recommender_ml.joblib')
+FLAT_MODEL_DIR = os.path.join(os.path.dirname(__file__), '../models/crop_recommender_ml_flat')
+
+
+def main():
+    logger.info(f"Loading {MODEL_PATH}")
+    model_data = joblib.load(MODEL_PATH)
+    export_flat_model(model_data, FLAT_MODEL_DIR)
+    print(f"✅ Flat model written to {os.path.abspath(FLAT_MODEL_DIR)}")
+
+
+if __name__ == "__main__":
+    main()
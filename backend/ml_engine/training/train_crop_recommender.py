@@ -13,6 +13,10 @@ from sklearn.preprocessing import LabelEncoder, StandardScaler
 from sklearn.metrics import classification_report, accuracy_score
 import joblib
 import logging
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from services.flat_forest import export_flat_model
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -20,6 +24,7 @@ logger = logging.getLogger(__name__)
 # Load crop profiles
 PROFILES_PATH = os.path.join(os.path.dirname(__file__), '../data/crop_profiles.json')
 MODEL_PATH = os.path.join(os.path.dirname(__file__), '../models/crop_recommender_ml.joblib')
+FLAT_MODEL_DIR = os.path.join(os.path.dirname(__file__), '../models/crop_recommender_ml_flat')
 
 # Encoding mappings
 SOIL_TYPES = [
@@ -224,6 +229,9 @@ def save_model(model, scaler, encoders, accuracy, feature_cols):
     joblib.dump(model_data, MODEL_PATH)
     logger.info(f"Model saved to {MODEL_PATH}")
     
+    # Flat-array export used by MLRecommendationService for fast inference
+    export_flat_model(model_data, FLAT_MODEL_DIR)
+    
     # Save accuracy report
     report_path = MODEL_PATH.replace('.joblib', '_report.json')
     with open(report_path, 'w') as f: